@@ -0,0 +1,87 @@
+import argparse
+import multiprocessing
+import time
+
+from dlgo import goboard_fast
+from dlgo.gotypes import Player, Point
+from dlgo.minimax import AlphaBetaAgent, AlphaBetaSearch, \
+    ParallelAlphaBetaSearch
+
+
+class CountingEval:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, game_state):
+        self.calls += 1
+        colors = game_state.board.color_array()
+        diff = int((colors == Player.black.value).sum()) - \
+            int((colors == Player.white.value).sum())
+        if game_state.next_player == Player.black:
+            return diff
+        return -1 * diff
+
+
+def opening(board_size):
+    """A few stones near the center, so the position is not symmetric."""
+    center = (board_size + 1) // 2
+    game = goboard_fast.GameState.new_game(board_size)
+    for row, col in [(center, center), (center, center + 1),
+                     (center + 1, center + 1), (center - 1, center)]:
+        game = game.apply_move(goboard_fast.Move.play(Point(row, col)))
+    return game
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--board-sizes', type=int, nargs='+', default=[5, 7])
+    parser.add_argument('--depths', type=int, nargs='+', default=[2, 3])
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--workers', type=int,
+                        default=multiprocessing.cpu_count())
+    args = parser.parse_args()
+
+    print('%5s %-10s %5s %9s %9s %10s %6s' % (
+        'board', 'engine', 'depth', 'seconds', 'evals', 'nodes/s', 'ebf'))
+    for board_size in args.board_sizes:
+        game = opening(board_size)
+        for depth in args.depths:
+            eval_fn = CountingEval()
+            # AlphaBetaAgent searches max_depth plies below each root move.
+            agent = AlphaBetaAgent(depth - 1, eval_fn)
+            start = time.time()
+            agent.select_move(game)
+            elapsed = time.time() - start
+            print('%5d %-10s %5d %9.2f %9d %10s %6s' % (
+                board_size, 'book', depth, elapsed, eval_fn.calls, '-', '-'))
+
+            eval_fn = CountingEval()
+            result = AlphaBetaSearch(eval_fn).search(game, max_depth=depth)
+            print('%5d %-10s %5d %9.2f %9d %10.0f %6.1f' % (
+                board_size, 'iterative', result.depth, result.elapsed,
+                eval_fn.calls, result.nodes_per_second(),
+                result.effective_branching_factor() or 0))
+
+        eval_fn = CountingEval()
+        result = AlphaBetaSearch(eval_fn).search(
+            game, max_seconds=args.seconds)
+        print('%5d %-10s %5d %9.2f %9d %10.0f %6.1f' % (
+            board_size, 'timed', result.depth, result.elapsed,
+            eval_fn.calls, result.nodes_per_second(),
+            result.effective_branching_factor() or 0))
+
+        if args.workers > 1:
+            # Leaf evaluations happen in the workers and are not counted.
+            search = ParallelAlphaBetaSearch(CountingEval(), args.workers)
+            try:
+                result = search.search(game, max_seconds=args.seconds)
+            finally:
+                search.close()
+            print('%5d %-10s %5d %9.2f %9s %10.0f %6.1f' % (
+                board_size, 'parallel', result.depth, result.elapsed,
+                '-', result.nodes_per_second(),
+                result.effective_branching_factor() or 0))
+
+
+if __name__ == '__main__':
+    main()
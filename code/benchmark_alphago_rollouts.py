@@ -0,0 +1,31 @@
+import argparse
+
+from dlgo import goboard_fast
+from dlgo.agent.alphago_rollout import AlphaGoRolloutEngine, \
+    PatternRolloutPolicy
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--board-sizes', type=int, nargs='+', default=[9, 19])
+    parser.add_argument('--batch-sizes', type=int, nargs='+',
+                        default=[1, 16, 64])
+    parser.add_argument('--rollouts', type=int, default=128)
+    parser.add_argument('--rollout-limit', type=int, default=100)
+    args = parser.parse_args()
+
+    print('%5s %6s %11s %9s' % ('board', 'batch', 'rollouts/s', 'moves/s'))
+    for board_size in args.board_sizes:
+        start = goboard_fast.GameState.new_game(board_size)
+        for batch_size in args.batch_sizes:
+            engine = AlphaGoRolloutEngine(
+                PatternRolloutPolicy(), args.rollout_limit, seed=0)
+            for _ in range(max(1, args.rollouts // batch_size)):
+                engine.values([start] * batch_size)
+            print('%5d %6d %11.1f %9.0f' % (
+                board_size, batch_size, engine.rollouts_per_second(),
+                engine.num_moves / engine.elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import contextlib
+import io
+import multiprocessing
+import time
+
+from dlgo import goboard_array
+from dlgo.mcts import MCTSAgent
+
+
+def rounds_per_second(board_size, num_rounds, num_workers, parallelism,
+                      batch_size):
+    game = goboard_array.GameState.new_game(board_size)
+    bot = MCTSAgent(
+        num_rounds, temperature=1.4, rollout_batch_size=batch_size,
+        num_workers=num_workers, parallelism=parallelism, seed=0)
+    try:
+        start = time.time()
+        # select_move prints its candidate moves; keep the report clean.
+        with contextlib.redirect_stdout(io.StringIO()):
+            bot.select_move(game)
+        return num_rounds / (time.time() - start)
+    finally:
+        bot.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--board-sizes', type=int, nargs='+', default=[9, 19])
+    parser.add_argument('--max-workers', type=int,
+                        default=multiprocessing.cpu_count())
+    parser.add_argument('--rounds', type=int, default=512)
+    parser.add_argument('--batch-size', type=int, default=16)
+    args = parser.parse_args()
+
+    print('%5s %-6s %7s %12s' % ('board', 'mode', 'workers', 'rounds/s'))
+    for board_size in args.board_sizes:
+        serial = rounds_per_second(
+            board_size, args.rounds, 1, 'root', args.batch_size)
+        print('%5d %-6s %7d %12.1f' % (board_size, 'serial', 1, serial))
+        for parallelism in ('root', 'tree'):
+            for num_workers in range(2, args.max_workers + 1):
+                rate = rounds_per_second(
+                    board_size, args.rounds, num_workers, parallelism,
+                    args.batch_size)
+                print('%5d %-6s %7d %12.1f' % (
+                    board_size, parallelism, num_workers, rate))
+
+
+if __name__ == '__main__':
+    main()
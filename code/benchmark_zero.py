@@ -0,0 +1,58 @@
+import argparse
+import contextlib
+import io
+import time
+
+from keras.layers import Conv2D, Dense, Flatten, Input
+from keras.models import Model
+
+from dlgo import goboard_fast
+from dlgo import zero
+
+
+def build_model(encoder, num_layers):
+    board_input = Input(shape=encoder.shape(), name='board_input')
+    pb = board_input
+    for i in range(num_layers):
+        pb = Conv2D(64, (3, 3), padding='same',
+                    data_format='channels_first', activation='relu')(pb)
+    policy_conv = Conv2D(2, (1, 1), data_format='channels_first',
+                         activation='relu')(pb)
+    policy_output = Dense(encoder.num_moves(), activation='softmax')(
+        Flatten()(policy_conv))
+    value_conv = Conv2D(1, (1, 1), data_format='channels_first',
+                        activation='relu')(pb)
+    value_hidden = Dense(256, activation='relu')(Flatten()(value_conv))
+    value_output = Dense(1, activation='tanh')(value_hidden)
+    return Model(inputs=[board_input], outputs=[policy_output, value_output])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--board-size', type=int, default=9)
+    parser.add_argument('--layers', type=int, default=4)
+    parser.add_argument('--rounds', type=int, default=256)
+    parser.add_argument('--batch-sizes', type=int, nargs='+',
+                        default=[1, 8, 16, 32, 64])
+    args = parser.parse_args()
+
+    encoder = zero.ZeroEncoder(args.board_size)
+    model = build_model(encoder, args.layers)
+    game = goboard_fast.GameState.new_game(args.board_size)
+
+    print('%6s %12s %12s' % ('batch', 'positions/s', 'rounds/s'))
+    for batch_size in args.batch_sizes:
+        bot = zero.ZeroAgent(
+            model, encoder, rounds_per_move=args.rounds,
+            reuse_tree=False, batch_size=batch_size)
+        start = time.time()
+        # Keras prints a progress bar for every predict call.
+        with contextlib.redirect_stdout(io.StringIO()):
+            bot.select_move(game)
+        elapsed = time.time() - start
+        print('%6d %12.1f %12.1f' % (
+            batch_size, bot.positions_per_second(), args.rounds / elapsed))
+
+
+if __name__ == '__main__':
+    main()
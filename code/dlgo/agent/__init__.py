@@ -1,4 +1,5 @@
 from .alphago import *
+from .alphago_rollout import *
 from .base import *
 from .pg import *
 from .predict import *
@@ -5,11 +5,22 @@ from dlgo.goboard_fast import Move
 from dlgo import kerasutil
 import operator
 # end::alphago_imports[]
+import multiprocessing
+import queue
+import threading
+from multiprocessing.pool import ThreadPool
+
+from dlgo.agent.alphago_rollout import AlphaGoRolloutEngine, \
+    NetworkRolloutPolicy
+from dlgo.agent.helpers import detached_state, moves_since
+from dlgo.budget import SearchBudget
 
 
 __all__ = [
     'AlphaGoNode',
-    'AlphaGoMCTS'
+    'AlphaGoMCTS',
+    'AsyncAlphaGoMCTS',
+    'FastAlphaGoMCTS',
 ]
 
 
@@ -27,6 +38,11 @@ class AlphaGoNode:
 # <2> A node is initialized with a prior probability.
 # <3> The utility function will be updated during search.
 # end::init_alphago_node[]
+        # Used by AsyncAlphaGoMCTS: the sum of the values backed up
+        # through this node, and whether a policy evaluation to expand
+        # it is under way.
+        self.total_value = 0.0
+        self.expanding = False
 
 # tag::select_node[]
     def select_child(self):
@@ -166,3 +182,406 @@ class AlphaGoMCTS(Agent):
         raise IOError("AlphaGoMCTS agent can\'t be serialized" +
                        "consider serializing the three underlying" +
                        "neural networks instad.")
+
+
+class FastAlphaGoMCTS(AlphaGoMCTS):
+    """AlphaGoMCTS with rollouts played by an AlphaGoRolloutEngine.
+
+    The search runs num_simulations simulations unless a SearchBudget is
+    given, and keeps the subtree of the previous search when the game
+    continues from it.
+
+    Rollouts use fast_policy_agent's network unless another rollout
+    policy, such as a PatternRolloutPolicy, is given.
+
+    Rollout values are from the point of view of the player to move
+    where the rollout starts, like the values of the value network. The
+    rollouts of AlphaGoMCTS score the game for the player to move where
+    the rollout ends instead.
+    """
+    def __init__(self, policy_agent, fast_policy_agent, value_agent,
+                 lambda_value=0.5, num_simulations=1000, depth=50,
+                 rollout_limit=100, budget=None, rollout_policy=None):
+        AlphaGoMCTS.__init__(
+            self, policy_agent, fast_policy_agent, value_agent,
+            lambda_value, num_simulations, depth, rollout_limit)
+        self.budget = budget if budget is not None \
+            else SearchBudget(max_rounds=num_simulations)
+        # The game state self.root belongs to.
+        self.root_state = None
+        if rollout_policy is None:
+            rollout_policy = NetworkRolloutPolicy(fast_policy_agent)
+        self.rollouts = AlphaGoRolloutEngine(rollout_policy, rollout_limit)
+
+    def set_search_budget(self, budget):
+        self.budget = budget
+
+    def _promote_root(self, game_state):
+        """Point self.root at the node for game_state, reusing the
+        matching part of the previous search tree if there is one.
+        """
+        node = None
+        if self.root_state is not None:
+            moves = moves_since(self.root_state, game_state)
+            if moves is not None:
+                node = self.root
+                for move in moves:
+                    node = node.children.get(move)
+                    if node is None:
+                        break
+        if node is None:
+            node = AlphaGoNode()
+        node.parent = None
+        self.root = node
+        self.root_state = game_state
+
+    def set_eval_caches(self, policy_cache=None, value_cache=None,
+                        rollout_cache=None):
+        """Cache the evaluations of each network; every network needs a
+        cache of its own."""
+        self.policy.set_eval_cache(policy_cache)
+        self.value.set_eval_cache(value_cache)
+        self.rollouts.policy.set_eval_cache(rollout_cache)
+
+    def select_move(self, game_state):
+        self._promote_root(game_state)
+        budget = self.budget.start()
+        visit_counts = lambda: [
+            child.visit_count for child in self.root.children.values()]
+        while not budget.exhausted(visit_counts):
+            budget.record(nodes=0)
+            current_state = game_state
+            node = self.root
+            for depth in range(self.depth):
+                if not node.children:
+                    if current_state.is_over():
+                        break
+                    moves, probabilities = \
+                        self.policy_probabilities(current_state)
+                    node.expand_children(moves, probabilities)
+                    budget.record(rounds=0, nodes=len(moves))
+
+                move, node = node.select_child()
+                current_state = current_state.apply_move(move)
+
+            value = self.value.predict(current_state)
+            rollout = self.policy_rollout(current_state)
+
+            weighted_value = (1 - self.lambda_value) * value + \
+                self.lambda_value * rollout
+
+            self.update_values(node, weighted_value)
+
+        move = max(self.root.children, key=lambda move:
+                   self.root.children.get(move).visit_count)
+
+        self.root = self.root.children[move]
+        self.root.parent = None
+        self.root_state = game_state.apply_move(move)
+        return move
+
+    @staticmethod
+    def update_values(node, leaf_value):
+        """AlphaGoNode.update_values without recursion, so paths deeper
+        than the recursion limit can be backed up."""
+        path = []
+        while node is not None:
+            path.append(node)
+            node = node.parent
+
+        for node in reversed(path):
+            node.visit_count += 1
+            node.q_value += leaf_value / node.visit_count
+            if node.parent is not None:
+                c_u = 5
+                node.u_value = c_u * np.sqrt(node.parent.visit_count) \
+                    * node.prior_value / (1 + node.visit_count)
+
+    def policy_rollout(self, game_state):
+        return self.rollouts.values([game_state], self.rollout_limit)[0]
+
+
+# Per rollout worker process: its own rollout engine.
+_worker_rollouts = None
+
+
+def _init_rollout_worker(policy, rollout_limit):
+    global _worker_rollouts
+    _worker_rollouts = AlphaGoRolloutEngine(policy, rollout_limit)
+
+
+def _roll_out(game_states):
+    """Pool task: the rollout values of game_states."""
+    return _worker_rollouts.values(game_states)
+
+
+class AsyncAlphaGoMCTS(FastAlphaGoMCTS):
+    """FastAlphaGoMCTS with asynchronous policy and value evaluation
+    (APV-MCTS, as in the AlphaGo paper).
+
+    Simulations walk down the tree batch_size at a time, with a virtual
+    loss of virtual_loss visits on every node they pass, and the batch
+    is handed to a pool of num_workers threads: one batched value
+    network call, one batched rollout and, for the leaves without
+    children, one batched policy network call to expand them. The next
+    batch is selected while earlier ones are evaluated; results are
+    backed up as they come in. Each network is called from one thread
+    at a time; the networks run side by side.
+
+    With rollout_processes > 0 and a rollout policy that plays on array
+    boards (PatternRolloutPolicy), rollouts run in that many processes
+    instead, so they scale with the number of cores.
+
+    Unlike AlphaGoMCTS, a node's q_value is the mean of the values
+    backed up through it, from the point of view of the player who
+    moved into it, and the utility is computed from the current visit
+    counts at each selection, with exploration constant c_u. Call
+    close() to shut the pools down.
+    """
+    def __init__(self, policy_agent, fast_policy_agent, value_agent,
+                 lambda_value=0.5, num_simulations=1000, depth=50,
+                 rollout_limit=100, budget=None, rollout_policy=None,
+                 batch_size=8, num_workers=3, rollout_processes=0,
+                 virtual_loss=3, c_u=5):
+        FastAlphaGoMCTS.__init__(
+            self, policy_agent, fast_policy_agent, value_agent,
+            lambda_value, num_simulations, depth, rollout_limit, budget,
+            rollout_policy)
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        self.rollout_processes = rollout_processes
+        self.virtual_loss = virtual_loss
+        self.c_u = c_u
+        self._policy_lock = threading.Lock()
+        self._value_lock = threading.Lock()
+        self._rollout_lock = threading.Lock()
+        self._threads = None
+        self._processes = None
+
+    def close(self):
+        if self._threads is not None:
+            self._threads.terminate()
+            self._threads.join()
+            self._threads = None
+        if self._processes is not None:
+            self._processes.terminate()
+            self._processes.join()
+            self._processes = None
+
+    def _get_threads(self):
+        if self._threads is None:
+            self._threads = ThreadPool(self.num_workers)
+        return self._threads
+
+    def _get_processes(self):
+        """The rollout process pool, or None if rollouts run in
+        threads."""
+        if self.rollout_processes < 1 or \
+                not self.rollouts.policy.on_array_boards:
+            return None
+        if self._processes is None:
+            self._processes = multiprocessing.Pool(
+                self.rollout_processes, _init_rollout_worker,
+                (self.rollouts.policy, self.rollout_limit))
+        return self._processes
+
+    def select_move(self, game_state):
+        self._promote_root(game_state)
+        if not self.root.children:
+            moves, probabilities = self.policy_probabilities(game_state)
+            self.root.expand_children(moves, probabilities)
+        self.run_search(game_state)
+
+        move = max(self.root.children, key=lambda move:
+                   self.root.children.get(move).visit_count)
+        self.root = self.root.children[move]
+        self.root.parent = None
+        self.root_state = game_state.apply_move(move)
+        return move
+
+    def ponder(self, game_state, budget):
+        """Search game_state until budget runs out, typically while the
+        opponent thinks about it. The next select_move continues from the
+        node of the opponent's reply."""
+        if game_state.is_over():
+            return
+        self._promote_root(game_state)
+        if not self.root.children:
+            moves, probabilities = self.policy_probabilities(game_state)
+            self.root.expand_children(moves, probabilities)
+        search_budget = self.budget
+        self.budget = budget
+        try:
+            self.run_search(game_state)
+        finally:
+            self.budget = search_budget
+
+    def select_child(self, node):
+        """The (move, child) of node with the highest q_value plus
+        utility."""
+        sqrt_visits = np.sqrt(node.visit_count)
+        best = None
+        best_score = None
+        for move, child in node.children.items():
+            q_value = 0.0
+            if child.visit_count > 0:
+                q_value = child.total_value / child.visit_count
+            score = q_value + self.c_u * child.prior_value * sqrt_visits \
+                / (1 + child.visit_count)
+            if best_score is None or score > best_score:
+                best_score = score
+                best = (move, child)
+        return best
+
+    def select_leaf(self, game_state):
+        """Walk down from the root and put a virtual loss on the path.
+        Returns the path, root first, and the game state at its end."""
+        node = self.root
+        path = [node]
+        for depth in range(self.depth):
+            if not node.children:
+                break
+            move, node = self.select_child(node)
+            game_state = game_state.apply_move(move)
+            path.append(node)
+        for node in path:
+            node.visit_count += self.virtual_loss
+            node.total_value -= self.virtual_loss
+        return path, game_state
+
+    def back_up(self, path, value):
+        """Revert the virtual loss of path and record value, which is
+        from the point of view of the player to move at the leaf."""
+        for node in reversed(path):
+            value = -1 * value
+            node.visit_count += 1 - self.virtual_loss
+            node.total_value += value + self.virtual_loss
+            node.q_value = node.total_value / node.visit_count
+
+    def policy_probabilities_batch(self, game_states):
+        """policy_probabilities for many game states with one call to
+        the policy network."""
+        encoder = self.policy._encoder
+        outputs = self.policy.predict_batch(game_states)
+        results = []
+        for game_state, output in zip(game_states, outputs):
+            points = np.flatnonzero(game_state.legal_move_mask())
+            if len(points) == 0:
+                results.append(([], []))
+                continue
+            moves = [
+                Move.play(encoder.decode_point_index(point))
+                for point in points.tolist()]
+            legal_outputs = output[points]
+            results.append((moves, legal_outputs / np.sum(legal_outputs)))
+        return results
+
+    def _expansions(self, game_states):
+        with self._policy_lock:
+            return self.policy_probabilities_batch(game_states)
+
+    def _values(self, game_states):
+        with self._value_lock:
+            return self.value.predict_batch(game_states)
+
+    def _rollouts(self, game_states):
+        with self._rollout_lock:
+            return self.rollouts.values(game_states, self.rollout_limit)
+
+    def run_search(self, game_state):
+        budget = self.budget.start()
+        visit_counts = lambda: [
+            child.visit_count for child in self.root.children.values()]
+        threads = self._get_threads()
+        processes = self._get_processes()
+        finished = queue.Queue()
+
+        def submit(pool, kind, key, func, args):
+            pool.apply_async(
+                func, args,
+                callback=lambda result: finished.put((kind, key, result)),
+                error_callback=lambda exc: finished.put(
+                    ('error', key, exc)))
+
+        # Batch id -> [paths, values, rollout values]; a part that is
+        # not needed starts out as 0.
+        pending = {}
+        next_batch = 0
+        in_flight = 0
+        while True:
+            while in_flight < 2 * self.num_workers and \
+                    not budget.exhausted(visit_counts):
+                num_leaves = self.batch_size
+                remaining = budget.remaining_rounds()
+                if remaining is not None:
+                    num_leaves = max(1, min(num_leaves, remaining))
+                leaves = [
+                    self.select_leaf(game_state) for _ in range(num_leaves)]
+                budget.record(rounds=len(leaves), nodes=0)
+
+                to_expand = []
+                paths = []
+                states = []
+                for path, state in leaves:
+                    if state.is_over():
+                        winner = state.winner()
+                        self.back_up(
+                            path, 1 if winner == state.next_player else -1)
+                        continue
+                    leaf = path[-1]
+                    if not leaf.children and not leaf.expanding and \
+                            len(path) <= self.depth:
+                        leaf.expanding = True
+                        to_expand.append((leaf, state))
+                    paths.append(path)
+                    states.append(state)
+
+                if to_expand:
+                    submit(threads, 'policy', to_expand, self._expansions,
+                           ([state for _, state in to_expand],))
+                    in_flight += 1
+                if not paths:
+                    continue
+                batch = next_batch
+                next_batch += 1
+                entry = [paths, 0, 0]
+                if self.lambda_value < 1:
+                    entry[1] = None
+                    submit(threads, 'value', batch, self._values, (states,))
+                    in_flight += 1
+                if self.lambda_value > 0:
+                    entry[2] = None
+                    if processes is not None:
+                        submit(processes, 'rollout', batch, _roll_out,
+                               ([detached_state(s) for s in states],))
+                    else:
+                        submit(threads, 'rollout', batch, self._rollouts,
+                               (states,))
+                    in_flight += 1
+                pending[batch] = entry
+
+            if in_flight == 0:
+                if budget.exhausted(visit_counts):
+                    break
+                continue
+            kind, key, result = finished.get()
+            in_flight -= 1
+            if kind == 'error':
+                raise result
+            if kind == 'policy':
+                for (leaf, _), (moves, probabilities) in zip(key, result):
+                    leaf.expand_children(moves, probabilities)
+                    leaf.expanding = False
+                    budget.record(rounds=0, nodes=len(moves))
+                continue
+            entry = pending[key]
+            entry[1 if kind == 'value' else 2] = result
+            if entry[1] is None or entry[2] is None:
+                continue
+            del pending[key]
+            paths, values, rollouts = entry
+            weighted_values = (1 - self.lambda_value) * np.asarray(values) \
+                + self.lambda_value * np.asarray(rollouts)
+            for path, value in zip(paths, weighted_values.tolist()):
+                self.back_up(path, value)
+
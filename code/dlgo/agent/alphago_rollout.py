@@ -0,0 +1,319 @@
+import copy
+import time
+
+import numpy as np
+
+from dlgo import goboard_array
+from dlgo.goboard_array import EMPTY, OFF_BOARD
+from dlgo.goboard_fast import Move
+from dlgo.gotypes import Player, Point
+from dlgo.scoring import area_scores, board_to_array
+
+__all__ = [
+    'AlphaGoRolloutEngine',
+    'NetworkRolloutPolicy',
+    'PatternRolloutPolicy',
+]
+
+
+def _array_board(board):
+    if isinstance(board, goboard_array.Board):
+        return copy.deepcopy(board)
+    return goboard_array.Board.from_color_array(board_to_array(board))
+
+
+def _padded_colors(game_states):
+    """(num_games, num_rows + 2, num_cols + 2) array of colors, with a
+    ring of OFF_BOARD around every board, as in goboard_array."""
+    colors = np.stack([state.board.color_array() for state in game_states])
+    return np.pad(colors, ((0, 0), (1, 1), (1, 1)), 'constant',
+                  constant_values=OFF_BOARD)
+
+
+def _neighbors(padded):
+    return (padded[:, :-2, 1:-1], padded[:, 2:, 1:-1],
+            padded[:, 1:-1, :-2], padded[:, 1:-1, 2:])
+
+
+def _corners(padded):
+    return (padded[:, :-2, :-2], padded[:, :-2, 2:],
+            padded[:, 2:, :-2], padded[:, 2:, 2:])
+
+
+def _eye_mask(padded, to_move):
+    """Vectorized dlgo.agent.helpers_fast.is_point_an_eye for a batch of
+    padded color arrays; to_move is (num_games, 1, 1)."""
+    surrounded = padded[:, 1:-1, 1:-1] == EMPTY
+    for neighbor in _neighbors(padded):
+        surrounded &= (neighbor == to_move) | (neighbor == OFF_BOARD)
+    friendly_corners = sum(
+        (corner == to_move).astype(np.int8) for corner in _corners(padded))
+    off_board_corners = sum(
+        (corner == OFF_BOARD).astype(np.int8) for corner in _corners(padded))
+    corners_ok = np.where(
+        off_board_corners > 0,
+        off_board_corners + friendly_corners == 4,
+        friendly_corners >= 3)
+    return surrounded & corners_ok
+
+
+def _stack_buffers(buffers, shape):
+    return np.frombuffer(b''.join(buffers), dtype=np.uint8).reshape(shape)
+
+
+class NetworkRolloutPolicy:
+    """Rollout moves from the network of a DeepLearningAgent, the fast
+    policy of AlphaGoMCTS. All games of a step share one call to the
+    model. Like the rollouts in the book, the most likely legal move is
+    played."""
+    greedy = True
+    on_array_boards = False
+
+    def __init__(self, agent):
+        self.agent = agent
+
+    def set_eval_cache(self, eval_cache):
+        self.agent.set_eval_cache(eval_cache)
+
+    def weights(self, game_states):
+        return self.agent.predict_batch(game_states)
+
+
+class PatternRolloutPolicy:
+    """Rollout policy without a network, in the spirit of the AlphaGo
+    rollout policy: moves are sampled with weights from a few local
+    patterns.
+
+    Moves that capture, that add a liberty to an own string in atari or
+    that answer the opponent's last move (the eight points around it)
+    are preferred; moves that look like self-atari (a single empty
+    neighbor and no friendly one) are avoided. The games are played on
+    goboard_array boards.
+    """
+    greedy = False
+    on_array_boards = True
+
+    capture_weight = 30.0
+    save_weight = 10.0
+    response_weight = 4.0
+    self_atari_weight = 0.1
+
+    def set_eval_cache(self, eval_cache):
+        pass
+
+    def weights(self, colors, to_move, captures, saves, last_moves):
+        """Weights of the points of a batch of games.
+
+        colors are padded color arrays and to_move is (num_games, 1, 1).
+        captures marks the points where the player to move captures,
+        saves the points where the opponent would capture, i.e. the
+        liberties of the mover's strings in atari. last_moves holds the
+        zero based (row, col) of each game's last move, or None.
+        """
+        empty_neighbors = sum(
+            (neighbor == EMPTY).astype(np.int8)
+            for neighbor in _neighbors(colors))
+        friendly = np.zeros(empty_neighbors.shape, dtype=bool)
+        for neighbor in _neighbors(colors):
+            friendly |= neighbor == to_move
+        weights = np.where(
+            (empty_neighbors <= 1) & ~friendly, self.self_atari_weight, 1.0)
+        for game_weights, last_move in zip(weights, last_moves):
+            if last_move is not None:
+                row, col = last_move
+                game_weights[max(row - 1, 0):row + 2,
+                             max(col - 1, 0):col + 2] *= self.response_weight
+        weights[saves] = self.save_weight
+        # Captures win over everything else, self-atari included.
+        weights[captures] = self.capture_weight
+        return weights.reshape((len(weights), -1))
+
+
+class AlphaGoRolloutEngine:
+    """Plays rollouts of many games in lockstep.
+
+    At each step the policy scores the points of every unfinished game
+    at once, and the engine picks a legal move that does not fill one of
+    the mover's own eyes: the highest scoring one for greedy policies,
+    one sampled in proportion to the scores otherwise. A player without
+    such a move passes.
+
+    Legality is read off bookkeeping the boards keep up to date, so no
+    list of legal moves is ever built: GameState.legal_move_mask, or for
+    policies that play on goboard_array boards, the boards' playable
+    points and ko point. On array boards the first move honors the full
+    GameState rules (superko); after that simple ko is enforced, and
+    finished games are scored by area with komi.
+    """
+    def __init__(self, policy, rollout_limit=100, komi=7.5, seed=None):
+        self.policy = policy
+        self.rollout_limit = rollout_limit
+        self.komi = komi
+        self._rng = np.random.RandomState(seed)
+        self.num_rollouts = 0
+        self.num_moves = 0
+        self.elapsed = 0.0
+
+    def rollouts_per_second(self):
+        if self.elapsed == 0:
+            return 0.0
+        return self.num_rollouts / self.elapsed
+
+    def values(self, game_states, rollout_limit=None):
+        """Roll out every game state. Returns an array with, for each of
+        them, 1 if the player to move in it wins, -1 if they lose and 0
+        if the rollout ends before the game does."""
+        start = time.time()
+        if rollout_limit is None:
+            rollout_limit = self.rollout_limit
+        winners = [None] * len(game_states)
+        pending = []
+        for i, game_state in enumerate(game_states):
+            if game_state.is_over():
+                winners[i] = game_state.winner()
+            else:
+                pending.append(i)
+        if pending:
+            states = [game_states[i] for i in pending]
+            if self.policy.on_array_boards:
+                results = self._roll_out_boards(states, rollout_limit)
+            else:
+                results = self._roll_out_states(states, rollout_limit)
+            for i, winner in zip(pending, results):
+                winners[i] = winner
+
+        values = np.zeros(len(game_states))
+        for i, (game_state, winner) in enumerate(zip(game_states, winners)):
+            if winner is not None:
+                values[i] = 1 if winner == game_state.next_player else -1
+        self.num_rollouts += len(game_states)
+        self.elapsed += time.time() - start
+        return values
+
+    def _choose(self, candidates, weights):
+        """Pick a candidate per row. Returns the chosen columns and
+        whether each row had a candidate at all."""
+        weights = np.asarray(weights, dtype=np.float64)
+        if self.policy.greedy:
+            keys = weights
+        else:
+            # Weighted sampling: the largest u ** (1 / w) wins with
+            # probability proportional to w.
+            keys = np.log(self._rng.random_sample(weights.shape)) / \
+                np.maximum(weights, 1e-12)
+        keys = np.where(candidates, keys, -np.inf)
+        return np.argmax(keys, axis=1).tolist(), \
+            candidates.any(axis=1).tolist()
+
+    def _roll_out_states(self, states, rollout_limit):
+        active = list(range(len(states)))
+        for step in range(rollout_limit):
+            if not active:
+                break
+            active_states = [states[i] for i in active]
+            padded = _padded_colors(active_states)
+            to_move = np.array([
+                state.next_player.value for state in active_states],
+                dtype=np.uint8).reshape((-1, 1, 1))
+            num_cols = padded.shape[2] - 2
+            candidates = np.stack([
+                state.legal_move_mask() for state in active_states])
+            candidates &= ~_eye_mask(padded, to_move)
+            choices, has_move = self._choose(
+                candidates.reshape((len(active), -1)),
+                self.policy.weights(active_states))
+
+            still_active = []
+            for i, choice, playable in zip(active, choices, has_move):
+                if playable:
+                    move = Move.play(Point(
+                        row=choice // num_cols + 1,
+                        col=choice % num_cols + 1))
+                else:
+                    move = Move.pass_turn()
+                states[i] = states[i].apply_move(move)
+                if not states[i].is_over():
+                    still_active.append(i)
+            self.num_moves += len(active)
+            active = still_active
+        return [state.winner() for state in states]
+
+    def _roll_out_boards(self, states, rollout_limit):
+        boards = [_array_board(state.board) for state in states]
+        num_rows, num_cols = boards[0].num_rows, boards[0].num_cols
+        width = boards[0].geometry.width
+        padded_shape = (num_rows + 2, num_cols + 2)
+        to_move = [state.next_player.value for state in states]
+        passes = []
+        last_moves = []
+        for state in states:
+            move = state.last_move
+            passes.append(1 if move is not None and move.is_pass else 0)
+            if move is not None and move.is_play:
+                last_moves.append((move.point.row - 1, move.point.col - 1))
+            else:
+                last_moves.append(None)
+
+        active = list(range(len(boards)))
+        for step in range(rollout_limit):
+            if not active:
+                break
+            shape = (len(active),) + padded_shape
+            colors = _stack_buffers(
+                [boards[i].color_buffer() for i in active], shape)
+            movers = np.array(
+                [to_move[i] for i in active],
+                dtype=np.uint8).reshape((-1, 1, 1))
+            if step == 0:
+                candidates = np.stack([
+                    state.legal_move_mask() for state in states])
+            else:
+                candidates = _stack_buffers(
+                    [boards[i].playable_buffer(to_move[i]) for i in active],
+                    shape)[:, 1:-1, 1:-1].astype(bool)
+                for k, i in enumerate(active):
+                    ko = boards[i].ko_index
+                    if ko is not None:
+                        candidates[k, ko // width - 1, ko % width - 1] = False
+            candidates &= ~_eye_mask(colors, movers)
+            captures = _stack_buffers(
+                [boards[i].capture_buffer(to_move[i]) for i in active],
+                shape)[:, 1:-1, 1:-1].astype(bool)
+            saves = _stack_buffers(
+                [boards[i].capture_buffer(3 - to_move[i]) for i in active],
+                shape)[:, 1:-1, 1:-1].astype(bool)
+            weights = self.policy.weights(
+                colors, movers, captures, saves,
+                [last_moves[i] for i in active])
+            choices, has_move = self._choose(
+                candidates.reshape((len(active), -1)), weights)
+
+            still_active = []
+            for i, choice, playable in zip(active, choices, has_move):
+                board = boards[i]
+                if playable:
+                    row, col = divmod(choice, num_cols)
+                    board.place_stone_at(
+                        to_move[i], (row + 1) * width + col + 1)
+                    passes[i] = 0
+                    last_moves[i] = (row, col)
+                else:
+                    board.clear_ko()
+                    passes[i] += 1
+                    last_moves[i] = None
+                to_move[i] = 3 - to_move[i]
+                if passes[i] < 2:
+                    still_active.append(i)
+            self.num_moves += len(active)
+            active = still_active
+
+        winners = [None] * len(boards)
+        finished = [i for i in range(len(boards)) if passes[i] >= 2]
+        if finished:
+            colors = np.stack([boards[i].color_array() for i in finished])
+            black_scores, white_scores = area_scores(colors)
+            for i, b, w in zip(finished, black_scores.tolist(),
+                               white_scores.tolist()):
+                winners[i] = Player.black if b > w + self.komi \
+                    else Player.white
+        return winners
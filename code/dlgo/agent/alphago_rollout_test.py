@@ -0,0 +1,125 @@
+import random
+import unittest
+
+import numpy as np
+
+from dlgo.agent import alphago_rollout
+from dlgo.agent.alphago_rollout import AlphaGoRolloutEngine, \
+    NetworkRolloutPolicy, PatternRolloutPolicy
+from dlgo.agent.helpers_fast import is_point_an_eye
+from dlgo.goboard_fast import GameState, Move
+from dlgo.gotypes import Player, Point
+
+
+class FakeAgent:
+    """Random move probabilities, recording every position it sees."""
+    def __init__(self, num_points, seed=0):
+        self.num_points = num_points
+        self.rng = np.random.RandomState(seed)
+        self.calls = 0
+        self.seen = []
+
+    def set_eval_cache(self, eval_cache):
+        pass
+
+    def predict_batch(self, game_states):
+        self.calls += 1
+        self.seen.extend(game_states)
+        return self.rng.random_sample((len(game_states), self.num_points))
+
+
+def random_game(board_size, num_moves, seed):
+    rng = random.Random(seed)
+    game = GameState.new_game(board_size)
+    for _ in range(num_moves):
+        moves = [move for move in game.legal_moves() if move.is_play]
+        game = game.apply_move(rng.choice(moves))
+    return game
+
+
+class AlphaGoRolloutEngineTest(unittest.TestCase):
+    def test_eye_mask(self):
+        for seed in range(5):
+            game = random_game(7, 30, seed)
+            padded = alphago_rollout._padded_colors([game, game])
+            for player in (Player.black, Player.white):
+                to_move = np.full((2, 1, 1), player.value, dtype=np.uint8)
+                mask = alphago_rollout._eye_mask(padded, to_move)[0]
+                expected = [
+                    [is_point_an_eye(game.board, Point(r, c), player)
+                     for c in range(1, 8)] for r in range(1, 8)]
+                self.assertEqual(expected, mask.tolist())
+
+    def test_network_rollouts_are_batched(self):
+        agent = FakeAgent(25)
+        engine = AlphaGoRolloutEngine(NetworkRolloutPolicy(agent))
+        start = GameState.new_game(5)
+        values = engine.values([start] * 6, rollout_limit=10)
+        self.assertEqual((6,), values.shape)
+        self.assertEqual(10, agent.calls)
+        self.assertEqual(60, engine.num_moves)
+        for state in agent.seen[6:]:
+            self.assertTrue(
+                state.previous_state.is_valid_move(state.last_move))
+            if state.last_move.is_play:
+                self.assertFalse(is_point_an_eye(
+                    state.previous_state.board, state.last_move.point,
+                    state.previous_state.next_player))
+
+    def test_finished_rollouts_score(self):
+        agent = FakeAgent(16)
+        engine = AlphaGoRolloutEngine(NetworkRolloutPolicy(agent))
+        over = GameState.new_game(4).apply_move(Move.pass_turn()) \
+            .apply_move(Move.pass_turn())
+        values = engine.values([over])
+        # White wins an empty board on komi, and black is to move.
+        self.assertEqual([-1], values.tolist())
+        self.assertEqual(0, agent.calls)
+        values = engine.values([GameState.new_game(4)], rollout_limit=200)
+        self.assertIn(values[0], (-1, 1))
+
+    def test_pattern_rollouts(self):
+        engine = AlphaGoRolloutEngine(PatternRolloutPolicy(), seed=1)
+        start = random_game(9, 20, 0)
+        values = engine.values([start] * 8, rollout_limit=400)
+        self.assertEqual(8, engine.num_rollouts)
+        self.assertTrue(set(values.tolist()) <= {-1, 1})
+        again = AlphaGoRolloutEngine(PatternRolloutPolicy(), seed=1)
+        self.assertEqual(
+            values.tolist(),
+            again.values([start] * 8, rollout_limit=400).tolist())
+        unfinished = engine.values([start], rollout_limit=2)
+        self.assertEqual([0], unfinished.tolist())
+
+    def test_pattern_weights(self):
+        # .o...
+        # oxo..
+        # .....
+        # The black stone is in atari at 3-2.
+        game = GameState.new_game(5)
+        for move in [Point(2, 2), Point(1, 2), Move.pass_turn(),
+                     Point(2, 1), Move.pass_turn(), Point(2, 3)]:
+            if isinstance(move, Point):
+                move = Move.play(move)
+            game = game.apply_move(move)
+        padded = alphago_rollout._padded_colors([game])
+        to_move = np.array([[[Player.black.value]]], dtype=np.uint8)
+        board = game.board
+        saves = np.zeros((1, 5, 5), dtype=bool)
+        for point in board.capture_points(Player.white):
+            saves[0, point.row - 1, point.col - 1] = True
+        captures = np.zeros((1, 5, 5), dtype=bool)
+        policy = PatternRolloutPolicy()
+        weights = policy.weights(
+            padded, to_move, captures, saves, [(1, 2)]).reshape((5, 5))
+        self.assertEqual(policy.save_weight, weights.max())
+        self.assertEqual(policy.save_weight, weights[2, 1])
+        # Next to the last move.
+        self.assertEqual(policy.response_weight, weights[2, 3])
+        self.assertEqual(1.0, weights[4, 4])
+        # Self-atari in the corner.
+        self.assertEqual(policy.self_atari_weight, weights[0, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,200 @@
+import unittest
+
+import numpy as np
+
+from dlgo.agent.alphago import AlphaGoMCTS, AlphaGoNode, \
+    AsyncAlphaGoMCTS, FastAlphaGoMCTS
+from dlgo.agent.alphago_rollout import NetworkRolloutPolicy, \
+    PatternRolloutPolicy
+from dlgo.budget import SearchBudget
+from dlgo.encoders.oneplane import OnePlaneEncoder
+from dlgo.goboard_fast import GameState, Move
+from dlgo.gotypes import Player, Point
+
+
+class FakePolicyAgent:
+    """Random move probabilities, counting model calls."""
+    def __init__(self, board_size, seed=0):
+        self._encoder = OnePlaneEncoder((board_size, board_size))
+        self.encoder = self._encoder
+        self.rng = np.random.RandomState(seed)
+        self.calls = 0
+
+    def set_eval_cache(self, eval_cache):
+        pass
+
+    def predict(self, game_state):
+        return self.predict_batch([game_state])[0]
+
+    def predict_batch(self, game_states):
+        self.calls += 1
+        num_points = self._encoder.num_points()
+        return self.rng.random_sample((len(game_states), num_points))
+
+
+class FakeValueAgent:
+    """Random values, counting model calls."""
+    def __init__(self, seed=0):
+        self.rng = np.random.RandomState(seed)
+        self.calls = 0
+        self.positions = 0
+
+    def set_eval_cache(self, eval_cache):
+        pass
+
+    def predict(self, game_state):
+        return self.predict_batch([game_state])
+
+    def predict_batch(self, game_states):
+        self.calls += 1
+        self.positions += len(game_states)
+        return self.rng.uniform(-1, 1, len(game_states))
+
+
+def walk(node):
+    nodes = [node]
+    for node in nodes:
+        nodes.extend(node.children.values())
+    return nodes
+
+
+class AsyncAlphaGoMCTSTest(unittest.TestCase):
+    def setUp(self):
+        self.policy = FakePolicyAgent(5)
+        self.value = FakeValueAgent()
+        self.game = GameState.new_game(5)
+
+    def search(self, **kwargs):
+        bot = AsyncAlphaGoMCTS(
+            self.policy, None, self.value, num_simulations=64, depth=10,
+            rollout_limit=30, rollout_policy=PatternRolloutPolicy(),
+            **kwargs)
+        try:
+            move = bot.select_move(self.game)
+        finally:
+            bot.close()
+        return bot, move
+
+    def check_tree(self, root, num_simulations):
+        self.assertEqual(num_simulations, root.visit_count)
+        for node in walk(root):
+            # No virtual loss is left behind.
+            self.assertFalse(node.expanding)
+            if node.visit_count > 0:
+                self.assertLessEqual(abs(node.q_value), 1.0)
+                self.assertAlmostEqual(
+                    node.q_value, node.total_value / node.visit_count)
+            visits = sum(
+                child.visit_count for child in node.children.values())
+            self.assertLessEqual(visits, node.visit_count)
+
+    def test_select_move(self):
+        bot, move = self.search(batch_size=8, num_workers=2)
+        self.assertTrue(self.game.is_valid_move(move))
+        # The root was promoted to the child that was played.
+        self.assertEqual(move, bot.root_state.last_move)
+        self.assertIs(self.game, bot.root_state.previous_state)
+        self.assertGreater(bot.root.visit_count, 0)
+        # Evaluations are batched.
+        self.assertEqual(64, self.value.positions)
+        self.assertLess(self.value.calls, 64)
+
+    def test_virtual_losses_are_reverted(self):
+        bot = AsyncAlphaGoMCTS(
+            self.policy, None, self.value, num_simulations=48, depth=10,
+            rollout_limit=30, rollout_policy=PatternRolloutPolicy(),
+            batch_size=4)
+        try:
+            bot._promote_root(self.game)
+            moves, probabilities = bot.policy_probabilities(self.game)
+            bot.root.expand_children(moves, probabilities)
+            bot.run_search(self.game)
+        finally:
+            bot.close()
+        self.check_tree(bot.root, 48)
+
+    def test_value_or_rollouts_only(self):
+        _, move = self.search(lambda_value=0.0)
+        self.assertTrue(self.game.is_valid_move(move))
+        self.assertGreater(self.value.calls, 0)
+        self.value.calls = 0
+        _, move = self.search(lambda_value=1.0)
+        self.assertTrue(self.game.is_valid_move(move))
+        self.assertEqual(0, self.value.calls)
+
+    def test_rollout_processes(self):
+        _, move = self.search(rollout_processes=2)
+        self.assertTrue(self.game.is_valid_move(move))
+
+    def test_budget(self):
+        bot = AsyncAlphaGoMCTS(
+            self.policy, None, self.value, rollout_limit=10,
+            rollout_policy=PatternRolloutPolicy(),
+            budget=SearchBudget(max_rounds=20), batch_size=16)
+        try:
+            bot._promote_root(self.game)
+            moves, probabilities = bot.policy_probabilities(self.game)
+            bot.root.expand_children(moves, probabilities)
+            bot.run_search(self.game)
+        finally:
+            bot.close()
+        self.assertEqual(20, bot.root.visit_count)
+
+
+class AlphaGoMCTSTest(unittest.TestCase):
+    def test_select_move(self):
+        bot = AlphaGoMCTS(
+            FakePolicyAgent(5), FakePolicyAgent(5, seed=1), FakeValueAgent(),
+            num_simulations=10, depth=5, rollout_limit=20)
+        game = GameState.new_game(5)
+        move = bot.select_move(game)
+        self.assertTrue(game.is_valid_move(move))
+
+
+class FastAlphaGoMCTSTest(unittest.TestCase):
+    def test_pattern_rollouts(self):
+        bot = FastAlphaGoMCTS(
+            FakePolicyAgent(5), None, FakeValueAgent(), num_simulations=10,
+            depth=5, rollout_limit=20, rollout_policy=PatternRolloutPolicy())
+        game = GameState.new_game(5)
+        move = bot.select_move(game)
+        self.assertTrue(game.is_valid_move(move))
+
+    def test_rollout_values_are_for_the_player_to_move(self):
+        # White fills the board but for two eyes while black passes.
+        # With white to move, white passes too, which ends the game:
+        # a win for white, the player to move where the rollout starts.
+        game = GameState.new_game(5)
+        eyes = [Point(1, 1), Point(5, 5)]
+        for row in range(1, 6):
+            for col in range(1, 6):
+                if Point(row, col) not in eyes:
+                    game = game.apply_move(Move.pass_turn())
+                    game = game.apply_move(Move.play(Point(row, col)))
+        game = game.apply_move(Move.pass_turn())
+        self.assertEqual(Player.white, game.next_player)
+        for rollout_policy in (
+                PatternRolloutPolicy(),
+                NetworkRolloutPolicy(FakePolicyAgent(5))):
+            bot = FastAlphaGoMCTS(
+                FakePolicyAgent(5), None, FakeValueAgent(),
+                rollout_limit=5, rollout_policy=rollout_policy)
+            self.assertEqual(1, bot.policy_rollout(game))
+
+    def test_update_values_of_a_long_path(self):
+        root = AlphaGoNode()
+        node = root
+        for _ in range(5000):
+            node.expand_children(['move'], [1.0])
+            node = node.children['move']
+        FastAlphaGoMCTS.update_values(node, 1.0)
+        FastAlphaGoMCTS.update_values(node, 0.5)
+        self.assertEqual(2, root.visit_count)
+        self.assertEqual(2, node.visit_count)
+        self.assertEqual(1.25, node.q_value)
+        self.assertAlmostEqual(
+            5 * np.sqrt(2) / 3, node.u_value)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,12 @@
 # tag::helpersimport[]
 from dlgo.gotypes import Point
 # end::helpersimport[]
+import copy
 
 __all__ = [
+    'detached_state',
     'is_point_an_eye',
+    'moves_since',
 ]
 
 
@@ -42,3 +45,42 @@ def is_point_an_eye(board, point, color):
 # <4> Point is on the edge or corner.
 # <5> Point is in the middle.
 # end::eye[]
+
+
+def _same_situation(state, other):
+    return state is other or (
+        state.next_player == other.next_player and
+        state.board.zobrist_hash() == other.board.zobrist_hash())
+
+
+def moves_since(earlier_state, game_state, max_moves=2):
+    """Return the list of moves that lead from earlier_state to
+    game_state, or None if game_state does not follow earlier_state
+    within max_moves moves.
+
+    States are compared by position and player to move, so a copy of
+    the game kept elsewhere (e.g. by a GTP frontend) still matches.
+    """
+    moves = []
+    state = game_state
+    while not _same_situation(state, earlier_state):
+        if len(moves) == max_moves or state.last_move is None or \
+                state.previous_state is None:
+            return None
+        moves.append(state.last_move)
+        state = state.previous_state
+    moves.reverse()
+    return moves
+
+
+def detached_state(game_state):
+    """Copy of a game state that keeps only the previous state needed by
+    is_over(), so that it pickles cheaply. The situation history for
+    superko is kept.
+    """
+    state = copy.copy(game_state)
+    if state.previous_state is not None:
+        previous = copy.copy(state.previous_state)
+        previous.previous_state = None
+        state.previous_state = previous
+    return state
@@ -1,6 +1,7 @@
 import unittest
 
-from dlgo.agent.helpers import is_point_an_eye
+from dlgo.agent.helpers import is_point_an_eye, moves_since
+from dlgo import goboard_fast
 from dlgo.goboard import Board
 from dlgo.gotypes import Player, Point
 
@@ -35,5 +36,20 @@ class EyeTest(unittest.TestCase):
         self.assertTrue(is_point_an_eye(board, Point(3, 3), Player.black))
 
 
+class MovesSinceTest(unittest.TestCase):
+    def test_moves_since(self):
+        start = goboard_fast.GameState.new_game(9)
+        ours = goboard_fast.Move.play(Point(3, 3))
+        theirs = goboard_fast.Move.play(Point(7, 7))
+        after = start.apply_move(ours).apply_move(theirs)
+        self.assertEqual([ours, theirs], moves_since(start, after))
+        self.assertEqual([], moves_since(after, after))
+        self.assertIsNone(moves_since(after, start))
+        self.assertIsNone(moves_since(start, after, max_moves=1))
+        # A separately built copy of the game matches too.
+        copy = goboard_fast.GameState.new_game(9).apply_move(ours)
+        self.assertEqual([theirs], moves_since(copy, after))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -10,10 +10,13 @@ __all__ = ['FastRandomBot']
 
 
 class FastRandomBot(Agent):
-    def __init__(self):
+    def __init__(self, rng=None):
         Agent.__init__(self)
         self.dim = None
         self.point_cache = []
+        # A np.random.RandomState to draw moves from; the global NumPy
+        # random state if None.
+        self.rng = rng if rng is not None else np.random
 
     def _update_cache(self, dim):
         self.dim = dim
@@ -29,13 +32,12 @@ class FastRandomBot(Agent):
         if dim != self.dim:
             self._update_cache(dim)
 
-        idx = np.arange(len(self.point_cache))
-        np.random.shuffle(idx)
+        idx = np.flatnonzero(game_state.legal_move_mask())
+        self.rng.shuffle(idx)
         for i in idx:
             p = self.point_cache[i]
-            if game_state.is_valid_move(Move.play(p)) and \
-                    not is_point_an_eye(game_state.board,
-                                        p,
-                                        game_state.next_player):
+            if not is_point_an_eye(game_state.board,
+                                   p,
+                                   game_state.next_player):
                 return Move.play(p)
         return Move.pass_turn()
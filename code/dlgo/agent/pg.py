@@ -8,6 +8,7 @@ from dlgo.agent.helpers import is_point_an_eye
 from dlgo import encoders
 from dlgo import goboard
 from dlgo import kerasutil
+from dlgo.evalcache import cached_predict, cached_predict_batch
 
 __all__ = [
     'PolicyAgent',
@@ -37,11 +38,27 @@ class PolicyAgent(Agent):
         self._encoder = encoder
         self._collector = None
         self._temperature = 0.0
-
-    def predict(self, game_state):
-        encoded_state = self._encoder.encode(game_state)
-        input_tensor = np.array([encoded_state])
-        return self._model.predict(input_tensor)[0]
+        self._eval_cache = None
+
+    def predict(self, game_state, board_tensor=None):
+        model_input = None
+        if board_tensor is not None:
+            model_input = np.array([board_tensor])
+        return cached_predict(
+            self._eval_cache, game_state, self._encoder.encode_batch,
+            self._model.predict, 'priors', model_input)
+
+    def predict_batch(self, game_states):
+        """Like predict, for many game states with a single call to the
+        model. Returns a (len(game_states), num_points) array."""
+        num_points = self._encoder.board_width * self._encoder.board_height
+        move_probs = np.zeros((len(game_states), num_points))
+        outputs = cached_predict_batch(
+            self._eval_cache, game_states, self._encoder.encode_batch,
+            self._model.predict, 'priors')
+        for i, probs in enumerate(outputs):
+            move_probs[i] = probs
+        return move_probs
 
     def set_temperature(self, temperature):
         self._temperature = temperature
@@ -49,18 +66,20 @@ class PolicyAgent(Agent):
     def set_collector(self, collector):
         self._collector = collector
 
+    def set_eval_cache(self, eval_cache):
+        self._eval_cache = eval_cache
+
     def select_move(self, game_state):
         num_moves = self._encoder.board_width * self._encoder.board_height
 
         board_tensor = self._encoder.encode(game_state)
-        x = np.array([board_tensor])
 
         if np.random.random() < self._temperature:
             # Explore random moves.
             move_probs = np.ones(num_moves) / num_moves
         else:
             # Follow our current policy.
-            move_probs = self._model.predict(x)[0]
+            move_probs = self.predict(game_state, board_tensor)
 
         # Prevent move probs from getting stuck at 0 or 1.
         eps = 1e-5
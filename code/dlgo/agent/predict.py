@@ -7,6 +7,7 @@ from dlgo import encoders
 from dlgo import goboard
 from dlgo import kerasutil
 # end::dl_agent_imports[]
+from dlgo.evalcache import cached_predict, cached_predict_batch
 __all__ = [
     'DeepLearningAgent',
     'load_prediction_agent',
@@ -19,13 +20,17 @@ class DeepLearningAgent(Agent):
         Agent.__init__(self)
         self.model = model
         self.encoder = encoder
+        self.eval_cache = None
 # end::dl_agent_init[]
 
+    def set_eval_cache(self, eval_cache):
+        self.eval_cache = eval_cache
+
 # tag::dl_agent_predict[]
     def predict(self, game_state):
-        encoded_state = self.encoder.encode(game_state)
-        input_tensor = np.array([encoded_state])
-        return self.model.predict(input_tensor)[0]
+        return cached_predict(
+            self.eval_cache, game_state, self.encoder.encode_batch,
+            self.model.predict, 'priors')
 
     def select_move(self, game_state):
         num_moves = self.encoder.board_width * self.encoder.board_height
@@ -58,6 +63,18 @@ class DeepLearningAgent(Agent):
 # <4> If no legal and non-self-destructive moves are left, pass.
 # end::dl_agent_candidates[]
 
+    def predict_batch(self, game_states):
+        """Like predict, for many game states with a single call to the
+        model. Returns a (len(game_states), num_points) array."""
+        num_points = self.encoder.board_width * self.encoder.board_height
+        move_probs = np.zeros((len(game_states), num_points))
+        outputs = cached_predict_batch(
+            self.eval_cache, game_states, self.encoder.encode_batch,
+            self.model.predict, 'priors')
+        for i, probs in enumerate(outputs):
+            move_probs[i] = probs
+        return move_probs
+
 # tag::dl_agent_serialize[]
     def serialize(self, h5file):
         h5file.create_group('encoder')
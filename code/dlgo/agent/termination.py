@@ -70,6 +70,14 @@ class TerminationAgent(Agent):
             return self.agent.select_move(game_state)
 # end::termination_agent[]
 
+    def set_search_budget(self, budget):
+        if hasattr(self.agent, 'set_search_budget'):
+            self.agent.set_search_budget(budget)
+
+    def ponder(self, game_state, budget):
+        if hasattr(self.agent, 'ponder'):
+            self.agent.ponder(game_state, budget)
+
 
 # tag::get_termination[]
 def get(termination):
@@ -0,0 +1,135 @@
+import heapq
+import time
+
+__all__ = [
+    'BudgetTracker',
+    'SearchBudget',
+    'visit_lead',
+]
+
+
+def visit_lead(visit_counts):
+    """How many visits the most visited move is ahead of the runner-up."""
+    top = heapq.nlargest(2, visit_counts)
+    if not top:
+        return 0
+    if len(top) == 1:
+        return top[0]
+    return top[0] - top[1]
+
+
+class SearchBudget:
+    """Limits for one search, shared by the tree search agents.
+
+    A search stops at the first limit it reaches: max_rounds rounds,
+    max_seconds of wall-clock time, or max_nodes new tree nodes. With
+    early_stop, it also stops once the most visited root move is further
+    ahead than the number of rounds the remaining budget allows, since
+    the choice of move can no longer change. Limits set to None are
+    ignored; at least one round is always searched.
+
+    stop_event, for instance a threading.Event, lets another thread end
+    the search: once it is set, the search stops before its next round,
+    even the first.
+    """
+    def __init__(self, max_rounds=None, max_seconds=None, max_nodes=None,
+                 early_stop=False, stop_event=None):
+        self.max_rounds = max_rounds
+        self.max_seconds = max_seconds
+        self.max_nodes = max_nodes
+        self.early_stop = early_stop
+        self.stop_event = stop_event
+
+    def start(self):
+        return BudgetTracker(self)
+
+    def split(self, num_parts):
+        """Budget for each of num_parts searches running side by side."""
+        def share(limit):
+            if limit is None:
+                return None
+            return max(1, limit // num_parts)
+        return SearchBudget(
+            max_rounds=share(self.max_rounds),
+            max_seconds=self.max_seconds,
+            max_nodes=share(self.max_nodes),
+            early_stop=self.early_stop,
+            stop_event=self.stop_event)
+
+    def __repr__(self):
+        return 'SearchBudget(max_rounds=%r, max_seconds=%r, ' \
+            'max_nodes=%r, early_stop=%r)' % (
+                self.max_rounds, self.max_seconds, self.max_nodes,
+                self.early_stop)
+
+
+class BudgetTracker:
+    """Progress of a single search against a SearchBudget."""
+    # Re-examine the root visit counts for early stopping at most this
+    # often, in rounds.
+    check_interval = 8
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.start_time = time.time()
+        self.rounds = 0
+        self.nodes = 0
+        self._next_check = self.check_interval
+
+    def record(self, rounds=1, nodes=1):
+        self.rounds += rounds
+        self.nodes += nodes
+
+    def elapsed(self):
+        return time.time() - self.start_time
+
+    def remaining_rounds(self, elapsed=None):
+        """Upper bound on the rounds left, or None if unbounded."""
+        budget = self.budget
+        bounds = []
+        if budget.max_rounds is not None:
+            bounds.append(budget.max_rounds - self.rounds)
+        if budget.max_nodes is not None:
+            # Rounds add at most as many nodes as they did on average
+            # so far, and at least one.
+            nodes_per_round = max(1.0, self.nodes / max(1, self.rounds))
+            bounds.append(
+                int((budget.max_nodes - self.nodes) / nodes_per_round))
+        if budget.max_seconds is not None and self.rounds > 0:
+            if elapsed is None:
+                elapsed = self.elapsed()
+            rate = self.rounds / max(elapsed, 1e-6)
+            bounds.append(int(rate * (budget.max_seconds - elapsed)))
+        if not bounds:
+            return None
+        return max(0, min(bounds))
+
+    def exhausted(self, root_visit_counts=None):
+        """Should the search stop before the next round?
+
+        root_visit_counts is an optional callable returning the visit
+        counts of the root's moves; it is only called when early
+        stopping needs them.
+        """
+        budget = self.budget
+        if budget.stop_event is not None and budget.stop_event.is_set():
+            return True
+        if self.rounds == 0:
+            return False
+        if budget.max_rounds is not None and self.rounds >= budget.max_rounds:
+            return True
+        if budget.max_nodes is not None and self.nodes >= budget.max_nodes:
+            return True
+        elapsed = None
+        if budget.max_seconds is not None:
+            elapsed = self.elapsed()
+            if elapsed >= budget.max_seconds:
+                return True
+        if budget.early_stop and root_visit_counts is not None and \
+                self.rounds >= self._next_check:
+            self._next_check = self.rounds + self.check_interval
+            remaining = self.remaining_rounds(elapsed)
+            if remaining is not None and \
+                    visit_lead(root_visit_counts()) > remaining:
+                return True
+        return False
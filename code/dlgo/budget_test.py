@@ -0,0 +1,75 @@
+import threading
+import time
+import unittest
+
+from dlgo.budget import SearchBudget, visit_lead
+
+
+class SearchBudgetTest(unittest.TestCase):
+    def test_max_rounds(self):
+        tracker = SearchBudget(max_rounds=3).start()
+        rounds = 0
+        while not tracker.exhausted():
+            tracker.record()
+            rounds += 1
+        self.assertEqual(3, rounds)
+
+    def test_max_nodes(self):
+        tracker = SearchBudget(max_nodes=10).start()
+        while not tracker.exhausted():
+            tracker.record(nodes=4)
+        self.assertEqual(3, tracker.rounds)
+
+    def test_max_seconds(self):
+        tracker = SearchBudget(max_seconds=0.05).start()
+        while not tracker.exhausted():
+            tracker.record()
+            time.sleep(0.01)
+        self.assertGreaterEqual(tracker.elapsed(), 0.05)
+        self.assertLess(tracker.elapsed(), 0.5)
+
+    def test_always_one_round(self):
+        tracker = SearchBudget(max_seconds=0).start()
+        self.assertFalse(tracker.exhausted())
+        tracker.record()
+        self.assertTrue(tracker.exhausted())
+
+    def test_early_stop(self):
+        tracker = SearchBudget(max_rounds=100, early_stop=True).start()
+        # One move gets every visit: after 56 rounds it leads by more
+        # than the 44 rounds left.
+        while not tracker.exhausted(lambda: [tracker.rounds, 0]):
+            tracker.record()
+        self.assertEqual(56, tracker.rounds)
+
+        tracker = SearchBudget(max_rounds=100, early_stop=True).start()
+        while not tracker.exhausted(lambda: [tracker.rounds // 2] * 2):
+            tracker.record()
+        self.assertEqual(100, tracker.rounds)
+
+    def test_stop_event(self):
+        stop = threading.Event()
+        tracker = SearchBudget(stop_event=stop).start()
+        for _ in range(5):
+            self.assertFalse(tracker.exhausted())
+            tracker.record()
+        stop.set()
+        self.assertTrue(tracker.exhausted())
+        # Even before the first round.
+        self.assertTrue(SearchBudget(stop_event=stop).start().exhausted())
+        self.assertIs(stop, SearchBudget(stop_event=stop).split(2).stop_event)
+
+    def test_split(self):
+        budget = SearchBudget(max_rounds=100, max_seconds=2.0).split(4)
+        self.assertEqual(25, budget.max_rounds)
+        self.assertEqual(2.0, budget.max_seconds)
+        self.assertIsNone(budget.max_nodes)
+
+    def test_visit_lead(self):
+        self.assertEqual(0, visit_lead([]))
+        self.assertEqual(5, visit_lead([5]))
+        self.assertEqual(3, visit_lead([1, 7, 4]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,5 @@
 from .generator import *
 from .index_processor import *
+from .packing import *
 from .parallel_processor import *
 from .sampling import *
@@ -1,8 +1,9 @@
 # tag::data_generator[]
-import glob
 import numpy as np
 from keras.utils import to_categorical
 
+from dlgo.data.packing import example_files, load_features
+
 
 class DataGenerator:
     def __init__(self, data_directory, samples):
@@ -27,12 +28,10 @@ class DataGenerator:
     def _generate(self, batch_size, num_classes):
         for zip_file_name in self.files:
             file_name = zip_file_name.replace('.tar.gz', '') + 'train'
-            base = self.data_directory + '/' + file_name + '_features_*.npy'
-            for feature_file in glob.glob(base):
-                label_file = feature_file.replace('features', 'labels')
-                x = np.load(feature_file)
+            base = self.data_directory + '/' + file_name
+            for feature_file, label_file in example_files(base):
+                x = load_features(feature_file)
                 y = np.load(label_file)
-                x = x.astype('float32')
                 y = to_categorical(y.astype(int), num_classes)
                 while x.shape[0] >= batch_size:
                     x_batch, x = x[:batch_size], x[batch_size:]
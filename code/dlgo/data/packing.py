@@ -0,0 +1,100 @@
+"""Bit-packed storage of encoded planes.
+
+Encoders whose planes hold nothing but 0 and 1, or -1, 0 and 1, declare
+so in Encoder.plane_schema. Their encodings are stored with one bit per
+point and binary plane, and two bits per point and signed plane: one
+for +1, one for -1. Packed feature files are .npz archives of
+
+    packed: (num_examples, num_bytes) uint8 array of packed bits
+    shape: shape of the unpacked features
+    schema: the plane schema, as an array
+
+next to the .npy files of the labels. Feature files of encoders without
+a schema stay plain .npy arrays.
+"""
+import glob
+import os.path
+
+import numpy as np
+
+from dlgo.encoders.base import BINARY_PLANE, SIGNED_PLANE
+
+__all__ = [
+    'example_files',
+    'load_features',
+    'pack_planes',
+    'save_features',
+    'unpack_planes',
+]
+
+
+def pack_planes(features, schema):
+    """Pack a (num_examples, num_planes, rows, cols) array of planes
+    with the given plane schema into a (num_examples, num_bytes) uint8
+    array."""
+    features = np.asarray(features)
+    schema = np.asarray(schema)
+    if features.ndim != 4 or features.shape[1] != len(schema):
+        raise ValueError(
+            'Cannot pack features of shape %s with a schema of %d planes'
+            % (features.shape, len(schema)))
+    binary = features[:, schema == BINARY_PLANE]
+    signed = features[:, schema == SIGNED_PLANE]
+    if np.any((binary != 0) & (binary != 1)) or \
+            np.any((signed != 0) & (signed != 1) & (signed != -1)):
+        raise ValueError('Features do not match the plane schema')
+    bits = np.concatenate([features > 0, signed < 0], axis=1)
+    return np.packbits(bits.reshape((len(features), -1)), axis=1)
+
+
+def unpack_planes(packed, shape, schema, dtype=np.float32, out=None):
+    """Unpack the output of pack_planes into an array of shape
+    (len(packed),) + shape; into out if it is given."""
+    schema = np.asarray(schema)
+    num_planes = len(schema)
+    signed = np.flatnonzero(schema == SIGNED_PLANE)
+    bit_shape = (len(packed), num_planes + len(signed)) + tuple(shape[1:])
+    bits = np.unpackbits(
+        packed, axis=1, count=int(np.prod(bit_shape[1:]))).reshape(bit_shape)
+    if out is None:
+        out = np.empty((len(packed),) + tuple(shape), dtype=dtype)
+    out[...] = bits[:, :num_planes]
+    if len(signed):
+        out[:, signed] -= bits[:, num_planes:]
+    return out
+
+
+def save_features(file_base, features, schema=None):
+    """Save features to file_base.npz, packed, if there is a plane
+    schema; to file_base.npy otherwise."""
+    if schema is None:
+        np.save(file_base, features)
+    else:
+        np.savez(
+            file_base, packed=pack_planes(features, schema),
+            shape=np.asarray(features.shape[1:]),
+            schema=np.asarray(schema, dtype=np.uint8))
+
+
+def load_features(feature_file, dtype=np.float32):
+    """Load a feature file written by save_features as dtype."""
+    if feature_file.endswith('.npz'):
+        with np.load(feature_file) as data:
+            return unpack_planes(
+                data['packed'], tuple(data['shape']), data['schema'], dtype)
+    return np.load(feature_file).astype(dtype)
+
+
+def example_files(file_prefix):
+    """The (feature file, label file) pairs saved as
+    file_prefix_features_<chunk> and file_prefix_labels_<chunk>. Where
+    a chunk has both a packed and a plain feature file, the packed one
+    is used."""
+    feature_files = {}
+    for feature_file in glob.glob(file_prefix + '_features_*.np[yz]'):
+        base, extension = os.path.splitext(feature_file)
+        if extension == '.npz' or base not in feature_files:
+            feature_files[base] = feature_file
+    return [
+        (feature_file, base.replace('features', 'labels') + '.npy')
+        for base, feature_file in feature_files.items()]
@@ -0,0 +1,70 @@
+import os.path
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from dlgo import goboard_fast
+from dlgo.data.packing import example_files, load_features, \
+    pack_planes, save_features, unpack_planes
+from dlgo.encoders.base import get_encoder_by_name
+from dlgo.encoders.utils_test import random_games
+
+
+class PackingTest(unittest.TestCase):
+    def setUp(self):
+        self.games = list(random_games(goboard_fast, 9, 2, seed=8))
+        self.data_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def test_round_trip(self):
+        for name in ('oneplane', 'simple', 'sevenplane', 'betago',
+                     'alphago'):
+            encoder = get_encoder_by_name(name, 9)
+            features = encoder.encode_batch(self.games, dtype=np.int8)
+            packed = pack_planes(features, encoder.plane_schema())
+            self.assertEqual(np.uint8, packed.dtype)
+            # At most two bits a point against 64 for float64.
+            self.assertLessEqual(
+                packed.nbytes * 30, features.astype(np.float64).nbytes)
+            unpacked = unpack_planes(
+                packed, encoder.shape(), encoder.plane_schema())
+            self.assertEqual(np.float32, unpacked.dtype)
+            self.assertTrue(np.array_equal(features, unpacked), name)
+
+    def test_rejects_values_outside_schema(self):
+        encoder = get_encoder_by_name('oneplane', 9)
+        features = encoder.encode_batch(self.games[-1:])
+        with self.assertRaises(ValueError):
+            pack_planes(features, get_encoder_by_name(
+                'sevenplane', 9).plane_schema()[:1])
+
+    def test_files(self):
+        encoder = get_encoder_by_name('simple', 9)
+        features = encoder.encode_batch(self.games)
+        labels = np.arange(len(self.games))
+        prefix = os.path.join(self.data_dir, 'kgs')
+        # An old, unpacked chunk is replaced by a packed one.
+        save_features(prefix + '_features_0', features[:1])
+        save_features(
+            prefix + '_features_0', features, encoder.plane_schema())
+        np.save(prefix + '_labels_0', labels)
+        save_features(prefix + '_features_1', features[:3])
+        np.save(prefix + '_labels_1', labels[:3])
+
+        files = sorted(example_files(prefix))
+        self.assertEqual([
+            (prefix + '_features_0.npz', prefix + '_labels_0.npy'),
+            (prefix + '_features_1.npy', prefix + '_labels_1.npy'),
+        ], files)
+        self.assertTrue(np.array_equal(features, load_features(files[0][0])))
+        self.assertTrue(
+            np.array_equal(features[:3], load_features(files[1][0])))
+        self.assertEqual(np.float32, load_features(files[1][0]).dtype)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,6 @@
 from __future__ import print_function
 from __future__ import absolute_import
 import os
-import glob
 import os.path
 import tarfile
 import gzip
@@ -15,6 +14,7 @@ from dlgo.gosgf import Sgf_game
 from dlgo.goboard_fast import Board, GameState, Move
 from dlgo.gotypes import Player, Point
 from dlgo.data.index_processor import KGSIndex
+from dlgo.data.packing import example_files, load_features, save_features
 from dlgo.data.sampling import Sampler
 from dlgo.data.generator import DataGenerator
 from dlgo.encoders.base import get_encoder_by_name
@@ -74,7 +74,9 @@ class GoDataProcessor:
 
         shape = self.encoder.shape()
         feature_shape = np.insert(shape, 0, np.asarray([total_examples]))
-        features = np.zeros(feature_shape)
+        schema = self.encoder.plane_schema()
+        features = np.zeros(
+            feature_shape, dtype=np.int8 if schema else np.float64)
         labels = np.zeros((total_examples,))
 
         counter = 0
@@ -87,6 +89,7 @@ class GoDataProcessor:
 
             game_state, first_move_done = self.get_handicap(sgf)
 
+            game_states = []
             for item in sgf.main_sequence_iter():
                 color, move_tuple = item.get_move()
                 point = None
@@ -98,11 +101,13 @@ class GoDataProcessor:
                     else:
                         move = Move.pass_turn()
                     if first_move_done and point is not None:
-                        features[counter] = self.encoder.encode(game_state)
+                        game_states.append(game_state)
                         labels[counter] = self.encoder.encode_point(point)
                         counter += 1
                     game_state = game_state.apply_move(move)
                     first_move_done = True
+            self.encoder.encode_batch(
+                game_states, out=features[counter - len(game_states):])
 
         feature_file_base = self.data_dir + '/' + data_file_name + '_features_%d'
         label_file_base = self.data_dir + '/' + data_file_name + '_labels_%d'
@@ -115,7 +120,7 @@ class GoDataProcessor:
             chunk += 1
             current_features, features = features[:chunksize], features[chunksize:]
             current_labels, labels = labels[:chunksize], labels[chunksize:]
-            np.save(feature_file, current_features)
+            save_features(feature_file, current_features, schema)
             np.save(label_file, current_labels)
 
     def consolidate_games(self, name, samples):
@@ -129,12 +134,10 @@ class GoDataProcessor:
         label_list = []
         for file_name in file_names:
             file_prefix = file_name.replace('.tar.gz', '')
-            base = self.data_dir + '/' + file_prefix + '_features_*.npy'
-            for feature_file in glob.glob(base):
-                label_file = feature_file.replace('features', 'labels')
-                x = np.load(feature_file)
+            base = self.data_dir + '/' + file_prefix
+            for feature_file, label_file in example_files(base):
+                x = load_features(feature_file)
                 y = np.load(label_file)
-                x = x.astype('float32')
                 y = to_categorical(y.astype(int), 19 * 19)
                 feature_list.append(x)
                 label_list.append(y)
@@ -4,7 +4,6 @@ from __future__ import absolute_import
 import os.path
 import tarfile
 import gzip
-import glob
 import shutil
 
 import numpy as np
@@ -18,6 +17,7 @@ from dlgo.gotypes import Player, Point
 from dlgo.encoders.base import get_encoder_by_name
 
 from dlgo.data.index_processor import KGSIndex
+from dlgo.data.packing import example_files, load_features, save_features
 from dlgo.data.sampling import Sampler  # <1>
 # <1> Sampler will be used to sample training and test data from files.
 # end::dlgo_imports[]
@@ -90,7 +90,9 @@ class GoDataProcessor:
 
         shape = self.encoder.shape()  # <2>
         feature_shape = np.insert(shape, 0, np.asarray([total_examples]))
-        features = np.zeros(feature_shape)
+        schema = self.encoder.plane_schema()
+        features = np.zeros(
+            feature_shape, dtype=np.int8 if schema else np.float64)
         labels = np.zeros((total_examples,))
 
         counter = 0
@@ -103,6 +105,7 @@ class GoDataProcessor:
 
             game_state, first_move_done = self.get_handicap(sgf)  # <4>
 
+            game_states = []
             for item in sgf.main_sequence_iter():  # <5>
                 color, move_tuple = item.get_move()
                 point = None
@@ -114,11 +117,13 @@ class GoDataProcessor:
                     else:
                         move = Move.pass_turn()  # <7>
                     if first_move_done and point is not None:
-                        features[counter] = self.encoder.encode(game_state)  # <8>
+                        game_states.append(game_state)  # <8>
                         labels[counter] = self.encoder.encode_point(point)  # <9>
                         counter += 1
                     game_state = game_state.apply_move(move)  # <10>
                     first_move_done = True
+            self.encoder.encode_batch(
+                game_states, out=features[counter - len(game_states):])
 # <1> Determine the total number of moves in all games in this zip file.
 # <2> Infer the shape of features and labels from the encoder we use.
 # <3> Read the SGF content as string, after extracting the zip file.
@@ -126,7 +131,7 @@ class GoDataProcessor:
 # <5> Iterate over all moves in the SGF file.
 # <6> Read the coordinates of the stone to be played...
 # <7> ... or pass, if there is none.
-# <8> We encode the current game state as features...
+# <8> We collect the current game state, to encode all of a game's states as features in one go...
 # <9> ... and the next move as label for the features.
 # <10> Afterwards the move is applied to the board and we proceed with the next one.
 # end::read_sgf_files[]
@@ -143,7 +148,7 @@ class GoDataProcessor:
             chunk += 1
             current_features, features = features[:chunksize], features[chunksize:]
             current_labels, labels = labels[:chunksize], labels[chunksize:]  # <2>
-            np.save(feature_file, current_features)
+            save_features(feature_file, current_features, schema)
             np.save(label_file, current_labels)  # <3>
 # <1> We process features and labels in chunks of size 1024.
 # <2> The current chunk is cut off from features and labels...
@@ -162,12 +167,10 @@ class GoDataProcessor:
         label_list = []
         for file_name in file_names:
             file_prefix = file_name.replace('.tar.gz', '')
-            base = self.data_dir + '/' + file_prefix + '_features_*.npy'
-            for feature_file in glob.glob(base):
-                label_file = feature_file.replace('features', 'labels')
-                x = np.load(feature_file)
+            base = self.data_dir + '/' + file_prefix
+            for feature_file, label_file in example_files(base):
+                x = load_features(feature_file)
                 y = np.load(label_file)
-                x = x.astype('float32')
                 y = to_categorical(y.astype(int), 19 * 19)
                 feature_list.append(x)
                 label_list.append(y)
@@ -1,10 +1,10 @@
-from dlgo.encoders.base import Encoder
-from dlgo.encoders.utils import is_ladder_escape, is_ladder_capture
-from dlgo.gotypes import Point, Player
-from dlgo.goboard_fast import Move
-from dlgo.agent.helpers_fast import is_point_an_eye
 import numpy as np
 
+from dlgo.encoders.alphago_features import alphago_features
+from dlgo.encoders.base import BINARY_PLANE, Encoder, batch_buffer
+from dlgo.encoders.ladder import LadderReader
+from dlgo.gotypes import Point, Player
+
 """
 Feature name            num of planes   Description
 Stone colour            3               Player stone / opponent stone / empty
@@ -18,6 +18,7 @@ Capture size            8               How many opponent stones would be captur
 Self-atari size         8               How many of own stones would be captured
 Ladder capture          1               Whether a move at this point is a successful ladder capture
 Ladder escape           1               Whether a move at this point is a successful ladder escape
+Player colour           1               Whether the current player is black (with use_player_plane)
 """
 
 FEATURE_OFFSETS = {
@@ -45,74 +46,47 @@ class AlphaGoEncoder(Encoder):
         self.board_width, self.board_height = board_size
         self.use_player_plane = use_player_plane
         self.num_planes = 48 + use_player_plane
+        # Encoding the positions of a game in order lets the reader
+        # reuse the ladders it read.
+        self.ladder_reader = LadderReader()
 
     def name(self):
         return 'alphago'
 
     def encode(self, game_state):
-        board_tensor = np.zeros((self.num_planes, self.board_height, self.board_width))
-        for r in range(self.board_height):
-            for c in range(self.board_width):
-                point = Point(row=r + 1, col=c + 1)
-
-                go_string = game_state.board.get_go_string(point)
-                if go_string and go_string.color == game_state.next_player:
-                    board_tensor[offset("stone_color")][r][c] = 1
-                elif go_string and go_string.color == game_state.next_player.other:
-                    board_tensor[offset("stone_color") + 1][r][c] = 1
-                else:
-                    board_tensor[offset("stone_color") + 2][r][c] = 1
-
-                board_tensor[offset("ones")] = self.ones()
-                board_tensor[offset("zeros")] = self.zeros()
-
-                if not is_point_an_eye(game_state.board, point, game_state.next_player):
-                    board_tensor[offset("sensibleness")][r][c] = 1
-
-                ages = min(game_state.board.move_ages.get(r, c), 8)
-                if ages > 0:
-                    print(ages)
-                    board_tensor[offset("turns_since") + ages][r][c] = 1
-
-                if game_state.board.get_go_string(point):
-                    liberties = min(game_state.board.get_go_string(point).num_liberties, 8)
-                    board_tensor[offset("liberties") + liberties][r][c] = 1
-
-                move = Move(point)
-                if game_state.is_valid_move(move):
-                    new_state = game_state.apply_move(move)
-                    liberties = min(new_state.board.get_go_string(point).num_liberties, 8)
-                    board_tensor[offset("liberties_after") + liberties][r][c] = 1
-
-                    adjacent_strings = [game_state.board.get_go_string(nb)
-                                        for nb in point.neighbors()]
-                    capture_count = 0
-                    for go_string in adjacent_strings:
-                        other_player = game_state.next_player.other
-                        if go_string and go_string.num_liberties == 1 and go_string.color == other_player:
-                            capture_count += len(go_string.stones)
-                    capture_count = min(capture_count, 8)
-                    board_tensor[offset("capture_size") + capture_count][r][c] = 1
-
-                if go_string and go_string.num_liberties == 1:
-                    go_string = game_state.board.get_go_string(point)
-                    if go_string:
-                        num_atari_stones = min(len(go_string.stones), 8)
-                        board_tensor[offset("self_atari_size") + num_atari_stones][r][c] = 1
-
-                if is_ladder_capture(game_state, point):
-                    board_tensor[offset("ladder_capture")][r][c] = 1
-
-                if is_ladder_escape(game_state, point):
-                    board_tensor[offset("ladder_escape")][r][c] = 1
-
-                if self.use_player_plane:
-                    if game_state.next_player == Player.black:
-                        board_tensor[offset("ones")] = self.ones()
-                    else:
-                        board_tensor[offset("zeros")] = self.zeros()
-
-        return board_tensor
+        return self.encode_batch([game_state], dtype=np.float64)[0]
+
+    def encode_batch(self, game_states, out=None, dtype=np.float32):
+        board_tensors = batch_buffer(
+            self.shape(), len(game_states), out, dtype)
+        for board_tensor, game_state in zip(board_tensors, game_states):
+            self._encode_into(game_state, board_tensor)
+        return board_tensors
+
+    def _encode_into(self, game_state, board_tensor):
+        features = alphago_features(game_state, self.ladder_reader)
+        player = game_state.next_player
+        colors = features.colors
+        board_tensor[offset("stone_color")] = colors == player.value
+        board_tensor[offset("stone_color") + 1] = colors == player.other.value
+        board_tensor[offset("stone_color") + 2] = colors == 0
+        board_tensor[offset("ones")] = 1
+        board_tensor[offset("sensibleness")] = features.sensibleness
+        _one_hot(board_tensor, offset("turns_since"), features.turns_since, 1)
+        _one_hot(board_tensor, offset("liberties"), features.liberties, 1)
+        _one_hot(board_tensor, offset("liberties_after"),
+                 features.liberties_after, 1)
+        # Legal moves that capture nothing are on the first plane.
+        legal = features.liberties_after > 0
+        _one_hot(board_tensor, offset("capture_size"),
+                 np.where(legal, features.capture_size + 1, 0), 1)
+        _one_hot(board_tensor, offset("self_atari_size"),
+                 features.self_atari_size, 1)
+        board_tensor[offset("ladder_capture")] = features.ladder_capture
+        board_tensor[offset("ladder_escape")] = features.ladder_escape
+        if self.use_player_plane:
+            board_tensor[offset("current_player_color")] = \
+                player == Player.black
 
     def ones(self):
         return np.ones((1, self.board_height, self.board_width))
@@ -138,6 +112,17 @@ class AlphaGoEncoder(Encoder):
     def shape(self):
         return self.num_planes, self.board_height, self.board_width
 
+    def plane_schema(self):
+        return [BINARY_PLANE] * self.num_planes
+
+
+def _one_hot(board_tensor, first_plane, values, first_value):
+    """Set plane first_plane + min(v, first_value + 7) - first_value
+    of board_tensor where values holds v >= first_value."""
+    values = np.minimum(values, first_value + 7) - first_value
+    counts = np.arange(8).reshape((8, 1, 1))
+    board_tensor[first_plane:first_plane + 8] = values == counts
+
 
 def create(board_size):
     return AlphaGoEncoder(board_size)
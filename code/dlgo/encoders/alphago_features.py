@@ -0,0 +1,215 @@
+"""Per-point features of the AlphaGo policy and value networks.
+
+alphago_features computes them from the string and liberty bookkeeping
+of the board: what a move would do to liberties and captures follows
+from the strings next to it, without playing it on a board copy. Only
+the ladder features read moves ahead, with a LadderReader, and only
+from points next to strings with one or two liberties.
+"""
+import collections
+
+import numpy as np
+
+from dlgo.encoders.ladder import LadderReader
+from dlgo.encoders.utils import board_arrays
+from dlgo.gotypes import Point
+
+__all__ = [
+    'AlphaGoFeatures',
+    'alphago_features',
+]
+
+# Every field is a (num_rows, num_cols) array. The move features,
+# liberties_after to ladder_escape, are 0 or False where the next
+# player may not play.
+AlphaGoFeatures = collections.namedtuple('AlphaGoFeatures', [
+    'colors',           # Player.value of the stones, 0 if empty
+    'sensibleness',     # legal and does not fill an own eye
+    'turns_since',      # turns since the stone was played, 1 to 8 (8+)
+    'liberties',        # liberties of the string on the point
+    'liberties_after',  # liberties of the string a move would make
+    'capture_size',     # opponent stones a move would capture
+    'self_atari_size',  # own stones a move would leave in atari
+    'ladder_capture',   # a move captures in a ladder
+    'ladder_escape',    # a move escapes a ladder
+])
+
+_tables = {}
+
+
+def _get_tables(num_rows, num_cols):
+    """Points and neighbor indices by row major index."""
+    dim = (num_rows, num_cols)
+    if dim not in _tables:
+        points = [
+            Point(row=r, col=c)
+            for r in range(1, num_rows + 1)
+            for c in range(1, num_cols + 1)]
+        neighbors = []
+        for point in points:
+            neighbors.append([
+                (n.row - 1) * num_cols + n.col - 1 for n in point.neighbors()
+                if 1 <= n.row <= num_rows and 1 <= n.col <= num_cols])
+        _tables[dim] = (points, neighbors)
+    return _tables[dim]
+
+
+def alphago_features(game_state, ladder_reader=None):
+    """Return the AlphaGoFeatures of game_state for its next player.
+
+    Passing the same ladder_reader for the positions of a game lets it
+    reuse the ladders it read before.
+    """
+    board = game_state.board
+    num_rows, num_cols = board.num_rows, board.num_cols
+    shape = (num_rows, num_cols)
+    arrays = board_arrays(game_state)
+    legal = game_state.legal_move_mask()
+    player = game_state.next_player
+
+    liberties_after = np.zeros(num_rows * num_cols, dtype=np.int32)
+    capture_size = np.zeros_like(liberties_after)
+    self_atari_size = np.zeros_like(liberties_after)
+    candidates = _read_moves(
+        board, player, arrays, np.flatnonzero(legal).tolist(),
+        liberties_after, capture_size, self_atari_size)
+
+    if candidates:
+        if ladder_reader is None:
+            ladder_reader = LadderReader()
+        ladder_captures, ladder_escapes = ladder_reader.read(
+            game_state, candidates)
+    else:
+        ladder_captures = np.zeros(shape, dtype=bool)
+        ladder_escapes = np.zeros(shape, dtype=bool)
+
+    return AlphaGoFeatures(
+        colors=arrays.colors,
+        sensibleness=legal & ~_own_eyes(arrays.colors, player.value),
+        turns_since=_turns_since(game_state, arrays.colors),
+        liberties=arrays.liberties,
+        liberties_after=liberties_after.reshape(shape),
+        capture_size=capture_size.reshape(shape),
+        self_atari_size=self_atari_size.reshape(shape),
+        ladder_capture=ladder_captures,
+        ladder_escape=ladder_escapes)
+
+
+def _read_moves(board, player, arrays, legal_indices,
+                liberties_after, capture_size, self_atari_size):
+    """Fill in the move features of the legal points from the strings
+    around them. Returns the points to read ladders from as a list of
+    (index, try capture, try escape)."""
+    num_cols = board.num_cols
+    points, neighbor_table = _get_tables(board.num_rows, num_cols)
+    colors = arrays.colors.ravel().tolist()
+    string_ids = arrays.string_ids.ravel().tolist()
+    liberty_counts = arrays.liberties.ravel().tolist()
+    own = player.value
+    strings = {}
+
+    def string_at(idx):
+        string_id = string_ids[idx]
+        string = strings.get(string_id)
+        if string is None:
+            string = strings[string_id] = board.get_go_string(points[idx])
+        return string
+
+    candidates = []
+    for idx in legal_indices:
+        num_empty = 0
+        # By string id, a neighbor in the string.
+        friends = {}
+        captured = {}
+        try_capture = try_escape = False
+        for neighbor in neighbor_table[idx]:
+            color = colors[neighbor]
+            if color == 0:
+                num_empty += 1
+                continue
+            num_liberties = liberty_counts[neighbor]
+            if color == own:
+                friends[string_ids[neighbor]] = neighbor
+                try_escape |= num_liberties == 1
+            else:
+                if num_liberties == 1:
+                    captured[string_ids[neighbor]] = neighbor
+                try_capture |= num_liberties == 2
+                try_escape |= num_liberties == 1
+
+        if not friends and not captured:
+            # The common case: a lone stone on an open point.
+            num_liberties = num_empty
+            size = 1
+        else:
+            point = points[idx]
+            stones = {point}
+            liberties = set(
+                points[n] for n in neighbor_table[idx] if colors[n] == 0)
+            for neighbor in friends.values():
+                string = string_at(neighbor)
+                stones.update(string.stones)
+                liberties.update(string.liberties)
+            liberties.discard(point)
+            for neighbor in captured.values():
+                string = string_at(neighbor)
+                capture_size[idx] += len(string.stones)
+                # Captured stones next to the new string become its
+                # liberties.
+                for stone in string.stones:
+                    stone_idx = (stone.row - 1) * num_cols + stone.col - 1
+                    if any(points[n] in stones
+                           for n in neighbor_table[stone_idx]):
+                        liberties.add(stone)
+            num_liberties = len(liberties)
+            size = len(stones)
+
+        liberties_after[idx] = num_liberties
+        if num_liberties == 1:
+            self_atari_size[idx] = size
+        if try_capture or try_escape:
+            candidates.append((idx, try_capture, try_escape))
+    return candidates
+
+
+def _own_eyes(colors, own):
+    """Empty points whose neighbors are all own stones and that enough
+    diagonals back up, like dlgo.agent.helpers.is_point_an_eye."""
+    off_board = 3
+    padded = np.pad(colors, 1, constant_values=off_board)
+    num_rows, num_cols = colors.shape
+
+    def shifted(dr, dc):
+        return padded[1 + dr:1 + dr + num_rows, 1 + dc:1 + dc + num_cols]
+
+    eyes = colors == 0
+    for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+        neighbor = shifted(dr, dc)
+        eyes &= (neighbor == own) | (neighbor == off_board)
+    friendly = np.zeros(colors.shape, dtype=np.int32)
+    outside = np.zeros(colors.shape, dtype=np.int32)
+    for dr, dc in ((-1, -1), (-1, 1), (1, -1), (1, 1)):
+        corner = shifted(dr, dc)
+        friendly += corner == own
+        outside += corner == off_board
+    # On the edge all corners on the board must be ours, in the middle
+    # three of four.
+    return eyes & np.where(outside > 0, outside + friendly == 4, friendly >= 3)
+
+
+def _turns_since(game_state, colors):
+    """Turns since each stone was played, from the last seven moves;
+    8 for older stones, including handicap stones."""
+    turns = np.zeros(colors.shape, dtype=np.int32)
+    state = game_state
+    for age in range(1, 8):
+        if state is None or state.last_move is None:
+            break
+        move = state.last_move
+        if move.is_play:
+            row, col = move.point.row - 1, move.point.col - 1
+            if colors[row, col] != 0 and turns[row, col] == 0:
+                turns[row, col] = age
+        state = state.previous_state
+    turns[(colors != 0) & (turns == 0)] = 8
+    return turns
@@ -1,9 +1,118 @@
 import unittest
 
+import numpy as np
+
+from dlgo import goboard_array, goboard_fast
 from dlgo.agent.helpers import is_point_an_eye
+from dlgo.encoders.alphago import AlphaGoEncoder, offset
+from dlgo.encoders.alphago_features import alphago_features
+from dlgo.encoders.utils_test import ko_game, random_games
 from dlgo.goboard_fast import Board, GameState, Move
 from dlgo.gotypes import Player, Point
-from dlgo.encoders.alphago import AlphaGoEncoder
+
+
+def setup_position(black, white, next_player=Player.black, board_size=9):
+    board = Board(board_size, board_size)
+    for player, stones in ((Player.black, black), (Player.white, white)):
+        for stone in stones:
+            board.place_stone(player, Point(*stone))
+    return GameState(board, next_player, None, None)
+
+
+def reference_features(game_state):
+    """The move features, computed like the original AlphaGoEncoder
+    did: by playing every legal move on a copy of the board."""
+    board = game_state.board
+    shape = (board.num_rows, board.num_cols)
+    player = game_state.next_player
+    features = {
+        name: np.zeros(shape, dtype=np.int32)
+        for name in ('liberties', 'liberties_after', 'capture_size',
+                     'self_atari_size', 'sensibleness')}
+    legal_moves = game_state.legal_move_mask()
+    opponent_stones = np.count_nonzero(
+        board.color_array() == player.other.value)
+    for r in range(board.num_rows):
+        for c in range(board.num_cols):
+            point = Point(row=r + 1, col=c + 1)
+            go_string = board.get_go_string(point)
+            if go_string is not None:
+                features['liberties'][r, c] = go_string.num_liberties
+            if not legal_moves[r][c]:
+                continue
+            if not is_point_an_eye(board, point, player):
+                features['sensibleness'][r, c] = 1
+            new_board = game_state.apply_move(Move.play(point)).board
+            new_string = new_board.get_go_string(point)
+            features['liberties_after'][r, c] = new_string.num_liberties
+            features['capture_size'][r, c] = opponent_stones - \
+                np.count_nonzero(
+                    new_board.color_array() == player.other.value)
+            if new_string.num_liberties == 1:
+                features['self_atari_size'][r, c] = len(new_string.stones)
+    return features
+
+
+class AlphaGoFeaturesTest(unittest.TestCase):
+    def test_matches_board_copies(self):
+        games = list(random_games(goboard_fast, 7, 3, seed=4))
+        games.extend(random_games(goboard_array, 5, 2, seed=5))
+        games.append(ko_game(goboard_fast))
+        for game in games:
+            features = alphago_features(game)
+            for name, expected in reference_features(game).items():
+                self.assertEqual(
+                    expected.tolist(),
+                    np.asarray(getattr(features, name), dtype=int).tolist(),
+                    name)
+
+    def test_turns_since(self):
+        game = GameState.new_game(5)
+        for move in [(1, 1), (2, 2), None, (3, 3)]:
+            if move is None:
+                game = game.apply_move(Move.pass_turn())
+            else:
+                game = game.apply_move(Move.play(Point(*move)))
+        turns = alphago_features(game).turns_since
+        self.assertEqual(1, turns[2, 2])
+        self.assertEqual(3, turns[1, 1])
+        self.assertEqual(4, turns[0, 0])
+        self.assertEqual(3, np.count_nonzero(turns))
+
+    def test_ladder_capture(self):
+        # Black (10, 11) chases the white stone towards the lower left,
+        # black (11, 10) towards the upper right.
+        black = [(9, 10), (10, 9), (11, 11)]
+        game = setup_position(black, [(10, 10)], board_size=19)
+        features = alphago_features(game)
+        self.assertEqual(
+            [[9, 10], [10, 9]],
+            np.argwhere(features.ladder_capture).tolist())
+        # A white stone in its path breaks a ladder.
+        broken = setup_position(black, [(10, 10), (15, 5)], board_size=19)
+        self.assertEqual(
+            [[10, 9]],
+            np.argwhere(alphago_features(broken).ladder_capture).tolist())
+
+    def test_ladder_escape(self):
+        white = [(9, 10), (10, 9), (11, 11), (10, 11)]
+        game = setup_position([(10, 10)], white, board_size=19)
+        self.assertFalse(alphago_features(game).ladder_escape.any())
+        broken = setup_position([(10, 10), (15, 5)], white, board_size=19)
+        self.assertEqual(
+            [[10, 9]],
+            np.argwhere(alphago_features(broken).ladder_escape).tolist())
+
+    def test_reader_leaves_board_alone(self):
+        game = setup_position(
+            [(10, 10), (15, 5)], [(9, 10), (10, 9), (11, 11), (10, 11)],
+            board_size=19)
+        board = goboard_array.Board.from_color_array(
+            game.board.color_array())
+        state = goboard_array.GameState(board, Player.black, None, None)
+        alphago_features(state)
+        self.assertEqual(
+            game.board.zobrist_hash(), state.board.zobrist_hash())
 
 
 class AlphaGoEncoderTest(unittest.TestCase):
@@ -12,15 +121,42 @@ class AlphaGoEncoderTest(unittest.TestCase):
 
         start = GameState.new_game(19)
         next_state = start.apply_move(Move.play(Point(16, 16)))
-        alphago.encode(next_state)
-
-        self.assertEquals(alphago.name(), 'alphago')
-        self.assertEquals(alphago.board_height, 19)
-        self.assertEquals(alphago.board_width, 19)
-        self.assertEquals(alphago.num_planes, 49)
-        self.assertEquals(alphago.shape(), (49, 19, 19))
+        encoded = alphago.encode(next_state)
 
+        self.assertEqual(alphago.name(), 'alphago')
+        self.assertEqual(alphago.board_height, 19)
+        self.assertEqual(alphago.board_width, 19)
+        self.assertEqual(alphago.num_planes, 49)
+        self.assertEqual(alphago.shape(), (49, 19, 19))
+        self.assertEqual((49, 19, 19), encoded.shape)
+        # White to move: the opponent's stone, turns since 1, four
+        # liberties.
+        self.assertEqual(1, encoded[offset('stone_color') + 1, 15, 15])
+        self.assertEqual(1, encoded[offset('turns_since'), 15, 15])
+        self.assertEqual(1, encoded[offset('liberties') + 3, 15, 15])
+        self.assertEqual(0, encoded[offset('current_player_color')].max())
+        self.assertEqual(19 * 19, encoded[offset('ones')].sum())
+        self.assertEqual(0, encoded[offset('zeros')].sum())
+        # Every legal move is on one liberties after and one capture
+        # size plane.
+        legal = next_state.legal_move_mask()
+        for feature in ('liberties_after', 'capture_size'):
+            planes = encoded[offset(feature):offset(feature) + 8]
+            self.assertEqual(legal.tolist(), (planes.sum(0) == 1).tolist())
+            self.assertEqual(0, planes.sum(0)[~legal].max())
 
+    def test_one_hot_planes(self):
+        game = setup_position(
+            [(9, 10), (10, 9), (11, 11)], [(10, 10)], board_size=19)
+        encoded = AlphaGoEncoder().encode_batch([game])[0]
+        self.assertEqual(1, encoded[offset('current_player_color')].min())
+        self.assertEqual(1, encoded[offset('ladder_capture'), 9, 10])
+        # Black on (10, 11) joins (11, 11) into a string with five
+        # liberties.
+        self.assertEqual(1, encoded[offset('liberties_after') + 4, 9, 10])
+        self.assertEqual(1, encoded[offset('capture_size'), 9, 10])
+        self.assertEqual(0, encoded[offset('self_atari_size'):
+                                    offset('self_atari_size') + 8].sum())
 
 if __name__ == '__main__':
     unittest.main()
@@ -2,11 +2,21 @@
 import importlib
 # end::importlib[]
 
+import numpy as np
+
 __all__ = [
+    'BINARY_PLANE',
     'Encoder',
+    'SIGNED_PLANE',
+    'batch_buffer',
     'get_encoder_by_name',
 ]
 
+# The kinds of values a plane of an encoding holds, see
+# Encoder.plane_schema.
+BINARY_PLANE = 0    # 0 or 1
+SIGNED_PLANE = 1    # -1, 0 or 1
+
 
 # tag::base_encoder[]
 class Encoder:
@@ -36,6 +46,46 @@ class Encoder:
 # <6> Shape of the encoded board structure.
 # end::base_encoder[]
 
+    def encode_batch(self, game_states, out=None, dtype=np.float32):
+        """Encode game_states into one array of shape
+        (len(game_states),) + self.shape().
+
+        The encodings are written into out if it is given, see
+        batch_buffer; otherwise into a new array of the given dtype.
+        """
+        out = batch_buffer(self.shape(), len(game_states), out, dtype)
+        for i, game_state in enumerate(game_states):
+            out[i] = self.encode(game_state)
+        return out
+
+    def plane_schema(self):
+        """The kind of values of each plane, a list of BINARY_PLANE and
+        SIGNED_PLANE; None if the planes hold other values.
+
+        Encodings with a schema can be stored bit-packed, see
+        dlgo.data.packing.
+        """
+        return None
+
+
+def batch_buffer(shape, num_states, out=None, dtype=np.float32):
+    """Return a zeroed array for num_states encodings of the given
+    shape to be written into.
+
+    That is out[:num_states] if out is given, so a buffer with more rows
+    can be reused from batch to batch; its dtype wins over dtype.
+    """
+    shape = (num_states,) + tuple(shape)
+    if out is None:
+        return np.zeros(shape, dtype=dtype)
+    if out.shape[1:] != shape[1:] or len(out) < num_states:
+        raise ValueError(
+            'Cannot encode %d positions of shape %s into an array of '
+            'shape %s' % (num_states, shape[1:], out.shape))
+    out = out[:num_states]
+    out[...] = 0
+    return out
+
 
 # tag::encoder_by_name[]
 def get_encoder_by_name(name, board_size):  # <1>
@@ -0,0 +1,77 @@
+import unittest
+
+import numpy as np
+
+from dlgo import goboard_fast
+from dlgo.encoders.base import Encoder, batch_buffer, get_encoder_by_name
+from dlgo.encoders.utils_test import ko_game, random_games
+from dlgo.zero.encoder import ZeroEncoder
+
+
+class CountingEncoder(Encoder):
+    """Encodes a position as its number of stones."""
+    def encode(self, game_state):
+        return np.full(self.shape(), np.count_nonzero(
+            game_state.board.color_array()))
+
+    def shape(self):
+        return 1, 2, 2
+
+
+class EncodeBatchTest(unittest.TestCase):
+    def setUp(self):
+        self.games = list(random_games(goboard_fast, 5, 4, seed=3))
+        self.games.append(ko_game(goboard_fast))
+
+    def test_matches_encode(self):
+        encoders = [
+            get_encoder_by_name(name, 5)
+            for name in ('oneplane', 'simple', 'sevenplane', 'betago')]
+        encoders.append(ZeroEncoder(5))
+        for encoder in encoders:
+            expected = np.array([encoder.encode(g) for g in self.games])
+            batch = encoder.encode_batch(self.games)
+            self.assertEqual(np.float32, batch.dtype)
+            self.assertTrue(np.array_equal(expected, batch))
+            single = encoder.encode_batch(self.games[-1:], dtype=np.float16)
+            self.assertEqual(np.float16, single.dtype)
+            self.assertTrue(np.array_equal(expected[-1:], single))
+            self.assertEqual(
+                (0,) + encoder.shape(), encoder.encode_batch([]).shape)
+
+    def test_out(self):
+        encoder = get_encoder_by_name('simple', 5)
+        out = np.full(
+            (len(self.games) + 2,) + encoder.shape(), 7, dtype=np.uint8)
+        batch = encoder.encode_batch(self.games, out=out)
+        self.assertTrue(np.shares_memory(batch, out))
+        self.assertEqual(len(self.games), len(batch))
+        self.assertTrue(np.array_equal(
+            encoder.encode_batch(self.games), out[:len(self.games)]))
+        self.assertTrue((out[len(self.games):] == 7).all())
+        with self.assertRaises(ValueError):
+            encoder.encode_batch(self.games, out=out[:2])
+
+    def test_oneplane_needs_signed_dtype(self):
+        encoder = get_encoder_by_name('oneplane', 5)
+        self.assertEqual(
+            -1, encoder.encode_batch(self.games, dtype=np.int8).min())
+        with self.assertRaises(ValueError):
+            encoder.encode_batch(self.games, dtype=np.uint8)
+
+    def test_default_encode_batch(self):
+        encoder = CountingEncoder()
+        batch = encoder.encode_batch(self.games[:3])
+        self.assertEqual([0, 1, 2], batch[:, 0, 0, 0].tolist())
+
+    def test_batch_buffer(self):
+        out = np.ones((4, 2, 3))
+        self.assertEqual((2, 2, 3), batch_buffer((2, 3), 2, out).shape)
+        self.assertEqual(0, out[:2].sum())
+        self.assertEqual(12, out[2:].sum())
+        with self.assertRaises(ValueError):
+            batch_buffer((3, 2), 2, out)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,337 @@
+"""Ladder reading for the AlphaGo features.
+
+LadderReader plays ladders out on a goboard_array board, making and
+taking back moves in place and keeping the line it reads on a stack
+rather than recursing. In a ladder the attacker keeps the prey in atari;
+the prey escapes once it has three liberties, or two liberties and no
+atari that keeps the ladder going. Ko is ignored.
+
+Every position read is cached by (position hash, prey stone, role). A
+reader follows a game with set_board, and keeps what it read in the
+previous position unless a point near that ladder changed: for every
+query the reader records the points it looked at, and drops the
+results of the query once the color of one of those points, or the
+liberty count of the string on it, is different.
+"""
+import numpy as np
+
+from dlgo import goboard_array
+from dlgo.goboard_array import EMPTY
+from dlgo.gotypes import Point
+
+__all__ = [
+    'LadderReader',
+    'ladder_capture',
+    'ladder_escape',
+]
+
+# Plies to read before giving up on a ladder. A ladder across a 19x19
+# board takes about twice its width.
+MAX_DEPTH = 80
+
+# Who is to move in a position of a ladder.
+CAPTURE = 0     # the attacker, the prey has two liberties
+ESCAPE = 1      # the prey, which is in atari
+
+
+class LadderReader:
+    """Reads ladders for one game at a time.
+
+    The reader keeps its own copy of the board, so the boards and game
+    states it is given are never changed.
+    """
+    def __init__(self, max_depth=MAX_DEPTH, max_entries=200000):
+        self.max_depth = max_depth
+        self.max_entries = max_entries
+        self.board = None
+        self._colors = None
+        self._liberties = None
+        # (hash, prey stone, role) -> (captured, query)
+        self._cache = {}
+        # query -> padded indices of the points its reading looked at
+        self._queries = {}
+        self._next_query = 0
+        self._query = None
+        self._looked_at = None
+
+    def set_board(self, board):
+        """Move the reader to the position of board."""
+        colors = _color_array(board)
+        if self.board is None or colors.shape != self._colors.shape:
+            self.board = goboard_array.Board.from_color_array(colors)
+            self._cache.clear()
+            self._queries.clear()
+        elif not np.array_equal(colors, self._colors):
+            self._follow(colors)
+        else:
+            return
+        self._colors = colors
+        _, self._liberties = self.board.string_arrays()
+
+    def _follow(self, colors):
+        old_hash = self.board.zobrist_hash()
+        old_colors, old_liberties = self._colors, self._liberties
+        if np.any((old_colors != 0) & (colors != old_colors)):
+            # Stones were captured; start over from the colors.
+            self.board = goboard_array.Board.from_color_array(colors)
+        else:
+            on_board = self.board.geometry.on_board
+            for idx in np.flatnonzero(colors != old_colors).tolist():
+                self.board.place_stone_at(
+                    int(colors.flat[idx]), on_board[idx])
+        _, liberties = self.board.string_arrays()
+        on_board = self.board.geometry.on_board
+        changed = set(
+            on_board[idx] for idx in np.flatnonzero(
+                (colors != old_colors) | (liberties != old_liberties)
+            ).tolist())
+
+        if len(self._cache) > self.max_entries:
+            self._cache.clear()
+            self._queries.clear()
+            return
+        # Positions read stay the same away from the changes, so their
+        # hashes all change by the same keys.
+        delta = old_hash ^ self.board.zobrist_hash()
+        stale = set(
+            query for query, looked_at in self._queries.items()
+            if not changed.isdisjoint(looked_at))
+        for query in stale:
+            del self._queries[query]
+        self._cache = {
+            (position_hash ^ delta, prey, role): entry
+            for (position_hash, prey, role), entry in self._cache.items()
+            if entry[1] not in stale}
+
+    def ladder_capture(self, player, point):
+        """Does player's stone at point start a ladder that captures an
+        adjacent opponent string with two liberties?"""
+        board = self.board
+        idx = board.geometry.point_to_index[point]
+        color = player.value
+        if board.color_buffer()[idx] != EMPTY or \
+                not board.playable_buffer(color)[idx]:
+            return False
+        prey = self._neighbor_strings(idx, 3 - color, 2)
+        if not prey:
+            return False
+        self._start_query(idx)
+        board.play_at(color, idx)
+        try:
+            return any(
+                self._search(ESCAPE, stone, color) for stone in prey)
+        finally:
+            board.undo()
+
+    def ladder_escape(self, player, point):
+        """Does player's stone at point save one of the player's strings
+        in atari from a ladder?
+
+        The stone can save a string by extending it, or by capturing an
+        opponent string next to it.
+        """
+        board = self.board
+        idx = board.geometry.point_to_index[point]
+        color = player.value
+        if board.color_buffer()[idx] != EMPTY or \
+                not board.playable_buffer(color)[idx]:
+            return False
+        prey = self._neighbor_strings(idx, color, 1)
+        for stone in self._neighbor_strings(idx, 3 - color, 1):
+            # Capturing this string can save ours next to it.
+            stones, _ = board.string_at(stone)
+            for saved in self._adjacent_strings(stones, color, 1):
+                prey.append(min(board.string_at(saved)[0]))
+        if not prey:
+            return False
+        self._start_query(idx)
+        board.play_at(color, idx)
+        try:
+            return not all(
+                self._search(CAPTURE, stone, 3 - color)
+                for stone in set(prey))
+        finally:
+            board.undo()
+
+    def read(self, game_state, candidates=None):
+        """Read the ladders of every candidate point of game_state for
+        its next player.
+
+        candidates are (index, try capture, try escape) triples, with
+        row major point indices; by default every legal point is tried
+        for both. Returns the ladder capture and ladder escape points as
+        two (num_rows, num_cols) bool arrays.
+        """
+        self.set_board(game_state.board)
+        player = game_state.next_player
+        shape = self._colors.shape
+        if candidates is None:
+            candidates = [
+                (idx, True, True) for idx in
+                np.flatnonzero(game_state.legal_move_mask()).tolist()]
+        captures = np.zeros(shape, dtype=bool)
+        escapes = np.zeros(shape, dtype=bool)
+        index_to_point = self.board.geometry.index_to_point
+        on_board = self.board.geometry.on_board
+        for idx, try_capture, try_escape in candidates:
+            point = index_to_point[on_board[idx]]
+            if try_capture:
+                captures.flat[idx] = self.ladder_capture(player, point)
+            if try_escape:
+                escapes.flat[idx] = self.ladder_escape(player, point)
+        return captures, escapes
+
+    def _start_query(self, idx):
+        self._query = query = self._next_query
+        self._next_query += 1
+        self._looked_at = self._queries[query] = set()
+        self._looked_at.add(idx)
+        self._looked_at.update(self.board.geometry.neighbors[idx])
+
+    def _neighbor_strings(self, idx, color, num_liberties):
+        """One stone of each string of color next to idx with
+        num_liberties liberties, the lowest index of the string."""
+        board = self.board
+        colors = board.color_buffer()
+        found = []
+        seen = set()
+        for neighbor in board.geometry.neighbors[idx]:
+            if neighbor in seen or colors[neighbor] != color or \
+                    board.num_liberties_at(neighbor) != num_liberties:
+                continue
+            stones, _ = board.string_at(neighbor)
+            seen.update(stones)
+            found.append(min(stones))
+        return found
+
+    def _adjacent_strings(self, stones, color, num_liberties):
+        """One stone of each string of color next to stones with
+        num_liberties liberties."""
+        board = self.board
+        colors = board.color_buffer()
+        neighbors = board.geometry.neighbors
+        heads = []
+        found = []
+        for stone in stones:
+            for neighbor in neighbors[stone]:
+                if colors[neighbor] != color or \
+                        board.num_liberties_at(neighbor) != num_liberties:
+                    continue
+                head = board.string_head(neighbor)
+                if head not in heads:
+                    heads.append(head)
+                    found.append(neighbor)
+        return found
+
+    def _search(self, role, prey, attacker):
+        """Can the attacker capture the string on prey, with role to
+        move? The board is left as it was found."""
+        board = self.board
+        colors = board.color_buffer()
+        playable = [None, board.playable_buffer(1), board.playable_buffer(2)]
+        neighbors = board.geometry.neighbors
+        looked_at = self._looked_at
+        # Frames are [role, player to move, moves, next move, depth,
+        # exact, cache key]. A result is exact unless the depth limit
+        # cut the reading short; only exact results are cached.
+        stack = []
+        result = self._open(role, prey, attacker, self.max_depth, stack)
+        while stack:
+            frame = stack[-1]
+            if result is not None:
+                # Back from the position after the last move tried.
+                board.undo()
+                captured, exact = result
+                result = None
+                # The prey escapes if one of its moves works, and is
+                # captured if one of the attacker's moves works.
+                if captured == (frame[0] == CAPTURE):
+                    result = self._close(stack, captured, exact)
+                    continue
+                frame[5] = frame[5] and exact
+            role, player, moves = frame[0], frame[1], frame[2]
+            while frame[3] < len(moves):
+                move = moves[frame[3]]
+                frame[3] += 1
+                if colors[move] != EMPTY or not playable[player][move]:
+                    continue
+                board.play_at(player, move)
+                looked_at.add(move)
+                looked_at.update(neighbors[move])
+                result = self._open(
+                    ESCAPE if role == CAPTURE else CAPTURE,
+                    prey, attacker, frame[4] - 1, stack)
+                break
+            else:
+                # Out of moves: the side to move failed.
+                result = self._close(stack, role == ESCAPE, frame[5])
+        return result[0]
+
+    def _open(self, role, prey, attacker, depth, stack):
+        """Evaluate a position at once if possible and return (captured,
+        exact); otherwise push its frame on the stack and return None."""
+        board = self.board
+        num_liberties = board.num_liberties_at(prey)
+        if role == CAPTURE and num_liberties != 2:
+            return num_liberties == 1, True
+        if role == ESCAPE and num_liberties != 1:
+            return False, True
+        key = (board.zobrist_hash(), prey, role)
+        entry = self._cache.get(key)
+        if entry is not None:
+            captured, query = entry
+            if query != self._query:
+                self._looked_at.update(self._queries[query])
+            return captured, True
+        if depth <= 0:
+            return False, False
+
+        stones, moves = board.string_at(prey)
+        looked_at = self._looked_at
+        neighbors = board.geometry.neighbors
+        for stone in stones:
+            looked_at.add(stone)
+            looked_at.update(neighbors[stone])
+        if role == ESCAPE:
+            # Extend, or capture an attacker string next to the prey.
+            for stone in self._adjacent_strings(stones, attacker, 1):
+                _, liberties = board.string_at(stone)
+                moves.extend(liberties)
+            player = 3 - attacker
+        else:
+            player = attacker
+        stack.append([role, player, moves, 0, depth, True, key])
+        return None
+
+    def _close(self, stack, captured, exact):
+        """Pop the frame of a finished position and return its result."""
+        frame = stack.pop()
+        if exact:
+            self._cache[frame[6]] = (captured, self._query)
+        return captured, exact
+
+
+def ladder_capture(board, player, point, max_depth=MAX_DEPTH):
+    """LadderReader.ladder_capture on its own, for a single point."""
+    reader = LadderReader(max_depth)
+    reader.set_board(board)
+    return reader.ladder_capture(player, point)
+
+
+def ladder_escape(board, player, point, max_depth=MAX_DEPTH):
+    """LadderReader.ladder_escape on its own, for a single point."""
+    reader = LadderReader(max_depth)
+    reader.set_board(board)
+    return reader.ladder_escape(player, point)
+
+
+def _color_array(board):
+    if hasattr(board, 'color_array'):
+        return board.color_array()
+    colors = np.zeros((board.num_rows, board.num_cols), dtype=np.uint8)
+    for r in range(board.num_rows):
+        for c in range(board.num_cols):
+            stone = board.get(Point(row=r + 1, col=c + 1))
+            if stone is not None:
+                colors[r, c] = stone.value
+    return colors
@@ -0,0 +1,92 @@
+import unittest
+
+import numpy as np
+
+from dlgo import goboard_fast
+from dlgo.encoders.alphago_test import setup_position
+from dlgo.encoders.ladder import LadderReader
+from dlgo.encoders.utils import is_ladder_capture, is_ladder_escape
+from dlgo.encoders.utils_test import random_games
+from dlgo.goboard_fast import Move
+from dlgo.gotypes import Point
+
+LADDER = [(9, 10), (10, 9), (11, 11)]
+
+
+def play_all(game, moves):
+    for move in moves:
+        game = game.apply_move(Move.play(Point(*move)))
+    return game
+
+
+class CountingReader(LadderReader):
+    """Counts the moves the reader plays."""
+    num_moves = 0
+    counted_board = None
+
+    def set_board(self, board):
+        super().set_board(board)
+        if self.board is self.counted_board:
+            return
+        self.counted_board = self.board
+        play_at = self.board.play_at
+
+        def counted(color, idx):
+            self.num_moves += 1
+            play_at(color, idx)
+
+        self.board.play_at = counted
+
+
+class LadderReaderTest(unittest.TestCase):
+    def test_ladder(self):
+        game = setup_position(LADDER, [(10, 10)], board_size=19)
+        captures, escapes = LadderReader().read(game)
+        self.assertEqual([[9, 10], [10, 9]], np.argwhere(captures).tolist())
+        self.assertFalse(escapes.any())
+        self.assertTrue(is_ladder_capture(game, Point(10, 11)))
+        self.assertFalse(is_ladder_capture(game, Point(12, 10)))
+        self.assertFalse(is_ladder_escape(
+            game.apply_move(Move.play(Point(10, 11))), Point(11, 10)))
+
+    def test_reuses_reading_away_from_changes(self):
+        game = setup_position(LADDER, [(10, 10)], board_size=19)
+        reader = CountingReader()
+        expected = reader.read(game)
+        first = reader.num_moves
+        # Far from the ladder nothing needs to be read again, only the
+        # candidate moves are played.
+        game = play_all(game, [(3, 3), (17, 17)])
+        reader.num_moves = 0
+        for expected_plane, plane in zip(expected, reader.read(game)):
+            self.assertEqual(expected_plane.tolist(), plane.tolist())
+        self.assertEqual(2, reader.num_moves)
+        self.assertGreater(first, 10)
+        # A white stone in its path breaks one of the ladders.
+        game = play_all(game, [(3, 4), (15, 5)])
+        captures, _ = reader.read(game)
+        self.assertEqual([[10, 9]], np.argwhere(captures).tolist())
+
+    def test_matches_fresh_readers(self):
+        # One reader following each game, against a new reader per
+        # position.
+        for size, seed in ((9, 6), (13, 7)):
+            reader = LadderReader()
+            for game in random_games(goboard_fast, size, 3, seed):
+                for expected, plane in zip(
+                        LadderReader().read(game), reader.read(game)):
+                    self.assertEqual(expected.tolist(), plane.tolist())
+
+    def test_leaves_board_alone(self):
+        game = setup_position(LADDER, [(10, 10)], board_size=19)
+        reader = LadderReader()
+        reader.read(game)
+        self.assertEqual(
+            game.board.zobrist_hash(), reader.board.zobrist_hash())
+        self.assertEqual(
+            game.board.color_array().tolist(),
+            reader.board.color_array().tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
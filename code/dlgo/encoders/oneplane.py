@@ -1,7 +1,8 @@
 # tag::oneplane_imports[]
 import numpy as np
 
-from dlgo.encoders.base import Encoder
+from dlgo.encoders.base import SIGNED_PLANE, Encoder, batch_buffer
+from dlgo.encoders.utils import stack_board_arrays
 from dlgo.goboard import Point
 # end::oneplane_imports[]
 
@@ -16,20 +17,22 @@ class OnePlaneEncoder(Encoder):
         return 'oneplane'
 
     def encode(self, game_state):  # <2>
-        board_matrix = np.zeros(self.shape())
-        next_player = game_state.next_player
-        for r in range(self.board_height):
-            for c in range(self.board_width):
-                p = Point(row=r + 1, col=c + 1)
-                go_string = game_state.board.get_go_string(p)
-                if go_string is None:
-                    continue
-                if go_string.color == next_player:
-                    board_matrix[0, r, c] = 1
-                else:
-                    board_matrix[0, r, c] = -1
+        return self.encode_batch([game_state], dtype=np.float64)[0]
+
+    def encode_batch(self, game_states, out=None, dtype=np.float32):
+        board_matrix = batch_buffer(self.shape(), len(game_states), out, dtype)
+        if np.issubdtype(board_matrix.dtype, np.unsignedinteger):
+            raise ValueError('oneplane encodes opponent stones as -1')
+        arrays, next_players = stack_board_arrays(
+            game_states, self.shape()[1:])
+        stones = arrays.colors != 0
+        board_matrix[:, 0] = np.where(
+            arrays.colors == next_players, 1, -1) * stones
         return board_matrix
 
+    def plane_schema(self):
+        return [SIGNED_PLANE]
+
 # <1> We can reference this encoder by the name "oneplane".
 # <2> To encode, we fill a matrix with 1 if the point contains one of the current player's stones, -1 if the point contains the opponent's stones and 0 if the point is empty.
 # end::oneplane_encoder[]
@@ -1,8 +1,9 @@
 # tag::sevenplane_init[]
 import numpy as np
 
-from dlgo.encoders.base import Encoder
-from dlgo.goboard import Move, Point
+from dlgo.encoders.base import BINARY_PLANE, Encoder, batch_buffer
+from dlgo.encoders.utils import fill_liberty_planes, stack_board_arrays
+from dlgo.goboard import Point
 
 
 class SevenPlaneEncoder(Encoder):
@@ -16,24 +17,24 @@ class SevenPlaneEncoder(Encoder):
 
 # tag::sevenplane_encode[]
     def encode(self, game_state):
-        board_tensor = np.zeros(self.shape())
-        base_plane = {game_state.next_player: 0,
-                      game_state.next_player.other: 3}
-        for row in range(self.board_height):
-            for col in range(self.board_width):
-                p = Point(row=row + 1, col=col + 1)
-                go_string = game_state.board.get_go_string(p)
-                if go_string is None:
-                    if game_state.does_move_violate_ko(game_state.next_player,
-                                                       Move.play(p)):
-                        board_tensor[6][row][col] = 1  # <1>
-                else:
-                    liberty_plane = min(3, go_string.num_liberties) - 1
-                    liberty_plane += base_plane[go_string.color]
-                    board_tensor[liberty_plane][row][col] = 1  # <2>
+        return self.encode_batch([game_state], dtype=np.float64)[0]
+
+    def encode_batch(self, game_states, out=None, dtype=np.float32):
+        board_tensor = batch_buffer(
+            self.shape(), len(game_states), out, dtype)
+        arrays, next_players = stack_board_arrays(
+            game_states, self.shape()[1:])
+        stones = arrays.colors != 0
+        board_tensor[:, 6] = arrays.ko  # <1>
+        fill_liberty_planes(
+            board_tensor, 0, arrays.colors == next_players,
+            arrays.liberties, 3)  # <2>
+        fill_liberty_planes(
+            board_tensor, 3, stones & (arrays.colors != next_players),
+            arrays.liberties, 3)
         return board_tensor
 # <1> Encoding moves prohibited by the ko rule
-# <2> Encoding black and white stones with 1, 2 or more liberties.
+# <2> Encoding our and the opponent's stones with 1, 2 or more liberties.
 # end::sevenplane_encode[]
 
 # tag::sevenplane_rest[]
@@ -51,6 +52,9 @@ class SevenPlaneEncoder(Encoder):
     def shape(self):
         return self.num_planes, self.board_height, self.board_width
 
+    def plane_schema(self):
+        return [BINARY_PLANE] * self.num_planes
+
 
 def create(board_size):
     return SevenPlaneEncoder(board_size)
@@ -1,7 +1,7 @@
 import numpy as np
 
-from dlgo.encoders.base import Encoder
-from dlgo.goboard import Move
+from dlgo.encoders.base import BINARY_PLANE, Encoder, batch_buffer
+from dlgo.encoders.utils import fill_liberty_planes, stack_board_arrays
 from dlgo.gotypes import Player, Point
 
 
@@ -23,26 +23,22 @@ class SimpleEncoder(Encoder):
         return 'simple'
 
     def encode(self, game_state):
-        board_tensor = np.zeros(self.shape())
-        if game_state.next_player == Player.black:
-            board_tensor[8] = 1
-        else:
-            board_tensor[9] = 1
-        for r in range(self.board_height):
-            for c in range(self.board_width):
-                p = Point(row=r + 1, col=c + 1)
-                go_string = game_state.board.get_go_string(p)
-
-                if go_string is None:
-                    if game_state.does_move_violate_ko(game_state.next_player,
-                                                       Move.play(p)):
-                        board_tensor[10][r][c] = 1
-                else:
-                    liberty_plane = min(4, go_string.num_liberties) - 1
-                    if go_string.color == Player.white:
-                        liberty_plane += 4
-                    board_tensor[liberty_plane][r][c] = 1
+        return self.encode_batch([game_state], dtype=np.float64)[0]
 
+    def encode_batch(self, game_states, out=None, dtype=np.float32):
+        board_tensor = batch_buffer(
+            self.shape(), len(game_states), out, dtype)
+        arrays, next_players = stack_board_arrays(
+            game_states, self.shape()[1:])
+        fill_liberty_planes(
+            board_tensor, 0, arrays.colors == Player.black.value,
+            arrays.liberties, 4)
+        fill_liberty_planes(
+            board_tensor, 4, arrays.colors == Player.white.value,
+            arrays.liberties, 4)
+        board_tensor[:, 8] = next_players == Player.black.value
+        board_tensor[:, 9] = next_players == Player.white.value
+        board_tensor[:, 10] = arrays.ko
         return board_tensor
 
     def encode_point(self, point):
@@ -62,6 +58,9 @@ class SimpleEncoder(Encoder):
     def shape(self):
         return self.num_planes, self.board_height, self.board_width
 
+    def plane_schema(self):
+        return [BINARY_PLANE] * self.num_planes
+
 
 def create(board_size):
     return SimpleEncoder(board_size)
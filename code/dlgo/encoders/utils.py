@@ -1,107 +1,100 @@
+import numpy as np
+
+from dlgo.encoders.ladder import ladder_capture, ladder_escape
 from dlgo.goboard import Move
+from dlgo.goboard_fast import BoardArrays
+from dlgo.gotypes import Point
 
 
 def is_ladder_capture(game_state, candidate, recursion_depth=50):
-    return is_ladder(True, game_state, candidate, None, recursion_depth)
+    """Does the next player's stone at the point candidate capture an
+    adjacent string in a ladder? See dlgo.encoders.ladder."""
+    if not game_state.is_valid_move(Move.play(candidate)):
+        return False
+    return ladder_capture(
+        game_state.board, game_state.next_player, candidate,
+        recursion_depth)
 
 
 def is_ladder_escape(game_state, candidate, recursion_depth=50):
-    return is_ladder(False, game_state, candidate, None, recursion_depth)
-
-
-def is_ladder(try_capture, game_state, candidate,
-              ladder_stones=None, recursion_depth=50):
-    """Ladders are played out in reversed roles, one player tries to capture,
-    the other to escape. We determine the ladder status by recursively calling
-    is_ladder in opposite roles, providing suitable capture or escape candidates.
-
-    Arguments:
-    try_capture: boolean flag to indicate if you want to capture or escape the ladder
-    game_state: current game state, instance of GameState
-    candidate: a move that potentially leads to escaping the ladder or capturing it, instance of Move
-    ladder_stones: the stones to escape or capture, list of Point. Will be inferred if not provided.
-    recursion_depth: when to stop recursively calling this function, integer valued.
-
-    Returns True if game state is a ladder and try_capture is true (the ladder captures)
-    or if game state is not a ladder and try_capture is false (you can successfully escape)
-    and False otherwise.
-    """
-
-    if not game_state.is_valid_move(Move(candidate)) or not recursion_depth:
+    """Does the next player's stone at the point candidate save a
+    string in atari from a ladder? See dlgo.encoders.ladder."""
+    if not game_state.is_valid_move(Move.play(candidate)):
         return False
+    return ladder_escape(
+        game_state.board, game_state.next_player, candidate,
+        recursion_depth)
 
-    next_player = game_state.next_player
-    capture_player = next_player if try_capture else next_player.other
-    escape_player = capture_player.other
-
-    if ladder_stones is None:
-        ladder_stones = guess_ladder_stones(game_state, candidate, escape_player)
-
-    for ladder_stone in ladder_stones:
-        current_state = game_state.apply_move(candidate)
-
-        if try_capture:
-            candidates = determine_escape_candidates(
-                game_state, ladder_stone, capture_player)
-            attempted_escapes = [  # now try to escape
-                is_ladder(False, current_state, escape_candidate,
-                          ladder_stone, recursion_depth - 1)
-                for escape_candidate in candidates]
 
-            if not any(attempted_escapes):
-                return True  # if at least one escape fails, we capture
-        else:
-            if count_liberties(current_state, ladder_stone) >= 3:
-                return True  # successful escape
-            if count_liberties(current_state, ladder_stone) == 1:
-                continue  # failed escape, others might still do
-            candidates = liberties(current_state, ladder_stone)
-            attempted_captures = [  # now try to capture
-                is_ladder(True, current_state, capture_candidate,
-                          ladder_stone, recursion_depth - 1)
-                for capture_candidate in candidates]
-            if any(attempted_captures):
-                continue  # failed escape, try others
-            return True  # candidate can't be caught in a ladder, escape.
-    return False  # no captures / no escapes
+def board_arrays(game_state):
+    """Return game_state.board_arrays(), see goboard_fast.GameState.
 
-
-def is_candidate(game_state, move, player):
-    return game_state.next_player == player and \
-        count_liberties(game_state, move) == 2
-
-
-def guess_ladder_stones(game_state, move, escape_player):
-    adjacent_strings = [game_state.board.get_go_string(nb) for nb in move.neighbors() if game_state.board.get_go_string(nb)]
-    if adjacent_strings:
-        string = adjacent_strings[0]
-        neighbors = []
-        for string in adjacent_strings:
-            stones = string.stones
-            for stone in stones:
-                neighbors.append(stone)
-        return [Move(nb) for nb in neighbors if is_candidate(game_state, Move(nb), escape_player)]
+    Game states without it, like those of dlgo.goboard, get the same
+    snapshot built point by point.
+    """
+    if hasattr(game_state, 'board_arrays'):
+        return game_state.board_arrays()
+    board = game_state.board
+    shape = (board.num_rows, board.num_cols)
+    colors = np.zeros(shape, dtype=np.uint8)
+    string_ids = np.zeros(shape, dtype=np.int32)
+    liberties = np.zeros(shape, dtype=np.int32)
+    ko = np.zeros(shape, dtype=bool)
+    legal_moves = game_state.legal_move_mask()
+    strings = {}
+    for r in range(board.num_rows):
+        for c in range(board.num_cols):
+            p = Point(row=r + 1, col=c + 1)
+            go_string = board.get_go_string(p)
+            if go_string is None:
+                if not legal_moves[r][c] and \
+                        game_state.does_move_violate_ko(
+                            game_state.next_player, Move.play(p)):
+                    ko[r, c] = True
+                continue
+            key = frozenset(go_string.stones)
+            if key not in strings:
+                strings[key] = len(strings) + 1
+            colors[r, c] = go_string.color.value
+            string_ids[r, c] = strings[key]
+            liberties[r, c] = go_string.num_liberties
+    return BoardArrays(colors, string_ids, liberties, ko)
+
+
+def stack_board_arrays(game_states, shape):
+    """The board_arrays of game_states, stacked into BoardArrays of
+    (len(game_states),) + shape arrays. Also returns the next players'
+    Player.value as a (len(game_states), 1, 1) array, which broadcasts
+    against the planes.
+    """
+    next_players = np.array(
+        [game_state.next_player.value for game_state in game_states],
+        dtype=np.uint8).reshape((-1, 1, 1))
+    if len(game_states) == 1:
+        arrays = BoardArrays(
+            *(a[np.newaxis] for a in board_arrays(game_states[0])))
+    elif len(game_states) == 0:
+        arrays = BoardArrays(
+            np.zeros((0,) + shape, dtype=np.uint8),
+            np.zeros((0,) + shape, dtype=np.int32),
+            np.zeros((0,) + shape, dtype=np.int32),
+            np.zeros((0,) + shape, dtype=bool))
     else:
-        return []
+        arrays = BoardArrays(*(
+            np.stack(a) for a in zip(*map(board_arrays, game_states))))
+    return arrays, next_players
 
 
-def determine_escape_candidates(game_state, move, capture_player):
-    escape_candidates = move.neighbors()
-    for other_ladder_stone in game_state.board.get_go_string(move).stones:
-        for neighbor in other_ladder_stone.neighbors():
-            right_color = game_state.color(neighbor) == capture_player
-            one_liberty = count_liberties(game_state, neighbor) == 1
-            if right_color and one_liberty:
-                escape_candidates.append(liberties(game_state, neighbor))
-    return escape_candidates
+def fill_liberty_planes(board_tensor, first_plane, stones, liberties,
+                        num_planes):
+    """Fill planes first_plane to first_plane + num_planes - 1 of
+    board_tensor: a stone of the bool array stones whose string has k
+    liberties is 1 on plane first_plane + min(k, num_planes) - 1.
 
-
-def count_liberties(game_state, move):
-    if game_state.board.get_go_string(move):
-        return game_state.board.get_go_string(move).num_liberties
-    else:
-        return 0
-
-
-def liberties(game_state, move):
-    return list(game_state.board.get_go_string(move).liberties)
+    Works on a single encoding, or a batch with stones and liberties
+    of shape (batch size, num_rows, num_cols).
+    """
+    counts = np.arange(1, num_planes + 1).reshape((num_planes, 1, 1))
+    liberties = np.minimum(liberties, num_planes)[..., np.newaxis, :, :]
+    board_tensor[..., first_plane:first_plane + num_planes, :, :] = \
+        (liberties == counts) & stones[..., np.newaxis, :, :]
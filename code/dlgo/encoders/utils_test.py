@@ -0,0 +1,163 @@
+import random
+import unittest
+
+import numpy as np
+
+from dlgo import goboard, goboard_array, goboard_fast
+from dlgo.encoders.oneplane import OnePlaneEncoder
+from dlgo.encoders.sevenplane import SevenPlaneEncoder
+from dlgo.encoders.simple import SimpleEncoder
+from dlgo.encoders.utils import board_arrays
+from dlgo.gotypes import Player, Point
+from dlgo.zero.encoder import ZeroEncoder
+
+
+def random_games(module, board_size, num_games, seed):
+    """Yield every position of random games, played with module."""
+    rng = random.Random(seed)
+    for _ in range(num_games):
+        game = module.GameState.new_game(board_size)
+        yield game
+        for _ in range(rng.randint(10, 80)):
+            if game.is_over():
+                break
+            moves = [m for m in game.legal_moves() if not m.is_resign]
+            game = game.apply_move(rng.choice(moves))
+            yield game
+
+
+def ko_game(module):
+    # White (2, 2) is captured by black (2, 3) and may not be retaken
+    # at once.
+    game = module.GameState.new_game(5)
+    for move in [(1, 2), (2, 2), (3, 2), (1, 3), (2, 1), (3, 3), None,
+                 (2, 4), (2, 3)]:
+        if move is None:
+            game = game.apply_move(module.Move.pass_turn())
+        else:
+            game = game.apply_move(module.Move.play(Point(*move)))
+    return game
+
+
+def reference_planes(game_state, max_liberties):
+    """(planes, ko) computed point by point: planes[k - 1] marks black
+    stones with k liberties, planes[max_liberties + k - 1] white ones."""
+    board = game_state.board
+    planes = np.zeros(
+        (2 * max_liberties, board.num_rows, board.num_cols))
+    ko = np.zeros((board.num_rows, board.num_cols))
+    legal_moves = game_state.legal_move_mask()
+    for r in range(board.num_rows):
+        for c in range(board.num_cols):
+            p = Point(row=r + 1, col=c + 1)
+            go_string = board.get_go_string(p)
+            if go_string is None:
+                if not legal_moves[r][c] and \
+                        game_state.does_move_violate_ko(
+                            game_state.next_player,
+                            goboard_fast.Move.play(p)):
+                    ko[r][c] = 1
+            else:
+                plane = min(max_liberties, go_string.num_liberties) - 1
+                if go_string.color == Player.white:
+                    plane += max_liberties
+                planes[plane][r][c] = 1
+    return planes, ko
+
+
+class BoardArraysTest(unittest.TestCase):
+    def check(self, game_state):
+        arrays = board_arrays(game_state)
+        board = game_state.board
+        for r in range(board.num_rows):
+            for c in range(board.num_cols):
+                go_string = board.get_go_string(Point(r + 1, c + 1))
+                if go_string is None:
+                    self.assertEqual(0, arrays.colors[r, c])
+                    self.assertEqual(0, arrays.string_ids[r, c])
+                    self.assertEqual(0, arrays.liberties[r, c])
+                    continue
+                self.assertEqual(go_string.color.value, arrays.colors[r, c])
+                self.assertEqual(
+                    go_string.num_liberties, arrays.liberties[r, c])
+                # Same id exactly on the stones of the string.
+                same = arrays.string_ids == arrays.string_ids[r, c]
+                self.assertEqual(
+                    sorted((p.row - 1, p.col - 1) for p in go_string.stones),
+                    sorted(map(tuple, np.argwhere(same).tolist())))
+        _, ko = reference_planes(game_state, 4)
+        self.assertEqual(ko.astype(bool).tolist(), arrays.ko.tolist())
+        return arrays
+
+    def test_random_games(self):
+        for module in (goboard, goboard_fast, goboard_array):
+            for game in random_games(module, 5, 3, seed=1):
+                self.check(game)
+
+    def test_ko(self):
+        for module in (goboard, goboard_fast, goboard_array):
+            game = ko_game(module)
+            arrays = self.check(game)
+            self.assertEqual([[1, 1]], np.argwhere(arrays.ko).tolist())
+            passed = game.apply_move(module.Move.pass_turn()).apply_move(
+                module.Move.pass_turn())
+            # Nobody may move any more, but only the retake is marked.
+            self.assertTrue(passed.is_over())
+            self.assertEqual(
+                [[1, 1]], np.argwhere(self.check(passed).ko).tolist())
+
+
+class EncoderTest(unittest.TestCase):
+    def games(self):
+        for game in random_games(goboard_fast, 9, 3, seed=2):
+            yield game
+        yield ko_game(goboard_fast)
+
+    def test_oneplane(self):
+        for game in self.games():
+            size = game.board.num_rows
+            colors = game.board.color_array().astype(float)
+            expected = np.where(
+                colors == game.next_player.value, 1.0,
+                np.where(colors == 0, 0.0, -1.0))
+            encoded = OnePlaneEncoder((size, size)).encode(game)
+            self.assertEqual((1, size, size), encoded.shape)
+            self.assertTrue(np.array_equal(expected, encoded[0]))
+
+    def test_simple(self):
+        for game in self.games():
+            size = game.board.num_rows
+            planes, ko = reference_planes(game, 4)
+            encoded = SimpleEncoder((size, size)).encode(game)
+            self.assertTrue(np.array_equal(planes, encoded[:8]))
+            black = game.next_player == Player.black
+            self.assertTrue((encoded[8] == float(black)).all())
+            self.assertTrue((encoded[9] == float(not black)).all())
+            self.assertTrue(np.array_equal(ko, encoded[10]))
+
+    def test_sevenplane(self):
+        for game in self.games():
+            size = game.board.num_rows
+            planes, ko = reference_planes(game, 3)
+            if game.next_player == Player.white:
+                planes = np.concatenate([planes[3:], planes[:3]])
+            encoded = SevenPlaneEncoder((size, size)).encode(game)
+            self.assertTrue(np.array_equal(planes, encoded[:6]))
+            self.assertTrue(np.array_equal(ko, encoded[6]))
+
+    def test_zero(self):
+        for game in self.games():
+            size = game.board.num_rows
+            planes, ko = reference_planes(game, 4)
+            black = game.next_player == Player.black
+            if not black:
+                planes = np.concatenate([planes[4:], planes[:4]])
+            encoded = ZeroEncoder(size).encode(game)
+            self.assertTrue(np.array_equal(planes, encoded[:8]))
+            self.assertTrue((encoded[8] == float(not black)).all())
+            self.assertTrue((encoded[9] == float(black)).all())
+            self.assertTrue(np.array_equal(ko, encoded[10]))
+
+
+if __name__ == '__main__':
+    unittest.main()
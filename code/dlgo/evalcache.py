@@ -0,0 +1,216 @@
+import collections
+
+import numpy as np
+
+from dlgo.zobrist_table import get_zobrist_table
+
+__all__ = [
+    'EvalCache',
+    'cached_predict',
+    'cached_predict_batch',
+    'ko_point',
+    'position_key',
+]
+
+
+def ko_point(game_state):
+    """The point the player to move may not play on because of simple
+    ko, or None.
+    """
+    move = game_state.last_move
+    previous = game_state.previous_state
+    if previous is None or move is None or not move.is_play:
+        return None
+    board = game_state.board
+    string = board.get_go_string(move.point)
+    if string is None or len(string.stones) != 1 or \
+            string.num_liberties != 1:
+        return None
+    captured = [
+        point for point in move.point.neighbors()
+        if board.is_on_grid(point) and board.get(point) is None and
+        previous.board.get(point) == game_state.next_player]
+    if len(captured) != 1:
+        return None
+    return captured[0]
+
+
+def _board_hash(board):
+    if hasattr(board, 'zobrist_hash'):
+        return board.zobrist_hash()
+    return get_zobrist_table(board.num_rows, board.num_cols).hash_board(board)
+
+
+def position_key(game_state):
+    """Cache key of a position: (zobrist hash, next player, ko point)."""
+    return (
+        _board_hash(game_state.board),
+        game_state.next_player,
+        ko_point(game_state))
+
+
+_PARTS = ('priors', 'value')
+
+
+class EvalCache:
+    """Bounded LRU cache of network evaluations, keyed by position_key.
+
+    An entry holds a policy (priors) and/or a value, stored as float16 to
+    keep entries small; lookups return float32 copies. Once the entries
+    take up more than max_bytes, the least recently used ones are evicted.
+
+    Only positions are keyed, not the moves that led to them, so a cache
+    must only be used with one model and with an encoder that looks at
+    the position alone (not, say, the move history planes of the AlphaGo
+    encoder).
+    """
+    # Rough per-entry cost of the key, the array headers and the
+    # dictionary bookkeeping, on top of the array data.
+    entry_overhead = 320
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def key(self, game_state):
+        """The key game_state is cached under."""
+        return position_key(game_state)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return 0.0
+        return self.hits / float(lookups)
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    def get(self, key):
+        """Return (priors, value) for key, or None on a miss. Either part
+        is None if it was not stored."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        priors, value = entry
+        if priors is not None:
+            priors = priors.astype(np.float32)
+        if value is not None:
+            value = value.astype(np.float32)
+        return priors, value
+
+    def put(self, key, priors=None, value=None):
+        if priors is not None:
+            priors = np.asarray(priors, dtype=np.float16)
+        if value is not None:
+            value = np.asarray(value, dtype=np.float16)
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.nbytes -= self._size(old)
+        self._entries[key] = (priors, value)
+        self.nbytes += self._size((priors, value))
+        while self.nbytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= self._size(evicted)
+            self.evictions += 1
+
+    def predict(self, game_state, encode, predict, part, model_input=None):
+        """Evaluate game_state through the cache.
+
+        On a miss, game_state is encoded with encode, a function of a
+        list of game states such as Encoder.encode_batch, and evaluated
+        with predict, such as model.predict. part is 'priors' or 'value',
+        the part of the entry the output is stored as; or None for
+        models with a priors and a value output, whose outputs are
+        stored, and returned, as (priors, value) pairs. model_input, if
+        given, is game_state already encoded, as a batch of one.
+        """
+        return self.predict_batch(
+            [game_state], encode, predict, part, model_input)[0]
+
+    def predict_batch(self, game_states, encode, predict, part,
+                      model_input=None):
+        """Like predict, for many game states with a single call to
+        predict for all misses. Returns a list of outputs."""
+        index = None if part is None else _PARTS.index(part)
+        outputs = [None] * len(game_states)
+        keys = []
+        misses = []
+        for i, game_state in enumerate(game_states):
+            key = self.key(game_state)
+            cached = self.get(key)
+            if cached is not None:
+                outputs[i] = cached if index is None else cached[index]
+            else:
+                keys.append(key)
+                misses.append(i)
+        if misses:
+            if model_input is None:
+                model_input = encode([game_states[i] for i in misses])
+            else:
+                model_input = model_input[misses]
+            results = _outputs(predict(model_input), part)
+            for i, key, output in zip(misses, keys, results):
+                outputs[i] = output
+                if part is None:
+                    self.put(key, *output)
+                else:
+                    self.put(key, **{part: output})
+        return outputs
+
+    def _size(self, entry):
+        priors, value = entry
+        return self.entry_overhead + \
+            (0 if priors is None else priors.nbytes) + \
+            (0 if value is None else value.nbytes)
+
+    def __repr__(self):
+        return 'EvalCache(entries=%d, nbytes=%d, hit_rate=%.3f)' % (
+            len(self), self.nbytes, self.hit_rate())
+
+
+def cached_predict(eval_cache, game_state, encode, predict, part,
+                   model_input=None):
+    """EvalCache.predict, or the output of predict on game_state if
+    eval_cache is None."""
+    if eval_cache is None:
+        if model_input is None:
+            model_input = encode([game_state])
+        return _outputs(predict(model_input), part)[0]
+    return eval_cache.predict(
+        game_state, encode, predict, part, model_input)
+
+
+def cached_predict_batch(eval_cache, game_states, encode, predict, part,
+                         model_input=None):
+    """EvalCache.predict_batch, or the outputs of predict on all of
+    game_states if eval_cache is None."""
+    if eval_cache is None:
+        if not game_states:
+            return []
+        if model_input is None:
+            model_input = encode(game_states)
+        return _outputs(predict(model_input), part)
+    return eval_cache.predict_batch(
+        game_states, encode, predict, part, model_input)
+
+
+def _outputs(results, part):
+    """The outputs of a predict call, one per game state."""
+    if part is None:
+        priors, values = results
+        return list(zip(priors, values))
+    return list(results)
@@ -0,0 +1,151 @@
+import unittest
+
+import numpy as np
+
+from dlgo import goboard_fast
+from dlgo.evalcache import EvalCache, cached_predict, \
+    cached_predict_batch, ko_point, position_key
+from dlgo.gotypes import Point
+
+
+def play_all(moves, board_size=5):
+    """Black and white alternate; None is a pass."""
+    game = goboard_fast.GameState.new_game(board_size)
+    for move in moves:
+        if move is None:
+            game = game.apply_move(goboard_fast.Move.pass_turn())
+        else:
+            game = game.apply_move(goboard_fast.Move.play(Point(*move)))
+    return game
+
+
+class PositionKeyTest(unittest.TestCase):
+    def test_ko_point(self):
+        # White (2, 2) is captured by black (2, 3) and may not be
+        # retaken at once.
+        game = play_all([
+            (1, 2), (2, 2), (3, 2), (1, 3), (2, 1), (3, 3), None, (2, 4),
+            (2, 3)])
+        self.assertEqual(Point(2, 2), ko_point(game))
+        game = game.apply_move(goboard_fast.Move.pass_turn())
+        self.assertIsNone(ko_point(game))
+
+    def test_transpositions_share_a_key(self):
+        a = play_all([(1, 1), (3, 3), (2, 2)])
+        b = play_all([(2, 2), (3, 3), (1, 1)])
+        self.assertEqual(position_key(a), position_key(b))
+        c = play_all([(1, 1), (3, 3), (2, 2), None])
+        self.assertNotEqual(position_key(a), position_key(c))
+
+
+class EvalCacheTest(unittest.TestCase):
+    def test_get_and_put(self):
+        cache = EvalCache()
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', priors=np.array([0.25, 0.75]), value=np.array([0.5]))
+        priors, value = cache.get('a')
+        self.assertEqual(np.float32, priors.dtype)
+        np.testing.assert_allclose([0.25, 0.75], priors)
+        np.testing.assert_allclose([0.5], value)
+        self.assertEqual(0.5, cache.hit_rate())
+
+        cache.put('b', value=np.array([1.0]))
+        priors, value = cache.get('b')
+        self.assertIsNone(priors)
+
+    def test_evicts_least_recently_used(self):
+        priors = np.zeros(100)
+        entry_size = EvalCache.entry_overhead + 200
+        cache = EvalCache(max_bytes=3 * entry_size)
+        for key in 'abc':
+            cache.put(key, priors=priors)
+        self.assertEqual(3 * entry_size, cache.nbytes)
+        cache.get('a')
+        cache.put('d', priors=priors)
+        self.assertEqual(3, len(cache))
+        self.assertNotIn('b', cache)
+        self.assertIn('a', cache)
+        self.assertEqual(1, cache.evictions)
+        self.assertEqual(3 * entry_size, cache.nbytes)
+
+    def test_predict(self):
+        calls = []
+
+        def encode(game_states):
+            return np.array([len(game_states)])
+
+        def predict(x):
+            calls.append(x)
+            return np.array([[0.25, 0.75]])
+
+        game = play_all([(1, 1)])
+        cache = EvalCache()
+        for _ in range(2):
+            priors = cache.predict(game, encode, predict, 'priors')
+            np.testing.assert_allclose([0.25, 0.75], priors)
+        self.assertEqual(1, len(calls))
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+        priors, value = cache.get(cache.key(game))
+        self.assertIsNone(value)
+
+        cached_predict(None, game, encode, predict, 'priors')
+        self.assertEqual(2, len(calls))
+
+        # An encoded position is passed on as it is.
+        other = play_all([(2, 2)])
+        for eval_cache in (None, cache):
+            cached_predict(eval_cache, other, None, predict, 'priors',
+                           model_input=np.array([[7]]))
+            self.assertEqual([[7]], calls[-1].tolist())
+
+    def test_predict_batch(self):
+        def encode(game_states):
+            return np.array([
+                [np.count_nonzero(game_state.board.color_array())]
+                for game_state in game_states])
+
+        calls = []
+
+        def predict(x):
+            calls.append(len(x))
+            return x * 0.5
+
+        games = [play_all(moves) for moves in (
+            [(1, 1)], [(1, 1), (2, 2)], [(1, 1), (2, 2), (3, 3)])]
+        cache = EvalCache()
+        cache.predict(games[1], encode, predict, 'value')
+        values = cached_predict_batch(
+            cache, games, encode, predict, 'value')
+        np.testing.assert_allclose([[0.5], [1.0], [1.5]], values)
+        # Only the misses are evaluated, in a single call.
+        self.assertEqual([1, 2], calls)
+        self.assertEqual(3, len(cache))
+        self.assertEqual([], cached_predict_batch(
+            None, [], encode, predict, 'value'))
+
+    def test_predict_batch_pairs(self):
+        calls = []
+
+        def predict(x):
+            calls.append(len(x))
+            return x * 0.5, x[:, :1] * -1.0
+
+        games = [play_all([(1, 1)]), play_all([(2, 2)])]
+        encoded = np.array([[1.0, 2.0], [3.0, 4.0]])
+        cache = EvalCache()
+        cache.predict(games[0], None, predict, None, encoded[:1])
+        pairs = cached_predict_batch(
+            cache, games, None, predict, None, encoded)
+        self.assertEqual([1, 1], calls)
+        for (priors, value), row in zip(pairs, encoded):
+            np.testing.assert_allclose(row * 0.5, priors)
+            np.testing.assert_allclose(row[:1] * -1.0, value)
+        priors, value = cache.get(cache.key(games[1]))
+        np.testing.assert_allclose([1.5, 2.0], priors)
+        np.testing.assert_allclose([-3.0], value)
+        self.assertEqual(2, len(cached_predict_batch(
+            None, games, None, predict, None, encoded)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,7 @@
 import copy
+
+import numpy as np
+
 from dlgo.gotypes import Player, Point
 from dlgo.scoring import compute_game_result
 # tag::import_zobrist[]
@@ -285,6 +288,17 @@ class GameState:
             return False
         return self.last_move.is_pass and second_last_move.is_pass
 
+    def legal_move_mask(self):
+        """Return a (num_rows, num_cols) bool array that is True where
+        the next player may place a stone.
+        """
+        mask = np.zeros((self.board.num_rows, self.board.num_cols), dtype=bool)
+        for row in range(1, self.board.num_rows + 1):
+            for col in range(1, self.board.num_cols + 1):
+                move = Move.play(Point(row, col))
+                mask[row - 1, col - 1] = self.is_valid_move(move)
+        return mask
+
     def legal_moves(self):
         moves = []
         for row in range(1, self.board.num_rows + 1):
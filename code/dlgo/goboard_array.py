@@ -0,0 +1,644 @@
+"""Array-backed Go board with in-place make/unmake.
+
+The position is stored in flat Python lists over a padded 1-D index
+space: point (row, col) lives at index row * (num_cols + 2) + col, and
+the surrounding ring of indices is marked as off-board. Strings are
+circular linked lists of stone indices with a head index per stone;
+the head carries the stone and liberty counts for the whole string.
+
+`Board` has the same public API as `dlgo.goboard_fast.Board`, so
+`GameState` works unchanged on top of it. In addition, `play` and
+`undo` modify the board in place, which lets search code walk down and
+back up a line without copying boards at all.
+"""
+import array
+import copy
+
+import numpy as np
+
+from dlgo import goboard_fast
+from dlgo.zobrist_table import get_zobrist_table
+from dlgo.goboard_fast import GoString, Move
+from dlgo.gotypes import Player, Point
+
+__all__ = [
+    'Board',
+    'BoardGeometry',
+    'GameState',
+    'Move',
+]
+
+EMPTY = 0
+BLACK = 1
+WHITE = 2
+OFF_BOARD = 3
+
+COLOR_TO_PLAYER = [None, Player.black, Player.white, None]
+
+
+class BoardGeometry:
+    """Index tables shared by every board of the same dimensions."""
+    def __init__(self, num_rows, num_cols):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.width = num_cols + 2
+        self.size = (num_rows + 2) * self.width
+
+        self.on_board = []
+        self.point_to_index = {}
+        self.index_to_point = [None] * self.size
+        for r in range(1, num_rows + 1):
+            for c in range(1, num_cols + 1):
+                idx = r * self.width + c
+                p = Point(row=r, col=c)
+                self.on_board.append(idx)
+                self.point_to_index[p] = idx
+                self.index_to_point[idx] = p
+
+        self.neighbors = [[] for _ in range(self.size)]
+        self.corners = [[] for _ in range(self.size)]
+        self.neighbor_points = {}
+        self.corner_points = {}
+        for idx in self.on_board:
+            for delta in (-self.width, self.width, -1, 1):
+                if self.index_to_point[idx + delta] is not None:
+                    self.neighbors[idx].append(idx + delta)
+            for delta in (-self.width - 1, -self.width + 1,
+                          self.width - 1, self.width + 1):
+                if self.index_to_point[idx + delta] is not None:
+                    self.corners[idx].append(idx + delta)
+            p = self.index_to_point[idx]
+            self.neighbor_points[p] = [
+                self.index_to_point[n] for n in self.neighbors[idx]]
+            self.corner_points[p] = [
+                self.index_to_point[n] for n in self.corners[idx]]
+
+        # Zobrist keys by padded index, shared with goboard_fast so both
+        # boards hash identically.
+        self.zobrist_table = get_zobrist_table(num_rows, num_cols)
+        self.hash_codes = [None, [0] * self.size, [0] * self.size, None]
+        for idx in self.on_board:
+            point_index = self.zobrist_table.point_index(
+                self.index_to_point[idx])
+            for color in (BLACK, WHITE):
+                self.hash_codes[color][idx] = \
+                    self.zobrist_table.code_lists[color][point_index]
+
+        self.empty_colors = bytearray([OFF_BOARD] * self.size)
+        self.empty_playable = bytearray(self.size)
+        for idx in self.on_board:
+            self.empty_colors[idx] = EMPTY
+            # On an empty board every point with a neighbor is playable.
+            if self.neighbors[idx]:
+                self.empty_playable[idx] = 1
+        # The padded indices of the points, in row major order.
+        self.on_board_array = np.array(self.on_board)
+
+
+geometries = {}
+
+
+def get_geometry(num_rows, num_cols):
+    dim = (num_rows, num_cols)
+    if dim not in geometries:
+        geometries[dim] = BoardGeometry(num_rows, num_cols)
+    return geometries[dim]
+
+
+def _assign(values, i, value):
+    values[i] = value
+
+
+class MoveAges:
+    """Read-only view with the same `get` signature as `dlgo.utils.MoveAge`.
+
+    Ages are derived from the move number each stone was placed at, so
+    they don't need a full-board update on every move.
+    """
+    def __init__(self, board):
+        self._board = board
+
+    def get(self, row, col):
+        board = self._board
+        idx = (row + 1) * board.geometry.width + col + 1
+        if board._colors[idx] == EMPTY:
+            return -1
+        return board._num_moves - 1 - board._placed_at[idx]
+
+
+class Board:
+    def __init__(self, num_rows, num_cols):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.geometry = get_geometry(num_rows, num_cols)
+        size = self.geometry.size
+
+        self._colors = bytearray(self.geometry.empty_colors)
+        self._heads = list(range(size))
+        self._next = array.array('H', range(size))
+        self._libs = [0] * size
+        self._sizes = array.array('H', bytes(2 * size))
+        self._placed_at = array.array('I', bytes(4 * size))
+        self._num_moves = 0
+        self._hash = self.geometry.zobrist_table.empty_board
+        self._ko = None
+        # Per color: may a stone be placed here without self-capture,
+        # and would it capture. Kept up to date on every move.
+        self._playable = [
+            None,
+            bytearray(self.geometry.empty_playable),
+            bytearray(self.geometry.empty_playable),
+            None]
+        self._captures = [None, bytearray(size), bytearray(size), None]
+        self._undo_stack = []
+        self.move_ages = MoveAges(self)
+
+    def neighbors(self, point):
+        return self.geometry.neighbor_points[point]
+
+    def corners(self, point):
+        return self.geometry.corner_points[point]
+
+    def place_stone(self, player, point):
+        assert self.is_on_grid(point)
+        idx = self.geometry.point_to_index[point]
+        assert self._colors[idx] == EMPTY
+        self._play(player.value, idx, _assign)
+
+    @classmethod
+    def from_color_array(cls, colors):
+        """Build a board from a (num_rows, num_cols) array as returned by
+        color_array(). Move ages and the ko point are not recovered.
+        """
+        num_rows, num_cols = colors.shape
+        board = cls(num_rows, num_cols)
+        width = board.geometry.width
+        rows, cols = np.nonzero(colors)
+        for r, c in zip(rows.tolist(), cols.tolist()):
+            board._play(int(colors[r, c]), (r + 1) * width + c + 1, _assign)
+        return board
+
+    # Index-level access for code that drives many boards at once, such
+    # as batched rollouts. Indices are padded indices (see
+    # BoardGeometry), colors are Player values, and the returned buffers
+    # are live views of the board that must not be modified.
+
+    def place_stone_at(self, color, idx):
+        self._play(color, idx, _assign)
+
+    def play_at(self, color, idx):
+        """Like play, taking back with undo."""
+        journal = []
+        self._undo_stack.append(
+            (journal, self._hash, self._ko, self._num_moves))
+
+        def write(values, i, value):
+            journal.append((values, i, values[i]))
+            values[i] = value
+
+        self._play(color, idx, write)
+
+    def num_liberties_at(self, idx):
+        """The liberty count of the string on a stone."""
+        return self._libs[self._heads[idx]]
+
+    def string_head(self, idx):
+        """The index of one stone of the string on a stone, the same for
+        all of its stones."""
+        return self._heads[idx]
+
+    def string_at(self, idx):
+        """The stone and liberty indices of the string on a stone."""
+        colors = self._colors
+        neighbors = self.geometry.neighbors
+        nexts = self._next
+        head = self._heads[idx]
+        stones = []
+        liberties = []
+        stone = head
+        while True:
+            stones.append(stone)
+            for neighbor in neighbors[stone]:
+                if colors[neighbor] == EMPTY and neighbor not in liberties:
+                    liberties.append(neighbor)
+            stone = nexts[stone]
+            if stone == head:
+                return stones, liberties
+
+    def clear_ko(self):
+        self._ko = None
+
+    @property
+    def ko_index(self):
+        return self._ko
+
+    def color_buffer(self):
+        return self._colors
+
+    def playable_buffer(self, color):
+        return self._playable[color]
+
+    def capture_buffer(self, color):
+        return self._captures[color]
+
+    def play(self, player, point):
+        """Place a stone in place, recording what is needed to undo it."""
+        idx = self.geometry.point_to_index[point]
+        assert self._colors[idx] == EMPTY
+        self.play_at(player.value, idx)
+
+    def undo(self):
+        """Take back the last `play` on this board."""
+        journal, self._hash, self._ko, self._num_moves = \
+            self._undo_stack.pop()
+        for values, idx, value in reversed(journal):
+            values[idx] = value
+
+    def _play(self, color, idx, write):
+        geometry = self.geometry
+        colors = self._colors
+        heads = self._heads
+        libs = self._libs
+        write(colors, idx, color)
+        write(heads, idx, idx)
+        write(self._next, idx, idx)
+        write(self._sizes, idx, 1)
+        write(self._placed_at, idx, self._num_moves)
+        self._num_moves += 1
+        self._hash ^= geometry.hash_codes[color][idx]
+
+        # 0. Examine the adjacent points.
+        friends = []
+        enemies = []
+        num_empty = 0
+        for neighbor in geometry.neighbors[idx]:
+            neighbor_color = colors[neighbor]
+            if neighbor_color == EMPTY:
+                num_empty += 1
+            elif neighbor_color == color:
+                if heads[neighbor] not in friends:
+                    friends.append(heads[neighbor])
+            elif heads[neighbor] not in enemies:
+                enemies.append(heads[neighbor])
+        write(libs, idx, num_empty)
+
+        # Strings whose liberty count crosses one may change the
+        # legality of the points around them.
+        dirty = [idx] + geometry.neighbors[idx]
+        recheck = []
+
+        # 1. Merge any adjacent strings of the same color into the
+        #    largest of them. Only stones that change strings are visited
+        #    to find the liberties they add.
+        head = idx
+        if friends:
+            in_atari = any(libs[friend] == 1 for friend in friends)
+            head = max(friends, key=self._sizes.__getitem__)
+            candidates = set()
+            for friend in [idx] + friends:
+                if friend == head:
+                    continue
+                stone = friend
+                while True:
+                    for neighbor in geometry.neighbors[stone]:
+                        if colors[neighbor] == EMPTY:
+                            candidates.add(neighbor)
+                    stone = self._next[stone]
+                    if stone == friend:
+                        break
+            num_libs = libs[head] - 1
+            for liberty in candidates:
+                for neighbor in geometry.neighbors[liberty]:
+                    if colors[neighbor] == color and heads[neighbor] == head:
+                        break
+                else:
+                    num_libs += 1
+            for friend in [idx] + friends:
+                if friend != head:
+                    self._merge(head, friend, write)
+            write(libs, head, num_libs)
+
+        # 2. Reduce liberties of adjacent opposite color strings and
+        #    remove the ones without liberties left.
+        num_captured = 0
+        captured_at = None
+        for enemy in enemies:
+            write(libs, enemy, libs[enemy] - 1)
+            if libs[enemy] == 0:
+                num_captured += self._sizes[enemy]
+                captured_at = enemy
+                self._remove_string(enemy, write, dirty, recheck)
+            elif libs[enemy] == 1:
+                recheck.append(enemy)
+
+        # 3. A single stone capturing a single stone leaves a ko point.
+        if num_captured == 1 and self._sizes[head] == 1 and libs[head] == 1:
+            self._ko = captured_at
+        else:
+            self._ko = None
+
+        # 4. Update the legal move bookkeeping around the move.
+        if friends and (in_atari or libs[head] == 1):
+            recheck.append(head)
+        for string in recheck:
+            if colors[string] != EMPTY:
+                dirty.extend(self._liberties(string))
+        self._update_playable(dirty, write)
+
+    def _merge(self, head, other, write):
+        """Merge the string at `other` into the string at `head`."""
+        heads = self._heads
+        nexts = self._next
+        stone = other
+        while True:
+            write(heads, stone, head)
+            stone = nexts[stone]
+            if stone == other:
+                break
+        next_head = nexts[head]
+        write(nexts, head, nexts[other])
+        write(nexts, other, next_head)
+        write(self._sizes, head, self._sizes[head] + self._sizes[other])
+
+    def _remove_string(self, head, write, dirty, recheck):
+        colors = self._colors
+        heads = self._heads
+        libs = self._libs
+        neighbors = self.geometry.neighbors
+        hash_codes = self.geometry.hash_codes[colors[head]]
+        stone = head
+        while True:
+            write(colors, stone, EMPTY)
+            self._hash ^= hash_codes[stone]
+            dirty.append(stone)
+            # Removing a string creates liberties for adjacent strings.
+            touched = []
+            for neighbor in neighbors[stone]:
+                if colors[neighbor] == EMPTY:
+                    continue
+                neighbor_head = heads[neighbor]
+                if neighbor_head != head and neighbor_head not in touched:
+                    touched.append(neighbor_head)
+                    if libs[neighbor_head] == 1:
+                        recheck.append(neighbor_head)
+                    write(libs, neighbor_head, libs[neighbor_head] + 1)
+            stone = self._next[stone]
+            if stone == head:
+                break
+
+    def _liberties(self, head):
+        colors = self._colors
+        neighbors = self.geometry.neighbors
+        liberties = []
+        stone = head
+        while True:
+            for neighbor in neighbors[stone]:
+                if colors[neighbor] == EMPTY and neighbor not in liberties:
+                    liberties.append(neighbor)
+            stone = self._next[stone]
+            if stone == head:
+                return liberties
+
+    def _update_playable(self, points, write):
+        colors = self._colors
+        heads = self._heads
+        libs = self._libs
+        neighbors = self.geometry.neighbors
+        black_playable = self._playable[BLACK]
+        white_playable = self._playable[WHITE]
+        black_captures = self._captures[BLACK]
+        white_captures = self._captures[WHITE]
+        for point in points:
+            black_ok = white_ok = black_takes = white_takes = 0
+            if colors[point] == EMPTY:
+                for neighbor in neighbors[point]:
+                    neighbor_color = colors[neighbor]
+                    if neighbor_color == EMPTY:
+                        black_ok = white_ok = 1
+                    elif libs[heads[neighbor]] == 1:
+                        # Capturing a string in atari is always legal,
+                        # connecting to it is self-capture.
+                        if neighbor_color == BLACK:
+                            white_takes = 1
+                        else:
+                            black_takes = 1
+                    elif neighbor_color == BLACK:
+                        black_ok = 1
+                    else:
+                        white_ok = 1
+                black_ok |= black_takes
+                white_ok |= white_takes
+            if black_playable[point] != black_ok:
+                write(black_playable, point, black_ok)
+            if white_playable[point] != white_ok:
+                write(white_playable, point, white_ok)
+            if black_captures[point] != black_takes:
+                write(black_captures, point, black_takes)
+            if white_captures[point] != white_takes:
+                write(white_captures, point, white_takes)
+
+    def is_playable(self, player, point):
+        """Can the player place a stone on the point without capturing
+        their own stones? Ko is not taken into account.
+        """
+        idx = self.geometry.point_to_index[point]
+        return self._playable[player.value][idx] == 1
+
+    def color_array(self):
+        """Return a (num_rows, num_cols) uint8 array holding 0 for empty
+        points and Player.value for stones.
+        """
+        flat = np.frombuffer(self._colors, dtype=np.uint8)
+        grid = flat.reshape(self.num_rows + 2, self.num_cols + 2)
+        return grid[1:-1, 1:-1].copy()
+
+    def string_arrays(self):
+        """Like goboard_fast.Board.string_arrays. A string's id is
+        one more than the index of its head.
+        """
+        on_board = self.geometry.on_board_array
+        heads = np.array(self._heads)[on_board]
+        stones = np.frombuffer(self._colors, dtype=np.uint8)[on_board] != EMPTY
+        string_ids = np.where(stones, heads + 1, 0).astype(np.int32)
+        liberties = np.where(
+            stones, np.array(self._libs)[heads], 0).astype(np.int32)
+        shape = (self.num_rows, self.num_cols)
+        return string_ids.reshape(shape), liberties.reshape(shape)
+
+    def playable_mask(self, player):
+        """Return a (num_rows, num_cols) bool array of the points where
+        `is_playable` holds.
+        """
+        flat = np.frombuffer(self._playable[player.value], dtype=np.uint8)
+        grid = flat.reshape(self.num_rows + 2, self.num_cols + 2)
+        return grid[1:-1, 1:-1].astype(bool)
+
+    def capture_points(self, player):
+        """Return the points where a stone by the player would capture."""
+        flat = np.frombuffer(self._captures[player.value], dtype=np.uint8)
+        index_to_point = self.geometry.index_to_point
+        return [index_to_point[idx] for idx in np.flatnonzero(flat)]
+
+    def is_self_capture(self, player, point):
+        idx = self.geometry.point_to_index[point]
+        color = player.value
+        for neighbor in self.geometry.neighbors[idx]:
+            neighbor_color = self._colors[neighbor]
+            if neighbor_color == EMPTY:
+                # This point has a liberty. Can't be self capture.
+                return False
+            num_libs = self._libs[self._heads[neighbor]]
+            if neighbor_color == color:
+                if num_libs > 1:
+                    # Connecting to a string with liberties to spare.
+                    return False
+            elif num_libs == 1:
+                # This move is real capture, not a self capture.
+                return False
+        return True
+
+    def will_capture(self, player, point):
+        idx = self.geometry.point_to_index[point]
+        other = 3 - player.value
+        for neighbor in self.geometry.neighbors[idx]:
+            if self._colors[neighbor] == other and \
+                    self._libs[self._heads[neighbor]] == 1:
+                return True
+        return False
+
+    def hash_after_move(self, player, point):
+        """Return the Zobrist hash the board would have after playing
+        the point, without modifying the board.
+        """
+        idx = self.geometry.point_to_index[point]
+        color = player.value
+        other = 3 - color
+        colors = self._colors
+        heads = self._heads
+        new_hash = self._hash ^ self.geometry.hash_codes[color][idx]
+        captured = []
+        for neighbor in self.geometry.neighbors[idx]:
+            if colors[neighbor] != other:
+                continue
+            head = heads[neighbor]
+            if self._libs[head] == 1 and head not in captured:
+                captured.append(head)
+                stone = head
+                while True:
+                    new_hash ^= self.geometry.hash_codes[other][stone]
+                    stone = self._next[stone]
+                    if stone == head:
+                        break
+        return new_hash
+
+    def is_on_grid(self, point):
+        return 1 <= point.row <= self.num_rows and \
+            1 <= point.col <= self.num_cols
+
+    def get(self, point):
+        """Return the content of a point on the board.
+
+        Returns None if the point is empty, or a Player if there is a
+        stone on that point.
+        """
+        idx = self.geometry.point_to_index[point]
+        return COLOR_TO_PLAYER[self._colors[idx]]
+
+    def num_liberties(self, point):
+        """The liberty count of the string on the point, 0 if it is
+        empty. Unlike get_go_string this does not walk the string."""
+        idx = self.geometry.point_to_index[point]
+        if self._colors[idx] == EMPTY:
+            return 0
+        return self._libs[self._heads[idx]]
+
+    def get_go_string(self, point):
+        """Return the entire string of stones at a point.
+
+        Returns None if the point is empty, or a GoString if there is
+        a stone on that point.
+        """
+        idx = self.geometry.point_to_index[point]
+        color = self._colors[idx]
+        if color == EMPTY:
+            return None
+        index_to_point = self.geometry.index_to_point
+        head = self._heads[idx]
+        stones = []
+        liberties = set()
+        stone = head
+        while True:
+            stones.append(index_to_point[stone])
+            for neighbor in self.geometry.neighbors[stone]:
+                if self._colors[neighbor] == EMPTY:
+                    liberties.add(index_to_point[neighbor])
+            stone = self._next[stone]
+            if stone == head:
+                break
+        return GoString(COLOR_TO_PLAYER[color], stones, liberties)
+
+    @property
+    def ko_point(self):
+        """The point retaken by a simple ko capture, or None."""
+        if self._ko is None:
+            return None
+        return self.geometry.index_to_point[self._ko]
+
+    def __eq__(self, other):
+        return isinstance(other, Board) and \
+            self.num_rows == other.num_rows and \
+            self.num_cols == other.num_cols and \
+            self._hash == other._hash
+
+    def __deepcopy__(self, memodict={}):
+        copied = Board.__new__(Board)
+        copied.num_rows = self.num_rows
+        copied.num_cols = self.num_cols
+        copied.geometry = self.geometry
+        copied._colors = self._colors[:]
+        copied._heads = self._heads[:]
+        copied._next = self._next[:]
+        copied._libs = self._libs[:]
+        copied._sizes = self._sizes[:]
+        copied._placed_at = self._placed_at[:]
+        copied._num_moves = self._num_moves
+        copied._hash = self._hash
+        copied._ko = self._ko
+        copied._playable = [
+            None, self._playable[BLACK][:], self._playable[WHITE][:], None]
+        copied._captures = [
+            None, self._captures[BLACK][:], self._captures[WHITE][:], None]
+        # The undo history belongs to the board it was played on.
+        copied._undo_stack = []
+        copied.move_ages = MoveAges(copied)
+        return copied
+
+    def zobrist_hash(self):
+        return self._hash
+
+
+class GameState(goboard_fast.GameState):
+    def apply_move(self, move):
+        """Return the new GameState after applying the move."""
+        if move.is_play:
+            next_board = copy.deepcopy(self.board)
+            next_board.place_stone(self.next_player, move.point)
+        else:
+            next_board = self.board
+        return GameState(next_board, self.next_player.other, self, move)
+
+    @classmethod
+    def new_game(cls, board_size):
+        if isinstance(board_size, int):
+            board_size = (board_size, board_size)
+        board = Board(*board_size)
+        return GameState(board, Player.black, None, None)
+
+    def is_valid_move(self, move):
+        if self.is_over():
+            return False
+        if move.is_pass or move.is_resign:
+            return True
+        return (
+            self.board.is_playable(self.next_player, move.point) and
+            not self.does_move_violate_ko(self.next_player, move))
@@ -0,0 +1,228 @@
+import random
+import unittest
+
+import six
+
+from dlgo import goboard_fast
+from dlgo.goboard_array import Board, GameState, Move
+from dlgo.gotypes import Player, Point
+
+
+class BoardTest(unittest.TestCase):
+    def test_capture(self):
+        board = Board(19, 19)
+        board.place_stone(Player.black, Point(2, 2))
+        board.place_stone(Player.white, Point(1, 2))
+        self.assertEqual(Player.black, board.get(Point(2, 2)))
+        board.place_stone(Player.white, Point(2, 1))
+        self.assertEqual(Player.black, board.get(Point(2, 2)))
+        board.place_stone(Player.white, Point(2, 3))
+        self.assertEqual(Player.black, board.get(Point(2, 2)))
+        board.place_stone(Player.white, Point(3, 2))
+        self.assertIsNone(board.get(Point(2, 2)))
+
+    def test_capture_two_stones(self):
+        board = Board(19, 19)
+        board.place_stone(Player.black, Point(2, 2))
+        board.place_stone(Player.black, Point(2, 3))
+        board.place_stone(Player.white, Point(1, 2))
+        board.place_stone(Player.white, Point(1, 3))
+        self.assertEqual(Player.black, board.get(Point(2, 2)))
+        self.assertEqual(Player.black, board.get(Point(2, 3)))
+        board.place_stone(Player.white, Point(3, 2))
+        board.place_stone(Player.white, Point(3, 3))
+        self.assertEqual(Player.black, board.get(Point(2, 2)))
+        self.assertEqual(Player.black, board.get(Point(2, 3)))
+        board.place_stone(Player.white, Point(2, 1))
+        board.place_stone(Player.white, Point(2, 4))
+        self.assertIsNone(board.get(Point(2, 2)))
+        self.assertIsNone(board.get(Point(2, 3)))
+
+    def test_capture_is_not_suicide(self):
+        board = Board(19, 19)
+        board.place_stone(Player.black, Point(1, 1))
+        board.place_stone(Player.black, Point(2, 2))
+        board.place_stone(Player.black, Point(1, 3))
+        board.place_stone(Player.white, Point(2, 1))
+        board.place_stone(Player.white, Point(1, 2))
+        self.assertIsNone(board.get(Point(1, 1)))
+        self.assertEqual(Player.white, board.get(Point(2, 1)))
+        self.assertEqual(Player.white, board.get(Point(1, 2)))
+
+    def test_remove_liberties(self):
+        board = Board(5, 5)
+        board.place_stone(Player.black, Point(3, 3))
+        board.place_stone(Player.white, Point(2, 2))
+        white_string = board.get_go_string(Point(2, 2))
+        six.assertCountEqual(
+            self,
+            [Point(2, 3), Point(2, 1), Point(1, 2), Point(3, 2)],
+            white_string.liberties)
+        board.place_stone(Player.black, Point(3, 2))
+        white_string = board.get_go_string(Point(2, 2))
+        six.assertCountEqual(
+            self,
+            [Point(2, 3), Point(2, 1), Point(1, 2)],
+            white_string.liberties)
+
+    def test_empty_triangle(self):
+        board = Board(5, 5)
+        board.place_stone(Player.black, Point(1, 1))
+        board.place_stone(Player.black, Point(1, 2))
+        board.place_stone(Player.black, Point(2, 2))
+        board.place_stone(Player.white, Point(2, 1))
+
+        black_string = board.get_go_string(Point(1, 1))
+        six.assertCountEqual(
+            self,
+            [Point(3, 2), Point(2, 3), Point(1, 3)],
+            black_string.liberties)
+
+    def test_self_capture(self):
+        # ooo..
+        # x.xo.
+        board = Board(5, 5)
+        board.place_stone(Player.black, Point(1, 1))
+        board.place_stone(Player.black, Point(1, 3))
+        board.place_stone(Player.white, Point(2, 1))
+        board.place_stone(Player.white, Point(2, 2))
+        board.place_stone(Player.white, Point(2, 3))
+        board.place_stone(Player.white, Point(1, 4))
+
+        self.assertTrue(board.is_self_capture(Player.black, Point(1, 2)))
+
+    def test_not_self_capture(self):
+        # o.o..
+        # x.xo.
+        board = Board(5, 5)
+        board.place_stone(Player.black, Point(1, 1))
+        board.place_stone(Player.black, Point(1, 3))
+        board.place_stone(Player.white, Point(2, 1))
+        board.place_stone(Player.white, Point(2, 3))
+        board.place_stone(Player.white, Point(1, 4))
+
+        self.assertFalse(board.is_self_capture(Player.black, Point(1, 2)))
+
+    def test_not_self_capture_is_other_capture(self):
+        # xx...
+        # oox..
+        # x.o..
+        board = Board(5, 5)
+        board.place_stone(Player.black, Point(3, 1))
+        board.place_stone(Player.black, Point(3, 2))
+        board.place_stone(Player.black, Point(2, 3))
+        board.place_stone(Player.black, Point(1, 1))
+        board.place_stone(Player.white, Point(2, 1))
+        board.place_stone(Player.white, Point(2, 2))
+        board.place_stone(Player.white, Point(1, 3))
+
+        self.assertFalse(board.is_self_capture(Player.black, Point(1, 2)))
+
+    def test_undo_capture(self):
+        board = Board(5, 5)
+        board.play(Player.black, Point(2, 2))
+        board.play(Player.white, Point(1, 2))
+        board.play(Player.white, Point(2, 1))
+        board.play(Player.white, Point(2, 3))
+        before = board.zobrist_hash()
+        board.play(Player.white, Point(3, 2))
+        self.assertIsNone(board.get(Point(2, 2)))
+        self.assertEqual(3, board.get_go_string(Point(1, 2)).num_liberties)
+        board.undo()
+        self.assertEqual(before, board.zobrist_hash())
+        self.assertIsNone(board.get(Point(3, 2)))
+        self.assertEqual(Player.black, board.get(Point(2, 2)))
+        self.assertEqual(1, board.get_go_string(Point(2, 2)).num_liberties)
+        self.assertEqual(2, board.get_go_string(Point(1, 2)).num_liberties)
+
+    def test_undo_merge(self):
+        board = Board(5, 5)
+        board.play(Player.black, Point(3, 2))
+        board.play(Player.black, Point(3, 4))
+        board.play(Player.black, Point(3, 3))
+        self.assertEqual(3, len(board.get_go_string(Point(3, 2)).stones))
+        self.assertEqual(8, board.get_go_string(Point(3, 2)).num_liberties)
+        board.undo()
+        self.assertEqual(1, len(board.get_go_string(Point(3, 2)).stones))
+        self.assertEqual(4, board.get_go_string(Point(3, 4)).num_liberties)
+
+    def test_ko_point(self):
+        # .xo..
+        # xo.o.
+        # .xo..
+        board = Board(5, 5)
+        board.play(Player.black, Point(1, 2))
+        board.play(Player.black, Point(2, 1))
+        board.play(Player.black, Point(3, 2))
+        board.play(Player.white, Point(2, 2))
+        board.play(Player.white, Point(1, 3))
+        board.play(Player.white, Point(3, 3))
+        board.play(Player.white, Point(2, 4))
+        self.assertIsNone(board.ko_point)
+        board.play(Player.black, Point(2, 3))
+        self.assertIsNone(board.get(Point(2, 2)))
+        self.assertEqual(Point(2, 2), board.ko_point)
+
+    def test_matches_dict_board(self):
+        random.seed(7)
+        fast_game = goboard_fast.GameState.new_game(9)
+        game = GameState.new_game(9)
+        for _ in range(120):
+            moves = [m for m in game.legal_moves() if m.is_play]
+            if not moves:
+                break
+            move = random.choice(moves)
+            fast_game = fast_game.apply_move(move)
+            game = game.apply_move(move)
+            self.assertTrue(
+                (fast_game.legal_move_mask() == game.legal_move_mask()).all())
+            self.assertEqual(
+                fast_game.board.zobrist_hash(), game.board.zobrist_hash())
+            for r in range(1, 10):
+                for c in range(1, 10):
+                    p = Point(r, c)
+                    self.assertEqual(
+                        fast_game.board.get_go_string(p),
+                        game.board.get_go_string(p))
+
+    def test_playable_after_undo(self):
+        random.seed(11)
+        board = Board(7, 7)
+        player = Player.black
+        for _ in range(200):
+            if random.random() < 0.3 and board._undo_stack:
+                board.undo()
+            else:
+                candidates = [
+                    Point(r, c) for r in range(1, 8) for c in range(1, 8)
+                    if board.is_playable(player, Point(r, c))]
+                if not candidates:
+                    break
+                board.play(player, random.choice(candidates))
+            player = player.other
+            for r in range(1, 8):
+                for c in range(1, 8):
+                    p = Point(r, c)
+                    for color in (Player.black, Player.white):
+                        self.assertEqual(
+                            board.get(p) is None and
+                            not board.is_self_capture(color, p),
+                            board.is_playable(color, p))
+                        self.assertEqual(
+                            board.get(p) is None and
+                            board.will_capture(color, p),
+                            p in board.capture_points(color))
+
+
+class GameTest(unittest.TestCase):
+    def test_new_game(self):
+        start = GameState.new_game(19)
+        next_state = start.apply_move(Move.play(Point(16, 16)))
+
+        self.assertEqual(start, next_state.previous_state)
+        self.assertEqual(Player.white, next_state.next_player)
+        self.assertEqual(Player.black, next_state.board.get(Point(16, 16)))
+
+
+if __name__ == '__main__':
+    unittest.main()
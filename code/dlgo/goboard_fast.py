@@ -1,17 +1,30 @@
+import array
+import collections
 import copy
+
+import numpy as np
+
 from dlgo.gotypes import Player, Point
+from dlgo.history import SituationHistory
 from dlgo.scoring import compute_game_result
-from dlgo import zobrist
+from dlgo.zobrist_table import get_zobrist_table
 from dlgo.utils import MoveAge
 
 __all__ = [
     'Board',
+    'BoardArrays',
     'GameState',
     'Move',
 ]
 
 neighbor_tables = {}
 corner_tables = {}
+point_index_tables = {}
+
+# A snapshot of a position as (num_rows, num_cols) arrays, see
+# GameState.board_arrays.
+BoardArrays = collections.namedtuple(
+    'BoardArrays', ['colors', 'string_ids', 'liberties', 'ko'])
 
 
 def init_neighbor_table(dim):
@@ -96,7 +109,9 @@ class Board():
         self.num_rows = num_rows
         self.num_cols = num_cols
         self._grid = {}
-        self._hash = zobrist.EMPTY_BOARD
+        zobrist_table = get_zobrist_table(num_rows, num_cols)
+        self._hash = zobrist_table.empty_board
+        self._stone_codes = zobrist_table.point_codes
 
         global neighbor_tables
         dim = (num_rows, num_cols)
@@ -104,10 +119,36 @@ class Board():
             init_neighbor_table(dim)
         if dim not in corner_tables:
             init_corner_table(dim)
+        if dim not in point_index_tables:
+            point_index_tables[dim] = {
+                Point(row=r, col=c): (r - 1) * num_cols + c - 1
+                for r in range(1, num_rows + 1)
+                for c in range(1, num_cols + 1)}
         self.neighbor_table = neighbor_tables[dim]
         self.corner_table = corner_tables[dim]
         self.move_ages = MoveAge(self)
-
+        # Per player, indexed by (row - 1) * num_cols + (col - 1): may a
+        # stone be placed here without self-capture, and would it
+        # capture. Kept up to date by place_stone.
+        num_points = num_rows * num_cols
+        self._playable = {
+            Player.black: bytearray([1]) * num_points,
+            Player.white: bytearray([1]) * num_points,
+        }
+        self._captures = {
+            Player.black: bytearray(num_points),
+            Player.white: bytearray(num_points),
+        }
+        # Player.value of the stone on each point, 0 if it is empty.
+        self._colors = bytearray(num_points)
+        # The id and liberty count of the string on each point, 0 if it
+        # is empty. A string's id is one more than the index of one of
+        # its stones, which keeps ids distinct.
+        self._string_ids = array.array('H', bytes(2 * num_points))
+        self._liberty_counts = array.array('H', bytes(2 * num_points))
+        self.point_index = point_index_tables[dim]
+        if num_points == 1:
+            self._update_playable([Point(row=1, col=1)])
 
     def neighbors(self, point):
         return self.neighbor_table[point]
@@ -143,28 +184,61 @@ class Board():
             new_string = new_string.merged_with(same_color_string)
         for new_string_point in new_string.stones:
             self._grid[new_string_point] = new_string
-        # Remove empty-point hash code.
-        self._hash ^= zobrist.HASH_CODE[point, None]
         # Add filled point hash code.
-        self._hash ^= zobrist.HASH_CODE[point, player]
+        self._hash ^= self._stone_codes[player][point]
 # end::apply_zobrist[]
+        self._index_string(new_string)
+        self._colors[(point.row - 1) * self.num_cols + point.col - 1] = \
+            player.value
 
         # 2. Reduce liberties of any adjacent strings of the opposite
         #    color.
         # 3. If any opposite color strings now have zero liberties,
         #    remove them.
+        # Points whose legality may have changed: the neighborhood of
+        # the move, captured stones, and the liberties of strings whose
+        # liberty count went to or from one.
+        dirty = set(self.neighbor_table[point])
+        dirty.add(point)
+        recheck = []
+        if new_string.num_liberties == 1 or any(
+                string.num_liberties == 1 for string in adjacent_same_color):
+            recheck.append(point)
         for other_color_string in adjacent_opposite_color:
             replacement = other_color_string.without_liberty(point)
             if replacement.num_liberties:
                 self._replace_string(other_color_string.without_liberty(point))
+                if replacement.num_liberties == 1:
+                    dirty |= replacement.liberties
             else:
                 self._remove_string(other_color_string)
+                dirty |= other_color_string.stones
+                for stone in other_color_string.stones:
+                    recheck.extend(self.neighbor_table[stone])
+        rechecked = []
+        for stone in recheck:
+            string = self._grid.get(stone)
+            if string is not None and string not in rechecked:
+                rechecked.append(string)
+                dirty |= string.liberties
+        self._update_playable(dirty)
 
     def _replace_string(self, new_string):
         for point in new_string.stones:
             self._grid[point] = new_string
+        self._index_string(new_string)
+
+    def _index_string(self, string):
+        point_index = self.point_index
+        idx = [point_index[point] for point in string.stones]
+        string_id = idx[0] + 1
+        num_liberties = len(string.liberties)
+        for i in idx:
+            self._string_ids[i] = string_id
+            self._liberty_counts[i] = num_liberties
 
     def _remove_string(self, string):
+        stone_codes = self._stone_codes[string.color]
         for point in string.stones:
             self.move_ages.reset_age(point)
             # Removing a string can create liberties for other strings.
@@ -175,10 +249,102 @@ class Board():
                 if neighbor_string is not string:
                     self._replace_string(neighbor_string.with_liberty(point))
             self._grid[point] = None
+            idx = self.point_index[point]
+            self._colors[idx] = 0
+            self._string_ids[idx] = 0
+            self._liberty_counts[idx] = 0
             # Remove filled point hash code.
-            self._hash ^= zobrist.HASH_CODE[point, string.color]
-            # Add empty point hash code.
-            self._hash ^= zobrist.HASH_CODE[point, None]
+            self._hash ^= stone_codes[point]
+
+    def _update_playable(self, points):
+        for point in points:
+            black_ok = white_ok = black_takes = white_takes = 0
+            if self._grid.get(point) is None:
+                for neighbor in self.neighbor_table[point]:
+                    neighbor_string = self._grid.get(neighbor)
+                    if neighbor_string is None:
+                        black_ok = white_ok = 1
+                    elif neighbor_string.num_liberties == 1:
+                        # Capturing a string in atari is always legal,
+                        # connecting to it is self-capture.
+                        if neighbor_string.color == Player.black:
+                            white_takes = 1
+                        else:
+                            black_takes = 1
+                    elif neighbor_string.color == Player.black:
+                        black_ok = 1
+                    else:
+                        white_ok = 1
+                black_ok |= black_takes
+                white_ok |= white_takes
+            idx = (point.row - 1) * self.num_cols + point.col - 1
+            self._playable[Player.black][idx] = black_ok
+            self._playable[Player.white][idx] = white_ok
+            self._captures[Player.black][idx] = black_takes
+            self._captures[Player.white][idx] = white_takes
+
+    def is_playable(self, player, point):
+        """Can the player place a stone on the point without capturing
+        their own stones? Ko is not taken into account.
+        """
+        idx = (point.row - 1) * self.num_cols + point.col - 1
+        return self._playable[player][idx] == 1
+
+    def color_array(self):
+        """Return a (num_rows, num_cols) uint8 array holding 0 for empty
+        points and Player.value for stones.
+        """
+        flat = np.frombuffer(self._colors, dtype=np.uint8)
+        return flat.reshape(self.num_rows, self.num_cols).copy()
+
+    def string_arrays(self):
+        """Return two (num_rows, num_cols) int32 arrays: a string id
+        per point, shared by all stones of a string and 0 on empty
+        points, and the liberty count of the string on each point.
+        """
+        shape = (self.num_rows, self.num_cols)
+        string_ids = np.frombuffer(self._string_ids, dtype=np.uint16)
+        liberties = np.frombuffer(self._liberty_counts, dtype=np.uint16)
+        return (
+            string_ids.reshape(shape).astype(np.int32),
+            liberties.reshape(shape).astype(np.int32))
+
+    def playable_mask(self, player):
+        """Return a (num_rows, num_cols) bool array of the points where
+        `is_playable` holds.
+        """
+        flat = np.frombuffer(self._playable[player], dtype=np.uint8)
+        return flat.reshape(self.num_rows, self.num_cols).astype(bool)
+
+    def capture_points(self, player):
+        """Return the points where a stone by the player would capture."""
+        captures = self._captures[player]
+        points = []
+        # There are few of them; bytearray.find skips the rest quickly.
+        idx = captures.find(1)
+        while idx >= 0:
+            points.append(
+                Point(row=idx // self.num_cols + 1, col=idx % self.num_cols + 1))
+            idx = captures.find(1, idx + 1)
+        return points
+
+    def hash_after_move(self, player, point):
+        """Return the Zobrist hash the board would have after playing
+        the point, without modifying the board.
+        """
+        new_hash = self._hash ^ self._stone_codes[player][point]
+        captured = []
+        for neighbor in self.neighbor_table[point]:
+            neighbor_string = self._grid.get(neighbor)
+            if neighbor_string is None or neighbor_string.color == player:
+                continue
+            if neighbor_string.num_liberties == 1 and \
+                    neighbor_string not in captured:
+                captured.append(neighbor_string)
+                stone_codes = self._stone_codes[neighbor_string.color]
+                for stone in neighbor_string.stones:
+                    new_hash ^= stone_codes[stone]
+        return new_hash
 
     def is_self_capture(self, player, point):
         friendly_strings = []
@@ -241,7 +407,7 @@ class Board():
         return isinstance(other, Board) and \
             self.num_rows == other.num_rows and \
             self.num_cols == other.num_cols and \
-            self._hash() == other._hash()
+            self._hash == other._hash
 
     def __deepcopy__(self, memodict={}):
         copied = Board(self.num_rows, self.num_cols)
@@ -249,6 +415,13 @@ class Board():
         # (immutable) to GoStrings (also immutable)
         copied._grid = copy.copy(self._grid)
         copied._hash = self._hash
+        copied._colors = self._colors[:]
+        copied._string_ids = self._string_ids[:]
+        copied._liberty_counts = self._liberty_counts[:]
+        copied._playable = {
+            player: playable[:] for player, playable in self._playable.items()}
+        copied._captures = {
+            player: captures[:] for player, captures in self._captures.items()}
         return copied
 
 # tag::return_zobrist[]
@@ -314,12 +487,12 @@ class GameState():
         self.next_player = next_player
         self.previous_state = previous
         if previous is None:
-            self.previous_states = frozenset()
+            self.previous_states = SituationHistory()
         else:
-            self.previous_states = frozenset(
-                previous.previous_states |
-                {(previous.next_player, previous.board.zobrist_hash())})
+            self.previous_states = previous.previous_states.add(
+                (previous.next_player, previous.board.zobrist_hash()))
         self.last_move = move
+        self._legal_move_mask = None
 
     def apply_move(self, move):
         """Return the new GameState after applying the move."""
@@ -351,9 +524,8 @@ class GameState():
             return False
         if not self.board.will_capture(player, move.point):
             return False
-        next_board = copy.deepcopy(self.board)
-        next_board.place_stone(player, move.point)
-        next_situation = (player.other, next_board.zobrist_hash())
+        next_situation = (
+            player.other, self.board.hash_after_move(player, move.point))
         return next_situation in self.previous_states
 
     def is_valid_move(self, move):
@@ -376,13 +548,48 @@ class GameState():
             return False
         return self.last_move.is_pass and second_last_move.is_pass
 
+    def legal_move_mask(self):
+        """Return a read-only (num_rows, num_cols) bool array that is
+        True where the next player may place a stone.
+
+        Point(row, col) is at index [row - 1, col - 1].
+        """
+        if self._legal_move_mask is None:
+            if self.is_over():
+                mask = np.zeros(
+                    (self.board.num_rows, self.board.num_cols), dtype=bool)
+            else:
+                mask = self.board.playable_mask(self.next_player)
+                # Only capturing moves can repeat an earlier position.
+                for point in self.board.capture_points(self.next_player):
+                    if self.does_move_violate_ko(
+                            self.next_player, Move.play(point)):
+                        mask[point.row - 1, point.col - 1] = False
+            mask.flags.writeable = False
+            self._legal_move_mask = mask
+        return self._legal_move_mask
+
+    def board_arrays(self):
+        """Return a BoardArrays snapshot of the position for encoders.
+
+        colors is board.color_array(), string_ids and liberties come
+        from board.string_arrays(), and ko is a bool array that is True
+        on the empty points where the next player's move would repeat
+        an earlier position.
+        """
+        board = self.board
+        ko = np.zeros((board.num_rows, board.num_cols), dtype=bool)
+        for point in board.capture_points(self.next_player):
+            if self.does_move_violate_ko(self.next_player, Move.play(point)):
+                ko[point.row - 1, point.col - 1] = True
+        string_ids, liberties = board.string_arrays()
+        return BoardArrays(board.color_array(), string_ids, liberties, ko)
+
     def legal_moves(self):
         moves = []
-        for row in range(1, self.board.num_rows + 1):
-            for col in range(1, self.board.num_cols + 1):
-                move = Move.play(Point(row, col))
-                if self.is_valid_move(move):
-                    moves.append(move)
+        rows, cols = np.nonzero(self.legal_move_mask())
+        for row, col in zip(rows.tolist(), cols.tolist()):
+            moves.append(Move.play(Point(row + 1, col + 1)))
         # These two moves are always legal.
         moves.append(Move.pass_turn())
         moves.append(Move.resign())
@@ -1,3 +1,4 @@
+import copy
 import unittest
 
 import six
@@ -116,6 +117,24 @@ class BoardTest(unittest.TestCase):
 
         self.assertFalse(board.is_self_capture(Player.black, Point(1, 2)))
 
+    def test_color_array(self):
+        # A white stone captured at 1-1 leaves the point empty.
+        board = Board(3, 4)
+        board.place_stone(Player.white, Point(1, 1))
+        board.place_stone(Player.black, Point(1, 2))
+        board.place_stone(Player.black, Point(2, 1))
+        colors = board.color_array()
+        self.assertEqual((3, 4), colors.shape)
+        self.assertEqual(0, colors[0, 0])
+        self.assertEqual(Player.black.value, colors[0, 1])
+        self.assertEqual(Player.black.value, colors[1, 0])
+        self.assertEqual(10, int((colors == 0).sum()))
+        # Copies don't share colors.
+        copied = copy.deepcopy(board)
+        copied.place_stone(Player.white, Point(3, 4))
+        self.assertEqual(0, board.color_array()[2, 3])
+        self.assertEqual(Player.white.value, copied.color_array()[2, 3])
+
 
 class GameTest(unittest.TestCase):
     def test_new_game(self):
@@ -126,6 +145,26 @@ class GameTest(unittest.TestCase):
         self.assertEqual(Player.white, next_state.next_player)
         self.assertEqual(Player.black, next_state.board.get(Point(16, 16)))
 
+    def test_legal_move_mask(self):
+        # .xo..
+        # xo.o.
+        # .xo..
+        game = GameState.new_game(5)
+        for point in [Point(1, 2), Point(2, 2), Point(2, 1), Point(1, 3),
+                      Point(3, 2), Point(3, 3), Point(5, 5), Point(2, 4)]:
+            game = game.apply_move(Move.play(point))
+        mask = game.legal_move_mask()
+        self.assertEqual((5, 5), mask.shape)
+        self.assertFalse(mask[0, 1])
+        self.assertTrue(mask[1, 2])
+        # Black captures, so white can't retake the ko right away.
+        game = game.apply_move(Move.play(Point(2, 3)))
+        self.assertFalse(game.legal_move_mask()[1, 1])
+        self.assertFalse(game.is_valid_move(Move.play(Point(2, 2))))
+        self.assertNotIn(Move.play(Point(2, 2)), game.legal_moves())
+        self.assertNotIn(Move.play(Point(1, 1)), game.legal_moves())
+        self.assertIn(Move.play(Point(4, 4)), game.legal_moves())
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,9 +1,14 @@
 from __future__ import absolute_import
 # tag::gtp_frontend_imports[]
 import sys
+import threading
+import time
 
+from dlgo.budget import SearchBudget
+from dlgo.gotypes import Player
 from dlgo.gtp import command, response
 from dlgo.gtp.board import gtp_position_to_coords, coords_to_gtp_position
+from dlgo.gtp.time_control import TimeControl
 from dlgo.goboard_fast import GameState, Move
 from dlgo.agent.termination import TerminationAgent
 from dlgo.utils import print_board
@@ -36,12 +41,14 @@ HANDICAP_STONES = {
 
 class GTPFrontend:
 
-    def __init__(self, termination_agent, termination=None):
+    def __init__(self, termination_agent, termination=None, ponder=False,
+                 ponder_budget=None):
         self.agent = termination_agent
         self.game_state = GameState.new_game(19)
         self._input = sys.stdin
         self._output = sys.stdout
         self._stopped = False
+        self.time_control = TimeControl()
 
         self.handlers = {
             'boardsize': self.handle_boardsize,
@@ -51,13 +58,20 @@ class GTPFrontend:
             'known_command': self.handle_known_command,
             'komi': self.ignore,
             'showboard': self.handle_showboard,
-            'time_settings': self.ignore,
-            'time_left': self.ignore,
+            'time_settings': self.handle_time_settings,
+            'time_left': self.handle_time_left,
             'play': self.handle_play,
             'protocol_version': self.handle_protocol_version,
             'quit': self.handle_quit,
         }
 # end::gtp_frontend_init[]
+        # With ponder, an agent that supports it keeps searching in a
+        # background thread after genmove, until the next command
+        # arrives. ponder_budget optionally limits that search.
+        self.ponder = ponder
+        self.ponder_budget = ponder_budget
+        self._ponder_thread = None
+        self._ponder_stop = None
 
 # tag::gtp_frontend_run[]
     def run(self):
@@ -69,10 +83,46 @@ class GTPFrontend:
             self._output.flush()
 
     def process(self, cmd):
+        was_pondering = self.stop_pondering()
+        game_state = self.game_state
         handler = self.handlers.get(cmd.name, self.handle_unknown)
-        return handler(*cmd.args)
+        resp = handler(*cmd.args)
+        # Ponder on our own move, and carry on after commands that leave
+        # the position alone, such as time_left.
+        if self.ponder and not self._stopped and (
+                cmd.name == 'genmove' or
+                (was_pondering and self.game_state is game_state)):
+            self.start_pondering()
+        return resp
 # end::gtp_frontend_run[]
 
+    def start_pondering(self):
+        """Search the current position in a background thread. The
+        agent keeps the tree, so when the opponent's move arrives the
+        next genmove continues from the matching subtree."""
+        if not hasattr(self.agent, 'ponder'):
+            return
+        limits = self.ponder_budget or SearchBudget()
+        self._ponder_stop = threading.Event()
+        budget = SearchBudget(
+            max_rounds=limits.max_rounds, max_seconds=limits.max_seconds,
+            max_nodes=limits.max_nodes, stop_event=self._ponder_stop)
+        self._ponder_thread = threading.Thread(
+            target=self.agent.ponder, args=(self.game_state, budget))
+        self._ponder_thread.daemon = True
+        self._ponder_thread.start()
+
+    def stop_pondering(self):
+        """Stop the background search and wait for it to finish.
+        Returns whether there was one."""
+        if self._ponder_thread is None:
+            return False
+        self._ponder_stop.set()
+        self._ponder_thread.join()
+        self._ponder_thread = None
+        self._ponder_stop = None
+        return True
+
 # tag::gtp_frontend_commands[]
     def handle_play(self, color, move):
         if move.lower() == 'pass':
@@ -84,7 +134,14 @@ class GTPFrontend:
         return response.success()
 
     def handle_genmove(self, color):
+        player = self.game_state.next_player
+        seconds = self.time_control.seconds_for_move(player, self.game_state)
+        if seconds is not None and hasattr(self.agent, 'set_search_budget'):
+            self.agent.set_search_budget(
+                SearchBudget(max_seconds=seconds, early_stop=True))
+        start = time.time()
         move = self.agent.select_move(self.game_state)
+        self.time_control.record_time_used(player, time.time() - start)
         self.game_state = self.game_state.apply_move(move)
         if move.is_pass:
             return response.success('pass')
@@ -121,11 +178,15 @@ class GTPFrontend:
         return response.success()
 
     def handle_time_left(self, color, time, stones):
-        # TODO: Arguments: color color, int time, int stones
+        player = _parse_color(color)
+        if player is None:
+            return response.error('invalid color {}'.format(color))
+        self.time_control.set_time_left(player, float(time), int(stones))
         return response.success()
 
     def handle_time_settings(self, main_time, byo_yomi_time, byo_yomi_stones):
-        # TODO: Arguments: int main_time, int byo_yomi_time, int byo_yomi_stones
+        self.time_control.set_time_settings(
+            float(main_time), float(byo_yomi_time), int(byo_yomi_stones))
         return response.success()
 
     def handle_unknown(self, *args):
@@ -136,3 +197,12 @@ class GTPFrontend:
 
     def handle_protocol_version(self):
         return response.success('2')
+
+
+def _parse_color(color):
+    color = color.lower()
+    if color in ('b', 'black'):
+        return Player.black
+    if color in ('w', 'white'):
+        return Player.white
+    return None
@@ -0,0 +1,71 @@
+import io
+import threading
+import unittest
+
+from dlgo.agent.base import Agent
+from dlgo.goboard_fast import Move
+from dlgo.gotypes import Point
+from dlgo.gtp import command
+from dlgo.gtp.frontend import GTPFrontend
+
+
+class PonderingAgent(Agent):
+    """Plays a fixed move and records its pondering."""
+    def __init__(self):
+        Agent.__init__(self)
+        self.pondered = []
+        self.started = threading.Event()
+
+    def select_move(self, game_state):
+        return Move.play(Point(4, 4))
+
+    def ponder(self, game_state, budget):
+        tracker = budget.start()
+        while not tracker.exhausted():
+            tracker.record()
+            self.started.set()
+        self.pondered.append((game_state, tracker.rounds))
+
+
+class GTPFrontendTest(unittest.TestCase):
+    def run_commands(self, frontend, commands):
+        frontend._input = io.StringIO(''.join(c + '\n' for c in commands))
+        frontend._output = io.StringIO()
+        frontend.run()
+        return frontend._output.getvalue()
+
+    def test_ponder_after_genmove(self):
+        agent = PonderingAgent()
+        frontend = GTPFrontend(agent, ponder=True)
+        output = self.run_commands(frontend, [
+            'genmove black', 'time_left white 60 0', 'play white Q16',
+            'quit'])
+        self.assertIn('= D4', output)
+        self.assertIsNone(frontend._ponder_thread)
+        # Pondered after genmove and again after time_left, which
+        # leaves the position alone, but not after play.
+        self.assertEqual(2, len(agent.pondered))
+        for game_state, _ in agent.pondered:
+            self.assertEqual(Move.play(Point(4, 4)), game_state.last_move)
+        self.assertEqual(
+            Move.play(Point(16, 16)), frontend.game_state.last_move)
+
+    def test_stop_pondering(self):
+        agent = PonderingAgent()
+        frontend = GTPFrontend(agent, ponder=True)
+        frontend.process(command.parse('genmove b'))
+        self.assertTrue(agent.started.wait(5))
+        self.assertTrue(frontend.stop_pondering())
+        self.assertFalse(frontend.stop_pondering())
+        self.assertEqual(1, len(agent.pondered))
+        self.assertGreater(agent.pondered[0][1], 0)
+
+    def test_no_pondering_by_default(self):
+        agent = PonderingAgent()
+        frontend = GTPFrontend(agent)
+        self.run_commands(frontend, ['genmove b', 'quit'])
+        self.assertEqual([], agent.pondered)
+
+
+if __name__ == '__main__':
+    unittest.main()
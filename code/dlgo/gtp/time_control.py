@@ -0,0 +1,84 @@
+"""Game clock for the GTP time_settings and time_left commands.
+
+GTP time settings are Canadian byo-yomi: main_time seconds for the
+game, then byo_yomi_time seconds for every byo_yomi_stones moves. A
+byo_yomi_time of 0 means sudden death after main time, and a positive
+byo_yomi_time with byo_yomi_stones 0 means no time limit at all.
+"""
+from dlgo.gotypes import Player
+from dlgo.scoring import board_to_array
+
+__all__ = [
+    'TimeControl',
+]
+
+
+class TimeControl:
+    def __init__(self, safety_margin=0.5, min_seconds=0.05,
+                 min_moves_left=20):
+        # Seconds held back on every move for lag and bookkeeping.
+        self.safety_margin = safety_margin
+        self.min_seconds = min_seconds
+        # Main time is spread over at least this many of our moves.
+        self.min_moves_left = min_moves_left
+        self.main_time = None
+        self.byo_yomi_time = 0
+        self.byo_yomi_stones = 0
+        self.clocks = {}
+
+    def set_time_settings(self, main_time, byo_yomi_time, byo_yomi_stones):
+        self.main_time = main_time
+        self.byo_yomi_time = byo_yomi_time
+        self.byo_yomi_stones = byo_yomi_stones
+        # Per player: seconds left and stones left in the current
+        # byo-yomi period (0 while in main time).
+        self.clocks = {
+            Player.black: [float(main_time), 0],
+            Player.white: [float(main_time), 0],
+        }
+        if main_time <= 0 and byo_yomi_stones > 0:
+            for player in self.clocks:
+                self.clocks[player] = [float(byo_yomi_time), byo_yomi_stones]
+
+    def set_time_left(self, player, seconds, stones):
+        if self.main_time is None:
+            # time_left without time_settings: treat it as sudden death.
+            self.set_time_settings(seconds, 0, 0)
+        self.clocks[player] = [float(seconds), stones]
+
+    def is_unlimited(self):
+        return self.main_time is None or (
+            self.byo_yomi_time > 0 and self.byo_yomi_stones == 0)
+
+    def seconds_for_move(self, player, game_state):
+        """Seconds to think about the next move, or None without a time
+        limit.
+        """
+        if self.is_unlimited():
+            return None
+        time_left, stones_left = self.clocks[player]
+        if stones_left > 0:
+            seconds = time_left / stones_left
+        else:
+            empty_points = int((board_to_array(game_state.board) == 0).sum())
+            moves_left = max(self.min_moves_left, empty_points // 3)
+            seconds = time_left / moves_left
+            if self.byo_yomi_stones > 0:
+                # Running out of main time just starts byo-yomi.
+                seconds += self.byo_yomi_time / float(self.byo_yomi_stones)
+        return max(self.min_seconds, seconds - self.safety_margin)
+
+    def record_time_used(self, player, seconds):
+        """Run our own clock between time_left updates."""
+        if self.is_unlimited():
+            return
+        clock = self.clocks[player]
+        clock[0] -= seconds
+        if clock[1] > 0:
+            clock[1] -= 1
+            if clock[1] == 0:
+                clock[0] = float(self.byo_yomi_time)
+                clock[1] = self.byo_yomi_stones
+        elif clock[0] <= 0 and self.byo_yomi_stones > 0:
+            clock[0] += self.byo_yomi_time
+            clock[1] = self.byo_yomi_stones
@@ -0,0 +1,67 @@
+import unittest
+
+from dlgo.agent.base import Agent
+from dlgo.agent.termination import TerminationAgent
+from dlgo.goboard_fast import GameState, Move
+from dlgo.gotypes import Player
+from dlgo.gtp import command
+from dlgo.gtp.frontend import GTPFrontend
+from dlgo.gtp.time_control import TimeControl
+
+
+class PassingAgent(Agent):
+    def __init__(self):
+        Agent.__init__(self)
+        self.budget = None
+
+    def set_search_budget(self, budget):
+        self.budget = budget
+
+    def select_move(self, game_state):
+        return Move.pass_turn()
+
+
+class TimeControlTest(unittest.TestCase):
+    def test_unlimited(self):
+        clock = TimeControl()
+        game = GameState.new_game(19)
+        self.assertIsNone(clock.seconds_for_move(Player.black, game))
+        clock.set_time_settings(0, 10, 0)
+        self.assertIsNone(clock.seconds_for_move(Player.black, game))
+
+    def test_main_time(self):
+        clock = TimeControl(safety_margin=0)
+        game = GameState.new_game(19)
+        clock.set_time_settings(600, 0, 0)
+        # 361 empty points: spread over 120 moves.
+        self.assertAlmostEqual(
+            5.0, clock.seconds_for_move(Player.black, game))
+        clock.record_time_used(Player.black, 300)
+        self.assertAlmostEqual(
+            2.5, clock.seconds_for_move(Player.black, game))
+
+    def test_byo_yomi(self):
+        clock = TimeControl(safety_margin=0)
+        game = GameState.new_game(9)
+        clock.set_time_settings(10, 30, 5)
+        clock.record_time_used(Player.white, 12)
+        self.assertEqual([28.0, 5], clock.clocks[Player.white])
+        self.assertAlmostEqual(
+            5.6, clock.seconds_for_move(Player.white, game))
+        for _ in range(5):
+            clock.record_time_used(Player.white, 1)
+        self.assertEqual([30.0, 5], clock.clocks[Player.white])
+
+    def test_frontend_sets_budget(self):
+        bot = PassingAgent()
+        frontend = GTPFrontend(TerminationAgent(bot))
+        frontend.process(command.parse('time_settings 0 30 10'))
+        frontend.process(command.parse('time_left black 20 5'))
+        frontend.process(command.parse('genmove black'))
+        self.assertIsNotNone(bot.budget)
+        self.assertTrue(bot.budget.early_stop)
+        self.assertAlmostEqual(3.5, bot.budget.max_seconds)
+
+
+if __name__ == '__main__':
+    unittest.main()
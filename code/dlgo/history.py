@@ -0,0 +1,152 @@
+__all__ = [
+    'SituationHistory',
+]
+
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_BITS = 64
+_HASH_MASK = (1 << _HASH_BITS) - 1
+
+
+try:
+    _popcount = int.bit_count
+except AttributeError:
+    def _popcount(x):
+        return bin(x).count('1')
+
+
+def _hash(key):
+    return hash(key) & _HASH_MASK
+
+
+class _Node:
+    """Bitmap-compressed trie node. Each entry is a key, a _Node or
+    a _Collision."""
+    __slots__ = ('bitmap', 'entries')
+
+    def __init__(self, bitmap, entries):
+        self.bitmap = bitmap
+        self.entries = entries
+
+
+class _Collision:
+    """Keys whose 64-bit hashes are identical."""
+    __slots__ = ('keys',)
+
+    def __init__(self, keys):
+        self.keys = keys
+
+
+_INNER = (_Node, _Collision)
+
+
+def _pair(key1, hash1, key2, hash2, shift):
+    if shift >= _HASH_BITS:
+        return _Collision((key1, key2))
+    idx1 = (hash1 >> shift) & _MASK
+    idx2 = (hash2 >> shift) & _MASK
+    if idx1 == idx2:
+        child = _pair(key1, hash1, key2, hash2, shift + _BITS)
+        return _Node(1 << idx1, (child,))
+    if idx1 < idx2:
+        entries = (key1, key2)
+    else:
+        entries = (key2, key1)
+    return _Node((1 << idx1) | (1 << idx2), entries)
+
+
+def _insert(node, key, key_hash, shift):
+    """Return a copy of node containing key, or None if it is already
+    present. Only the nodes on the path to key are copied."""
+    if type(node) is _Collision:
+        if key in node.keys:
+            return None
+        return _Collision(node.keys + (key,))
+    bit = 1 << ((key_hash >> shift) & _MASK)
+    pos = _popcount(node.bitmap & (bit - 1))
+    entries = node.entries
+    if not node.bitmap & bit:
+        return _Node(node.bitmap | bit,
+                     entries[:pos] + (key,) + entries[pos:])
+    entry = entries[pos]
+    if type(entry) in _INNER:
+        new_entry = _insert(entry, key, key_hash, shift + _BITS)
+        if new_entry is None:
+            return None
+    elif entry == key:
+        return None
+    else:
+        new_entry = _pair(entry, _hash(entry), key, key_hash, shift + _BITS)
+    return _Node(node.bitmap, entries[:pos] + (new_entry,) + entries[pos + 1:])
+
+
+def _iter_node(node):
+    if type(node) is _Collision:
+        for key in node.keys:
+            yield key
+        return
+    for entry in node.entries:
+        if type(entry) in _INNER:
+            for key in _iter_node(entry):
+                yield key
+        else:
+            yield entry
+
+
+class SituationHistory:
+    """Persistent set of the (player, zobrist hash) situations a game
+    has passed through.
+
+    add() returns a new history and leaves the old one untouched; the two
+    share everything except the O(log32 n) nodes on the path to the new
+    entry, so every GameState in a search tree can keep its own history
+    without copying its parent's.
+    """
+    __slots__ = ('_root', '_size')
+
+    def __init__(self, _root=None, _size=0):
+        self._root = _Node(0, ()) if _root is None else _root
+        self._size = _size
+
+    def add(self, situation):
+        root = _insert(self._root, situation, _hash(situation), 0)
+        if root is None:
+            return self
+        return SituationHistory(root, self._size + 1)
+
+    def __contains__(self, situation):
+        key_hash = _hash(situation)
+        node = self._root
+        shift = 0
+        while True:
+            bitmap = node.bitmap
+            bit = 1 << ((key_hash >> shift) & _MASK)
+            if not bitmap & bit:
+                return False
+            entry = node.entries[_popcount(bitmap & (bit - 1))]
+            cls = type(entry)
+            if cls is _Node:
+                node = entry
+                shift += _BITS
+            elif cls is _Collision:
+                return situation in entry.keys
+            else:
+                return entry == situation
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        return _iter_node(self._root)
+
+    def __reduce__(self):
+        # The trie is laid out by hash(), which for (Player, hash)
+        # situations differs between processes; rebuild it on load.
+        return _from_situations, (tuple(self),)
+
+
+def _from_situations(situations):
+    history = SituationHistory()
+    for situation in situations:
+        history = history.add(situation)
+    return history
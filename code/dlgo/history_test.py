@@ -0,0 +1,106 @@
+import os
+import pickle
+import random
+import subprocess
+import sys
+import unittest
+
+from dlgo.gotypes import Player
+from dlgo.history import SituationHistory
+
+
+# Pickle a history of a few situations, or check which of them a
+# pickled history holds.
+PICKLE_SCRIPT = '''
+import pickle, sys
+from dlgo.gotypes import Player
+from dlgo.history import SituationHistory
+situations = [(Player.black, 1), (Player.white, 2), (Player.black, 3),
+              (Player.white, 4)]
+if sys.argv[1] == 'dump':
+    history = SituationHistory()
+    for situation in situations:
+        history = history.add(situation)
+    sys.stdout.buffer.write(pickle.dumps(history))
+else:
+    history = pickle.loads(sys.stdin.buffer.read())
+    print(len(history), [situation in history for situation in situations])
+'''
+
+
+def run_with_hash_seed(seed, command, stdin=b''):
+    env = dict(os.environ)
+    env['PYTHONHASHSEED'] = str(seed)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env['PYTHONPATH'] = os.pathsep.join(
+        [root] + [path for path in [env.get('PYTHONPATH')] if path])
+    return subprocess.run(
+        [sys.executable, '-c', PICKLE_SCRIPT, command], input=stdin,
+        stdout=subprocess.PIPE, env=env, check=True).stdout
+
+
+class CollidingKey:
+    def __init__(self, value):
+        self.value = value
+
+    def __hash__(self):
+        return 42
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+class SituationHistoryTest(unittest.TestCase):
+    def test_add_is_persistent(self):
+        empty = SituationHistory()
+        one = empty.add((Player.black, 1))
+        two = one.add((Player.white, 2))
+        self.assertEqual(0, len(empty))
+        self.assertNotIn((Player.black, 1), empty)
+        self.assertIn((Player.black, 1), one)
+        self.assertNotIn((Player.white, 2), one)
+        self.assertIn((Player.black, 1), two)
+        self.assertIn((Player.white, 2), two)
+        self.assertIs(two, two.add((Player.white, 2)))
+
+    def test_matches_set(self):
+        rng = random.Random(0)
+        history = SituationHistory()
+        expected = set()
+        for _ in range(2000):
+            key = (rng.choice([Player.black, Player.white]),
+                   rng.getrandbits(64))
+            history = history.add(key)
+            expected.add(key)
+        self.assertEqual(len(expected), len(history))
+        self.assertEqual(expected, set(history))
+        for key in expected:
+            self.assertIn(key, history)
+        self.assertNotIn((Player.black, -1), history)
+
+    def test_hash_collisions(self):
+        history = SituationHistory()
+        for i in range(5):
+            history = history.add(CollidingKey(i))
+        self.assertEqual(5, len(history))
+        self.assertIn(CollidingKey(3), history)
+        self.assertNotIn(CollidingKey(7), history)
+
+    def test_pickle(self):
+        history = SituationHistory()
+        for i in range(100):
+            history = history.add((Player.black, i))
+        loaded = pickle.loads(pickle.dumps(history))
+        self.assertEqual(100, len(loaded))
+        self.assertIn((Player.black, 42), loaded)
+
+    def test_pickle_across_hash_seeds(self):
+        # Players hash by name, so the layout of the trie depends on the
+        # hash seed of the process.
+        dumped = run_with_hash_seed(1, 'dump')
+        loaded = run_with_hash_seed(2, 'load', dumped)
+        self.assertEqual(b'4 [True, True, True, True]', loaded.strip())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1 +1,3 @@
 from .mcts import *
+from .rollout import *
+from .tree import *
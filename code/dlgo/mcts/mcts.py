@@ -1,8 +1,17 @@
 import math
+import multiprocessing
+import queue
 import random
 
+import numpy as np
+
 from dlgo import agent
+from dlgo.agent.helpers import detached_state, moves_since
+from dlgo.budget import SearchBudget
 from dlgo.gotypes import Player
+from dlgo.mcts.rollout import RolloutEngine, play_out_snapshots
+from dlgo.mcts.tree import TreeNode, TreePosition
+from dlgo.transposition import TranspositionTable, situation_key
 from dlgo.utils import coords_from_point
 
 __all__ = [
@@ -22,25 +31,33 @@ def fmt(x):
     return coords_from_point(x.point)
 
 
-def show_tree(node, indent='', max_depth=3):
+def show_tree(node, indent='', max_depth=3, player=None, move=None):
+    """Print the tree below a search root. player made move, the move
+    leading to node; both are None at the root."""
     if max_depth < 0:
         return
     if node is None:
         return
-    if node.parent is None:
+    if player is None:
         print('%sroot' % indent)
+        next_player = node.game_state.next_player
     else:
-        player = node.parent.game_state.next_player
-        move = node.move
         print('%s%s %s %d %.3f' % (
             indent, fmt(player), fmt(move),
             node.num_rollouts,
             node.winning_frac(player),
         ))
-    for child in sorted(node.children, key=lambda n: n.num_rollouts, reverse=True):
-        show_tree(child, indent + '  ', max_depth - 1)
+        next_player = player.other
+    edges = sorted(zip(node.child_moves, node.children),
+                   key=lambda edge: edge[1].num_rollouts, reverse=True)
+    for child_move, child in edges:
+        show_tree(child, indent + '  ', max_depth - 1, next_player,
+                  child_move)
 
 
+# The node class from the book, with a game state per node, searched by
+# SimpleMCTSAgent. MCTSAgent searches compact TreeNodes instead (see
+# tree.py).
 # tag::mcts-node[]
 class MCTSNode(object):
     def __init__(self, game_state, parent=None, move=None):
@@ -84,7 +101,9 @@ class MCTSNode(object):
 # end::mcts-readers[]
 
 
-class MCTSAgent(agent.Agent):
+class SimpleMCTSAgent(agent.Agent):
+    """The search of the book, on MCTSNodes, with a game state per
+    node. MCTSAgent below runs the same search on TreeNodes."""
     def __init__(self, num_rounds, temperature):
         agent.Agent.__init__(self)
         self.num_rounds = num_rounds
@@ -161,9 +180,428 @@ class MCTSAgent(agent.Agent):
 
     @staticmethod
     def simulate_random_game(game):
+        return MCTSAgent.simulate_random_game(game)
+
+
+def _search_root(args):
+    """Pool task for root parallelism: search an independent tree and
+    return the statistics of the root's children.
+    """
+    game_state, budget, temperature, rollout_batch_size, seed, \
+        transpositions = args
+    bot = MCTSAgent(
+        budget.max_rounds, temperature,
+        rollout_batch_size=rollout_batch_size, seed=seed, budget=budget,
+        transpositions=transpositions)
+    root = bot.get_root(game_state)
+    bot.run_search(root)
+    return [
+        (move, child.win_counts, child.num_rollouts)
+        for move, child in zip(root.child_moves, root.children)]
+
+
+class MCTSAgent(agent.Agent):
+    """Monte Carlo tree search with random rollouts.
+
+    With rollout_batch_size > 1, leaves are collected under virtual loss
+    and played out together by a RolloutEngine.
+
+    With num_workers > 1 the search runs in a process pool, using either
+    root parallelism (parallelism='root': every worker searches its own
+    tree for num_rounds / num_workers rounds and the root statistics are
+    summed) or tree parallelism (parallelism='tree': this process owns
+    the tree and keeps the workers busy with batches of
+    rollout_batch_size leaves under virtual loss). Each task gets its
+    own seed, derived from `seed`. Call close() to shut the pool down.
+
+    The search runs num_rounds rounds unless a SearchBudget is given.
+
+    With reuse_tree, the subtree of the move played is kept, and the next
+    search continues from the node matching the opponent's reply instead
+    of starting from scratch (not for root parallelism, whose trees live
+    in the workers).
+
+    With transpositions, positions reached through different move orders
+    share one node, found through a TranspositionTable, which turns the
+    tree into a DAG. Results are backed up along the path a round took,
+    not through parent links, so a shared node is counted once per round.
+
+    The tree is made of compact TreeNodes that hold no game state: each
+    round replays its path on a TreePosition, which makes and takes back
+    the moves on a single board.
+    """
+    def __init__(self, num_rounds, temperature, rollout_batch_size=1,
+                 num_workers=1, parallelism='root', seed=None, budget=None,
+                 reuse_tree=True, transpositions=False):
+        agent.Agent.__init__(self)
+        if parallelism not in ('root', 'tree'):
+            raise ValueError(parallelism)
+        self.num_rounds = num_rounds
+        self.budget = budget if budget is not None \
+            else SearchBudget(max_rounds=num_rounds)
+        self.temperature = temperature
+        self.rollout_batch_size = rollout_batch_size
+        self.num_workers = num_workers
+        self.parallelism = parallelism
+        self.rollout_engine = RolloutEngine(seed=seed)
+        # The agent's own random state, so seeding one agent leaves the
+        # global state, and every other agent, alone.
+        self._rng = random.Random(seed)
+        self._np_rng = np.random.RandomState(self._next_seed())
+        self._pool = None
+        self.reuse_tree = reuse_tree
+        self._root = None
+        self.transpositions = transpositions
+        self.transposition_table = TranspositionTable() \
+            if transpositions else None
+
+    def _next_seed(self):
+        return self._rng.randint(0, 2 ** 31 - 1)
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(self.num_workers)
+        return self._pool
+
+    def set_search_budget(self, budget):
+        self.budget = budget
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def get_root(self, game_state):
+        """Return the node to search game_state from: the matching node of
+        the kept tree if there is one, otherwise a fresh node.
+        """
+        root = None
+        if self.reuse_tree and self._root is not None:
+            moves = moves_since(self._root.game_state, game_state)
+            if moves is not None:
+                root = self._root
+                for move in moves:
+                    root = self.find_child(root, move)
+                    if root is None:
+                        break
+        if root is None:
+            root = TreeNode()
+        # Detaching the node releases the rest of the old tree.
+        root.parent = None
+        root.game_state = game_state
+        self._root = None
+        if self.transposition_table is not None:
+            self.index_transpositions(root)
+        return root
+
+    @staticmethod
+    def find_child(node, move):
+        for child_move, child in zip(node.child_moves, node.children):
+            if child_move == move:
+                return child
+        return None
+
+    def index_transpositions(self, root):
+        """Fill the transposition table with the nodes below root."""
+        table = self.transposition_table
+        table.clear()
+        position = TreePosition(root.game_state)
+        table.put(situation_key(root.game_state), root)
+        seen = {id(root)}
+        # Depth first, playing each edge on the way down and taking it
+        # back once the subtree below it is done.
+        edges = [iter(zip(root.child_moves, root.children))]
+        while edges:
+            edge = next(edges[-1], None)
+            if edge is None:
+                edges.pop()
+                if edges:
+                    position.undo()
+                continue
+            move, child = edge
+            if id(child) in seen:
+                continue
+            seen.add(id(child))
+            position.play(move)
+            table.put(position.situation_key(), child)
+            edges.append(iter(zip(child.child_moves, child.children)))
+
+    def ponder(self, game_state, budget):
+        """Search game_state until budget runs out, typically while the
+        opponent thinks about it. With reuse_tree, the next select_move
+        continues from the node of the opponent's reply."""
+        if not self.reuse_tree or game_state.is_over():
+            return
+        root = self.get_root(game_state)
+        search_budget = self.budget
+        self.budget = budget
+        try:
+            self.run_search(root)
+        finally:
+            self.budget = search_budget
+        self._root = root
+
+    def keep_subtree(self, root, move):
+        if not self.reuse_tree:
+            return
+        child = self.find_child(root, move)
+        if child is not None:
+            child.parent = None
+            child.game_state = root.game_state.apply_move(move)
+            self._root = child
+
+    def select_move(self, game_state):
+        if self.num_workers > 1 and self.parallelism == 'root':
+            return self.select_move_root_parallel(game_state)
+        root = self.get_root(game_state)
+        self.run_search(root)
+
+        scored_moves = [
+            (child.winning_frac(game_state.next_player), move, child.num_rollouts)
+            for move, child in zip(root.child_moves, root.children)
+        ]
+        scored_moves.sort(key=lambda x: x[0], reverse=True)
+        for s, m, n in scored_moves[:10]:
+            print('%s - %.3f (%d)' % (m, s, n))
+
+        # Having performed as many MCTS rounds as we have time for, we
+        # now pick a move.
+        best_move = None
+        best_pct = -1.0
+        for move, child in zip(root.child_moves, root.children):
+            child_pct = child.winning_frac(game_state.next_player)
+            if child_pct > best_pct:
+                best_pct = child_pct
+                best_move = move
+        print('Select move %s with win pct %.3f' % (best_move, best_pct))
+        self.keep_subtree(root, best_move)
+        return best_move
+
+    def run_search(self, root):
+        if self.num_workers > 1 and self.parallelism == 'tree':
+            self.run_tree_parallel_rounds(root)
+        elif self.rollout_batch_size > 1:
+            self.run_batched_rounds(root)
+        else:
+            self.run_rounds(root)
+
+    @staticmethod
+    def root_visit_counts(root):
+        return lambda: [child.num_rollouts for child in root.children]
+
+    def run_rounds(self, root):
+        budget = self.budget.start()
+        position = TreePosition(root.game_state)
+        while not budget.exhausted(self.root_visit_counts(root)):
+            # Walk down the tree and add a new child node into it.
+            path = self.select_path(root, position, budget)
+
+            # Simulate a random game from this node.
+            winner = self.simulate_random_game(
+                position.state(), self._np_rng)
+            position.reset()
+
+            # Propagate scores back up the tree.
+            for node in path:
+                node.record_win(winner)
+
+    @staticmethod
+    def visit(node, position):
+        """Fill in the unvisited moves of node, which position is at, on
+        its first visit."""
+        if node.unvisited_moves is None:
+            node.unvisited_moves = position.legal_move_indices()
+
+    def expand(self, node, position):
+        """Add a random unvisited child to node, reusing the node of a
+        transposition if there is one, and play its move on position.
+        Returns the child and whether it is new."""
+        move_index = node.pop_move(
+            self._rng.randint(0, len(node.unvisited_moves) - 1))
+        move = position.moves[move_index]
+        position.play(move)
+        table = self.transposition_table
+        child = None
+        if table is not None:
+            key = position.situation_key()
+            child = table.get(key)
+        is_new = child is None
+        if is_new:
+            child = TreeNode(node, move)
+            if table is not None:
+                table.put(key, child)
+        node.children.append(child)
+        node.child_moves.append(move)
+        return child, is_new
+
+    def select_path(self, root, position, budget):
+        """Walk down from root by UCT and expand one new child, playing
+        the moves on position, which starts out at root. Returns the
+        nodes visited, root first; position is left where the walk
+        ended."""
+        path = [root]
+        on_path = {id(root)}
+        node = root
+        self.visit(node, position)
+        while (not node.can_add_child()) and (not position.is_over()):
+            move, child = self.select_child(node, position.next_player)
+            if id(child) in on_path:
+                # A transposition led back into the path; play out from
+                # here rather than go round in circles.
+                break
+            position.play(move)
+            node = child
+            path.append(node)
+            on_path.add(id(node))
+            self.visit(node, position)
+        if node.can_add_child():
+            node, is_new = self.expand(node, position)
+            if id(node) not in on_path:
+                path.append(node)
+            budget.record(nodes=1 if is_new else 0)
+        else:
+            budget.record(nodes=0)
+        return path
+
+    def collect_leaves(self, root, position, budget):
+        """Select and expand up to rollout_batch_size leaves, putting a
+        virtual loss on each path.
+
+        Returns (finished, pending): (path, winner) for the paths that
+        end in a finished game and (path, snapshot) for the ones to play
+        out, where snapshot is a dlgo.mcts.rollout.snapshot. Paths start
+        at the root.
+        """
+        num_leaves = self.rollout_batch_size
+        remaining = budget.remaining_rounds()
+        if remaining is not None:
+            num_leaves = max(1, min(num_leaves, remaining))
+        finished = []
+        pending = []
+        for _ in range(num_leaves):
+            path = self.select_path(root, position, budget)
+            if position.is_over():
+                finished.append((path, position.winner()))
+            else:
+                pending.append((path, position.snapshot()))
+            position.reset()
+            for node in path:
+                node.add_virtual_loss()
+        return finished, pending
+
+    @staticmethod
+    def back_up(results):
+        """Revert the virtual losses of (path, winner) pairs and record
+        the winners."""
+        for path, winner in results:
+            for node in path:
+                node.revert_virtual_loss()
+                node.record_win(winner)
+
+    def run_batched_rounds(self, root):
+        budget = self.budget.start()
+        position = TreePosition(root.game_state)
+        while not budget.exhausted(self.root_visit_counts(root)):
+            finished, pending = self.collect_leaves(root, position, budget)
+            if pending:
+                paths, snapshots = zip(*pending)
+                winners = self.rollout_engine.winners_from_snapshots(
+                    snapshots)
+                finished.extend(zip(paths, winners))
+            self.back_up(finished)
+
+    def run_tree_parallel_rounds(self, root):
+        pool = self._get_pool()
+        results = queue.Queue()
+        budget = self.budget.start()
+        position = TreePosition(root.game_state)
+        visit_counts = self.root_visit_counts(root)
+        in_flight = 0
+        while True:
+            # Keep two batches per worker queued so no worker idles while
+            # this process backs up results.
+            while in_flight < 2 * self.num_workers and \
+                    not budget.exhausted(visit_counts):
+                finished, pending = self.collect_leaves(
+                    root, position, budget)
+                self.back_up(finished)
+                if not pending:
+                    continue
+                paths, snapshots = zip(*pending)
+                pool.apply_async(
+                    play_out_snapshots,
+                    (list(snapshots), self._next_seed()),
+                    callback=lambda winners, paths=paths:
+                        results.put((paths, winners)),
+                    error_callback=lambda exc: results.put((None, exc)))
+                in_flight += 1
+            if in_flight == 0:
+                if budget.exhausted(visit_counts):
+                    break
+                continue
+            paths, winners = results.get()
+            in_flight -= 1
+            if paths is None:
+                raise winners
+            self.back_up(zip(paths, winners))
+
+    def select_move_root_parallel(self, game_state):
+        state = detached_state(game_state)
+        budget = self.budget.split(self.num_workers)
+        tasks = [
+            (state, budget, self.temperature, self.rollout_batch_size,
+             self._next_seed(), self.transpositions)
+            for _ in range(self.num_workers)]
+        stats = {}
+        for children in self._get_pool().map(_search_root, tasks):
+            for move, win_counts, num_rollouts in children:
+                wins, total = stats.get(move, (0, 0))
+                stats[move] = (
+                    wins + win_counts[game_state.next_player],
+                    total + num_rollouts)
+
+        scored_moves = [
+            (float(wins) / total, move, total)
+            for move, (wins, total) in stats.items()]
+        scored_moves.sort(key=lambda x: x[0], reverse=True)
+        for s, m, n in scored_moves[:10]:
+            print('%s - %.3f (%d)' % (m, s, n))
+        # Without children, as in a finished game, there is no best move;
+        # the serial search returns None as well.
+        best_pct, best_move = -1.0, None
+        if scored_moves:
+            best_pct, best_move, _ = scored_moves[0]
+        print('Select move %s with win pct %.3f' % (best_move, best_pct))
+        return best_move
+
+    def select_child(self, node, player):
+        """Select a child according to the upper confidence bound for
+        trees (UCT) metric. player is the player to move at node.
+        Returns the move leading to the child, and the child.
+        """
+        total_rollouts = sum(child.num_rollouts for child in node.children)
+        log_rollouts = math.log(total_rollouts)
+
+        best_score = -1
+        best_move, best_child = None, None
+        # Loop over each child.
+        for move, child in zip(node.child_moves, node.children):
+            # Calculate the UCT score.
+            win_percentage = child.winning_frac(player)
+            exploration_factor = math.sqrt(log_rollouts / child.num_rollouts)
+            uct_score = win_percentage + self.temperature * exploration_factor
+            # Check if this is the largest we've seen so far.
+            if uct_score > best_score:
+                best_score = uct_score
+                best_move, best_child = move, child
+        return best_move, best_child
+
+    @staticmethod
+    def simulate_random_game(game, rng=None):
         bots = {
-            Player.black: agent.FastRandomBot(),
-            Player.white: agent.FastRandomBot(),
+            Player.black: agent.FastRandomBot(rng),
+            Player.white: agent.FastRandomBot(rng),
         }
         while not game.is_over():
             bot_move = bots[game.next_player].select_move(game)
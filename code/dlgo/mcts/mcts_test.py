@@ -0,0 +1,165 @@
+import random
+import unittest
+
+import numpy as np
+
+from dlgo import goboard_fast
+from dlgo.budget import SearchBudget
+from dlgo.gotypes import Player, Point
+from dlgo.mcts.mcts import MCTSAgent, SimpleMCTSAgent
+from dlgo.mcts.tree import TreePosition
+
+
+class ParallelMCTSTest(unittest.TestCase):
+    def test_root_parallel_is_deterministic(self):
+        game = goboard_fast.GameState.new_game(5)
+        moves = []
+        for _ in range(2):
+            bot = MCTSAgent(
+                60, temperature=1.4, num_workers=2, parallelism='root',
+                seed=7)
+            try:
+                moves.append(bot.select_move(game))
+            finally:
+                bot.close()
+        self.assertTrue(game.is_valid_move(moves[0]))
+        self.assertEqual(moves[0], moves[1])
+
+    def test_root_parallel_without_moves(self):
+        game = goboard_fast.GameState.new_game(5)
+        game = game.apply_move(goboard_fast.Move.pass_turn())
+        game = game.apply_move(goboard_fast.Move.pass_turn())
+        moves = []
+        for num_workers in (1, 2):
+            bot = MCTSAgent(
+                20, temperature=1.4, num_workers=num_workers,
+                parallelism='root', seed=7)
+            try:
+                moves.append(bot.select_move(game))
+            finally:
+                bot.close()
+        self.assertEqual([None, None], moves)
+
+    def test_tree_parallel_counts_every_round(self):
+        game = goboard_fast.GameState.new_game(5)
+        bot = MCTSAgent(
+            60, temperature=1.4, rollout_batch_size=4, num_workers=2,
+            parallelism='tree', seed=7)
+        root = bot.get_root(game)
+        try:
+            bot.run_search(root)
+        finally:
+            bot.close()
+        self.assertEqual(60, root.num_rollouts)
+        self.assertEqual(
+            60, root.win_counts[Player.black] + root.win_counts[Player.white])
+        self.assertEqual(
+            60, sum(child.num_rollouts for child in root.children))
+
+
+class BudgetTest(unittest.TestCase):
+    def test_budget_overrides_num_rounds(self):
+        game = goboard_fast.GameState.new_game(5)
+        for batch_size in (1, 4):
+            bot = MCTSAgent(
+                1000, temperature=1.4, rollout_batch_size=batch_size,
+                seed=3, budget=SearchBudget(max_rounds=30))
+            root = bot.get_root(game)
+            bot.run_search(root)
+            self.assertEqual(30, root.num_rollouts)
+
+
+class RandomStateTest(unittest.TestCase):
+    def test_seed_is_per_agent(self):
+        game = goboard_fast.GameState.new_game(5)
+        random.seed(11)
+        np.random.seed(11)
+        expected = (random.random(), np.random.random())
+        moves = []
+        for _ in range(2):
+            random.seed(11)
+            np.random.seed(11)
+            bot = MCTSAgent(40, temperature=1.4, seed=3, reuse_tree=False)
+            moves.append(bot.select_move(game))
+            # The global random states are left alone.
+            self.assertEqual(expected, (random.random(), np.random.random()))
+        self.assertEqual(moves[0], moves[1])
+
+
+class TreeReuseTest(unittest.TestCase):
+    def test_reuses_grandchild(self):
+        game = goboard_fast.GameState.new_game(5)
+        bot = MCTSAgent(300, temperature=1.4, seed=3)
+        move = bot.select_move(game)
+        kept = bot._root
+        self.assertEqual(move, kept.move)
+        self.assertIsNone(kept.parent)
+        reply = max(kept.children, key=lambda child: child.num_rollouts)
+        visits = reply.num_rollouts
+        self.assertGreater(visits, 0)
+
+        # The game continues on a separate copy of the state.
+        game = game.apply_move(move).apply_move(reply.move)
+        root = bot.get_root(game)
+        self.assertIs(reply, root)
+        self.assertIsNone(root.parent)
+        self.assertEqual(visits, root.num_rollouts)
+
+    def test_unrelated_position_starts_fresh(self):
+        game = goboard_fast.GameState.new_game(5)
+        bot = MCTSAgent(50, temperature=1.4, seed=3)
+        bot.select_move(game)
+        other = goboard_fast.GameState.new_game(5).apply_move(
+            goboard_fast.Move.pass_turn())
+        other = other.apply_move(goboard_fast.Move.pass_turn())
+        self.assertEqual(0, bot.get_root(other).num_rollouts)
+
+
+class TranspositionTest(unittest.TestCase):
+    def expand_with(self, bot, node, position, move):
+        bot.visit(node, position)
+        node.unvisited_moves = [position.moves.index(move)]
+        return bot.expand(node, position)
+
+    def test_move_orders_share_a_node(self):
+        bot = MCTSAgent(10, temperature=1.4, transpositions=True)
+        root = bot.get_root(goboard_fast.GameState.new_game(5))
+        position = TreePosition(root.game_state)
+        a, b, c = [goboard_fast.Move.play(Point(r, r)) for r in (1, 2, 3)]
+        first, _ = self.expand_with(bot, root, position, a)
+        first, _ = self.expand_with(bot, first, position, b)
+        first, is_new = self.expand_with(bot, first, position, c)
+        self.assertTrue(is_new)
+        position.reset()
+        second, _ = self.expand_with(bot, root, position, c)
+        second, _ = self.expand_with(bot, second, position, b)
+        second, is_new = self.expand_with(bot, second, position, a)
+        self.assertFalse(is_new)
+        self.assertIs(first, second)
+        self.assertEqual(1, bot.transposition_table.saved_expansions)
+
+    def test_search_counts_each_round_once(self):
+        game = goboard_fast.GameState.new_game(5)
+        for batch_size in (1, 8):
+            bot = MCTSAgent(400, temperature=1.4, seed=5,
+                            rollout_batch_size=batch_size,
+                            transpositions=True)
+            root = bot.get_root(game)
+            bot.run_search(root)
+            self.assertEqual(400, root.num_rollouts)
+            # Every node also counts the rounds that reached it through
+            # its other parents, but no round is counted twice.
+            self.assertGreaterEqual(
+                root.num_rollouts,
+                sum(child.num_rollouts for child in root.children))
+
+
+class SimpleMCTSAgentTest(unittest.TestCase):
+    def test_select_move(self):
+        game = goboard_fast.GameState.new_game(5)
+        move = SimpleMCTSAgent(30, temperature=1.4).select_move(game)
+        self.assertTrue(game.is_valid_move(move))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,205 @@
+import copy
+import time
+
+import numpy as np
+
+from dlgo import goboard_array
+from dlgo.goboard_array import OFF_BOARD
+from dlgo.gotypes import Player
+from dlgo.scoring import area_scores, board_to_array
+
+__all__ = [
+    'RolloutEngine',
+    'play_out_snapshots',
+    'snapshot',
+]
+
+
+class _Tables:
+    """Padded index tables for vectorized move generation."""
+    def __init__(self, geometry):
+        width = geometry.width
+        self.on_board = np.array(geometry.on_board)
+        self.neighbors = np.stack([
+            self.on_board + delta for delta in (-width, width, -1, 1)])
+        self.corners = np.stack([
+            self.on_board + delta
+            for delta in (-width - 1, -width + 1, width - 1, width + 1)])
+        # Padded index -> position in on_board.
+        self.position = np.full(geometry.size, -1, dtype=np.int64)
+        self.position[self.on_board] = np.arange(len(self.on_board))
+
+
+_tables = {}
+
+
+def _get_tables(geometry):
+    dim = (geometry.num_rows, geometry.num_cols)
+    if dim not in _tables:
+        _tables[dim] = _Tables(geometry)
+    return _tables[dim]
+
+
+def _array_board(board):
+    if isinstance(board, goboard_array.Board):
+        return copy.deepcopy(board)
+    return goboard_array.Board.from_color_array(board_to_array(board))
+
+
+def _passed(game_state):
+    return game_state.last_move is not None and game_state.last_move.is_pass
+
+
+def snapshot(game_state):
+    """Compact, picklable form of an unfinished game state for playing
+    it out in another process: colors, player to move, whether the last
+    move was a pass, and the legal move mask.
+    """
+    return (
+        board_to_array(game_state.board),
+        game_state.next_player.value,
+        _passed(game_state),
+        game_state.legal_move_mask())
+
+
+def play_out_snapshots(snapshots, seed=None):
+    """Pool task: play out snapshots with a freshly seeded engine."""
+    return RolloutEngine(seed=seed).winners_from_snapshots(snapshots)
+
+
+def _eye_mask(colors, to_move, tables):
+    """Vectorized dlgo.agent.helpers_fast.is_point_an_eye.
+
+    colors is (num_games, padded_size), to_move is (num_games, 1).
+    Returns (num_games, num_points): is the point an eye of the player
+    to move.
+    """
+    neighbors = colors[:, tables.neighbors]
+    corners = colors[:, tables.corners]
+    to_move = to_move[:, :, np.newaxis]
+    surrounded = np.all(
+        (neighbors == to_move) | (neighbors == OFF_BOARD), axis=1)
+    friendly_corners = np.sum(corners == to_move, axis=1)
+    off_board_corners = np.sum(corners == OFF_BOARD, axis=1)
+    corners_ok = np.where(
+        off_board_corners > 0,
+        off_board_corners + friendly_corners == 4,
+        friendly_corners >= 3)
+    empty = colors[:, tables.on_board] == 0
+    return empty & surrounded & corners_ok
+
+
+class RolloutEngine:
+    """Plays many random games to the end in lockstep.
+
+    Every game moves at each step: a uniformly random legal move that
+    does not fill one of the mover's own eyes, the same policy as
+    FastRandomBot, or a pass if there is none. Legality and eye checks
+    are done for all games at once on array boards. The first move of
+    each game honors the full GameState rules (superko); after that
+    simple ko is enforced.
+    """
+    def __init__(self, komi=7.5, max_moves=None, seed=None):
+        self.komi = komi
+        self.max_moves = max_moves
+        self._rng = np.random.RandomState(seed)
+        self.num_playouts = 0
+        self.num_moves = 0
+        self.elapsed = 0.0
+
+    def playouts_per_second(self):
+        if self.elapsed == 0:
+            return 0.0
+        return self.num_playouts / self.elapsed
+
+    def winners(self, game_states):
+        """Play out every game state and return the list of winners."""
+        start = time.time()
+        winners = [None] * len(game_states)
+        pending = []
+        for i, game_state in enumerate(game_states):
+            if game_state.is_over():
+                winners[i] = game_state.winner()
+            else:
+                pending.append(i)
+        if pending:
+            states = [game_states[i] for i in pending]
+            results = self._play_out(
+                [_array_board(state.board) for state in states],
+                [state.next_player.value for state in states],
+                [_passed(state) for state in states],
+                [state.legal_move_mask() for state in states])
+            for i, winner in zip(pending, results):
+                winners[i] = winner
+        self.num_playouts += len(game_states)
+        self.elapsed += time.time() - start
+        return winners
+
+    def winners_from_snapshots(self, snapshots):
+        """Like winners, for the output of snapshot()."""
+        start = time.time()
+        colors, to_move, passed, legal = zip(*snapshots)
+        winners = self._play_out(
+            [goboard_array.Board.from_color_array(c) for c in colors],
+            to_move, passed, legal)
+        self.num_playouts += len(snapshots)
+        self.elapsed += time.time() - start
+        return winners
+
+    def _play_out(self, boards, to_move, passed, legal):
+        geometry = boards[0].geometry
+        tables = _get_tables(geometry)
+        num_points = len(tables.on_board)
+        to_move = np.array(to_move, dtype=np.uint8)
+        passes = [1 if p else 0 for p in passed]
+        legal = np.stack([mask.ravel() for mask in legal])
+        max_moves = self.max_moves or 4 * num_points
+        active = list(range(len(boards)))
+
+        for step in range(max_moves):
+            colors = np.frombuffer(
+                b''.join([boards[i].color_buffer() for i in active]),
+                dtype=np.uint8).reshape((len(active), geometry.size))
+            movers = to_move[active]
+            if step == 0:
+                candidates = legal
+            else:
+                playable = np.frombuffer(
+                    b''.join([
+                        boards[i].playable_buffer(to_move[i])
+                        for i in active]),
+                    dtype=np.uint8).reshape((len(active), geometry.size))
+                candidates = playable[:, tables.on_board].astype(bool)
+                for k, i in enumerate(active):
+                    ko = boards[i].ko_index
+                    if ko is not None:
+                        candidates[k, tables.position[ko]] = False
+            candidates &= ~_eye_mask(colors, movers[:, np.newaxis], tables)
+
+            keys = self._rng.random_sample(candidates.shape)
+            keys[~candidates] = -1.0
+            choices = tables.on_board[np.argmax(keys, axis=1)].tolist()
+            has_move = candidates.any(axis=1).tolist()
+
+            still_active = []
+            for k, i in enumerate(active):
+                board = boards[i]
+                if has_move[k]:
+                    board.place_stone_at(int(to_move[i]), choices[k])
+                    passes[i] = 0
+                    self.num_moves += 1
+                else:
+                    board.clear_ko()
+                    passes[i] += 1
+                to_move[i] = 3 - to_move[i]
+                if passes[i] < 2:
+                    still_active.append(i)
+            active = still_active
+            if not active:
+                break
+
+        colors = np.stack([board.color_array() for board in boards])
+        black_scores, white_scores = area_scores(colors)
+        return [
+            Player.black if b > w + self.komi else Player.white
+            for b, w in zip(black_scores.tolist(), white_scores.tolist())]
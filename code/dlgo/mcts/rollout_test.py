@@ -0,0 +1,62 @@
+import random
+import unittest
+
+import numpy as np
+
+from dlgo import goboard_array
+from dlgo import goboard_fast
+from dlgo.agent.helpers_fast import is_point_an_eye
+from dlgo.gotypes import Player, Point
+from dlgo.mcts import rollout
+from dlgo.mcts.mcts import MCTSAgent
+
+
+class RolloutEngineTest(unittest.TestCase):
+    def test_eye_mask(self):
+        rng = random.Random(0)
+        game = goboard_array.GameState.new_game(7)
+        tables = rollout._get_tables(game.board.geometry)
+        for _ in range(60):
+            board = game.board
+            colors = np.frombuffer(
+                bytes(board.color_buffer()), dtype=np.uint8)[np.newaxis]
+            for player in (Player.black, Player.white):
+                to_move = np.array([[player.value]], dtype=np.uint8)
+                mask = rollout._eye_mask(colors, to_move, tables)[0]
+                expected = [
+                    is_point_an_eye(board, Point(r, c), player)
+                    for r in range(1, 8) for c in range(1, 8)]
+                self.assertEqual(expected, mask.tolist())
+            moves = [m for m in game.legal_moves() if m.is_play]
+            game = game.apply_move(rng.choice(moves))
+
+    def test_winners(self):
+        start = goboard_fast.GameState.new_game(9)
+        finished = start.apply_move(goboard_fast.Move.pass_turn()) \
+            .apply_move(goboard_fast.Move.pass_turn())
+        states = [start] * 8 + [finished]
+        engine = rollout.RolloutEngine(seed=3)
+        winners = engine.winners(states)
+        self.assertEqual(9, len(winners))
+        self.assertEqual(Player.white, winners[-1])
+        self.assertEqual(
+            winners, rollout.RolloutEngine(seed=3).winners(states))
+        self.assertEqual(9, engine.num_playouts)
+        self.assertGreater(engine.num_moves, 8 * 40)
+
+    def test_batched_mcts(self):
+        game = goboard_array.GameState.new_game(5)
+        bot = MCTSAgent(64, temperature=1.4, rollout_batch_size=16)
+        move = bot.select_move(game)
+        self.assertTrue(game.is_valid_move(move))
+        # Leaves in finished games, after a resignation say, are scored
+        # without a playout.
+        self.assertGreater(bot.rollout_engine.num_playouts, 0)
+        self.assertLessEqual(bot.rollout_engine.num_playouts, 64)
+        root = bot.get_root(game)
+        bot.run_search(root)
+        self.assertEqual(64, root.num_rollouts)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,228 @@
+"""Compact search tree for MCTSAgent.
+
+Nodes keep no game state. A TreePosition follows the search down the
+tree instead: it plays the moves of the path on one goboard_array board
+and takes them back afterwards, and a GameState is only built when a
+caller asks for one.
+"""
+import array
+import collections
+
+import numpy as np
+
+from dlgo.goboard_fast import Move
+from dlgo.gotypes import Player, Point
+from dlgo.mcts.rollout import _array_board
+
+__all__ = [
+    'TreeNode',
+    'TreePosition',
+    'get_move_table',
+]
+
+
+_move_tables = {}
+
+
+def get_move_table(num_rows, num_cols):
+    """The moves of a board size by move index: the points in row major
+    order, then pass and resign. Nodes share these Move objects."""
+    dim = (num_rows, num_cols)
+    moves = _move_tables.get(dim)
+    if moves is None:
+        moves = [
+            Move.play(Point(row, col))
+            for row in range(1, num_rows + 1)
+            for col in range(1, num_cols + 1)]
+        moves.append(Move.pass_turn())
+        moves.append(Move.resign())
+        _move_tables[dim] = moves
+    return moves
+
+
+class TreeNode:
+    """A node of MCTSAgent's search tree.
+
+    A node knows the move that led to it and its parent, but not its
+    game state; only the root of a search keeps one. The moves not tried
+    yet are an array of move indices (see get_move_table), filled in by
+    the search on the first visit, so unvisited_moves is None until then.
+    """
+    __slots__ = (
+        'game_state', 'parent', 'move', 'black_wins', 'white_wins',
+        'num_rollouts', 'children', 'child_moves', 'unvisited_moves')
+
+    def __init__(self, parent=None, move=None, game_state=None):
+        self.game_state = game_state
+        self.parent = parent
+        self.move = move
+        self.black_wins = 0
+        self.white_wins = 0
+        self.num_rollouts = 0
+        self.children = []
+        # The move leading to each child. With transpositions a child
+        # can be shared by several parents, and its own move attribute
+        # only records the first one.
+        self.child_moves = []
+        self.unvisited_moves = None
+
+    @property
+    def win_counts(self):
+        return {Player.black: self.black_wins, Player.white: self.white_wins}
+
+    def record_win(self, winner):
+        if winner == Player.black:
+            self.black_wins += 1
+        else:
+            self.white_wins += 1
+        self.num_rollouts += 1
+
+    def can_add_child(self):
+        return len(self.unvisited_moves) > 0
+
+    def pop_move(self, index):
+        """Remove the unvisited move at index and return its move index."""
+        moves = self.unvisited_moves
+        move_index = moves[index]
+        moves[index] = moves[-1]
+        moves.pop()
+        return move_index
+
+    def winning_frac(self, player):
+        wins = self.black_wins if player == Player.black else self.white_wins
+        return float(wins) / float(self.num_rollouts)
+
+    def add_virtual_loss(self):
+        # A pending rollout counts as a visit that nobody won, so
+        # selection spreads out while its result is outstanding.
+        self.num_rollouts += 1
+
+    def revert_virtual_loss(self):
+        self.num_rollouts -= 1
+
+
+class TreePosition:
+    """The position of the node a search has walked down to.
+
+    Starts out at root_state. play() and undo() make and take back
+    moves in place on a goboard_array board, keeping the situations of
+    the path for superko; state() builds the GameState of the current
+    position by replaying the path from root_state.
+    """
+    def __init__(self, root_state):
+        self.root_state = root_state
+        board = root_state.board
+        self.num_rows, self.num_cols = board.num_rows, board.num_cols
+        self.moves = get_move_table(self.num_rows, self.num_cols)
+        self.num_points = self.num_rows * self.num_cols
+        self.board = _array_board(board)
+        self.next_player = root_state.next_player
+        self._path = []
+        self._situations = collections.Counter()
+
+    @property
+    def depth(self):
+        return len(self._path)
+
+    def play(self, move):
+        situation = (self.next_player, self.board.zobrist_hash())
+        if move.is_play:
+            self.board.play(self.next_player, move.point)
+        self._path.append((move, situation))
+        self._situations[situation] += 1
+        self.next_player = self.next_player.other
+
+    def undo(self):
+        move, situation = self._path.pop()
+        if move.is_play:
+            self.board.undo()
+        self._situations[situation] -= 1
+        if self._situations[situation] == 0:
+            del self._situations[situation]
+        self.next_player = self.next_player.other
+
+    def reset(self):
+        """Take back every move, back to root_state."""
+        while self._path:
+            self.undo()
+
+    def last_moves(self):
+        """The last two moves, most recent first; None where the game
+        has fewer."""
+        moves = [move for move, _ in self._path[-2:]][::-1]
+        state = self.root_state
+        while len(moves) < 2 and state is not None:
+            moves.append(state.last_move)
+            state = state.previous_state
+        return (moves + [None, None])[:2]
+
+    def is_over(self):
+        last, second_last = self.last_moves()
+        if last is None:
+            return False
+        if last.is_resign:
+            return True
+        return second_last is not None and last.is_pass and \
+            second_last.is_pass
+
+    def winner(self):
+        last, _ = self.last_moves()
+        if last is not None and last.is_resign:
+            return self.next_player
+        return self.state().winner()
+
+    def _repeats(self, situation):
+        return situation in self._situations or \
+            situation in self.root_state.previous_states
+
+    def legal_move_mask(self):
+        """Like GameState.legal_move_mask."""
+        if self.is_over():
+            return np.zeros((self.num_rows, self.num_cols), dtype=bool)
+        player = self.next_player
+        board = self.board
+        mask = board.playable_mask(player)
+        for point in board.capture_points(player):
+            situation = (player.other, board.hash_after_move(player, point))
+            if self._repeats(situation):
+                mask[point.row - 1, point.col - 1] = False
+        return mask
+
+    def legal_move_indices(self):
+        """Move indices of the legal moves, pass and resign included, as
+        an array; empty once the game is over."""
+        if self.is_over():
+            return array.array('H')
+        indices = array.array(
+            'H', np.flatnonzero(self.legal_move_mask()).tolist())
+        indices.append(self.num_points)
+        indices.append(self.num_points + 1)
+        return indices
+
+    def situation_key(self):
+        """dlgo.transposition.situation_key of the current position."""
+        passes = 0
+        for move in self.last_moves():
+            if move is None:
+                break
+            if move.is_resign:
+                return None
+            if not move.is_pass:
+                break
+            passes += 1
+        return (self.board.zobrist_hash(), self.next_player, passes)
+
+    def snapshot(self):
+        """dlgo.mcts.rollout.snapshot of the current position."""
+        last, _ = self.last_moves()
+        return (
+            self.board.color_array(),
+            self.next_player.value,
+            last is not None and last.is_pass,
+            self.legal_move_mask())
+
+    def state(self):
+        state = self.root_state
+        for move, _ in self._path:
+            state = state.apply_move(move)
+        return state
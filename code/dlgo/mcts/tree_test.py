@@ -0,0 +1,111 @@
+import array
+import random
+import unittest
+
+import numpy as np
+
+from dlgo import goboard_fast
+from dlgo.gotypes import Player, Point
+from dlgo.mcts import rollout
+from dlgo.mcts.tree import TreeNode, TreePosition, get_move_table
+from dlgo.transposition import situation_key
+
+
+def play_all(moves, board_size=5):
+    """Black and white alternate; None is a pass."""
+    game = goboard_fast.GameState.new_game(board_size)
+    for move in moves:
+        if move is None:
+            game = game.apply_move(goboard_fast.Move.pass_turn())
+        else:
+            game = game.apply_move(goboard_fast.Move.play(Point(*move)))
+    return game
+
+
+class TreePositionTest(unittest.TestCase):
+    def check(self, position, state):
+        self.assertEqual(state.next_player, position.next_player)
+        self.assertEqual(state.is_over(), position.is_over())
+        self.assertEqual(
+            state.legal_move_mask().tolist(),
+            position.legal_move_mask().tolist())
+        self.assertEqual(situation_key(state), position.situation_key())
+        expected = rollout.snapshot(state)
+        for a, b in zip(expected, position.snapshot()):
+            self.assertEqual(np.asarray(a).tolist(), np.asarray(b).tolist())
+
+    def test_replays_random_lines(self):
+        rng = random.Random(0)
+        root = play_all([(1, 1), (3, 3), (2, 2)])
+        position = TreePosition(root)
+        for _ in range(10):
+            states = [root]
+            for _ in range(rng.randint(1, 25)):
+                if states[-1].is_over():
+                    break
+                moves = [
+                    position.moves[i]
+                    for i in position.legal_move_indices()]
+                move = rng.choice(moves[:-1])
+                position.play(move)
+                states.append(states[-1].apply_move(move))
+                self.check(position, states[-1])
+            self.assertEqual(len(states) - 1, position.depth)
+            while position.depth > 0:
+                position.undo()
+                states.pop()
+                self.check(position, states[-1])
+        self.assertEqual(root.board.zobrist_hash(),
+                         position.board.zobrist_hash())
+
+    def test_ko_and_passes(self):
+        # White (2, 2) is captured by black (2, 3) and may not be
+        # retaken at once.
+        root = play_all([
+            (1, 2), (2, 2), (3, 2), (1, 3), (2, 1), (3, 3), None, (2, 4)])
+        position = TreePosition(root)
+        position.play(goboard_fast.Move.play(Point(2, 3)))
+        self.assertFalse(position.legal_move_mask()[1, 1])
+        self.check(position, position.state())
+        position.play(goboard_fast.Move.pass_turn())
+        position.play(goboard_fast.Move.pass_turn())
+        self.assertTrue(position.is_over())
+        self.assertEqual(0, len(position.legal_move_indices()))
+        self.assertEqual(position.state().winner(), position.winner())
+        position.reset()
+        position.play(goboard_fast.Move.resign())
+        self.assertTrue(position.is_over())
+        self.assertIsNone(position.situation_key())
+        self.assertEqual(Player.white, position.winner())
+
+
+class TreeNodeTest(unittest.TestCase):
+    def test_pop_move(self):
+        node = TreeNode()
+        node.unvisited_moves = array.array('H', [4, 7, 9])
+        self.assertEqual(4, node.pop_move(0))
+        self.assertEqual([9, 7], node.unvisited_moves.tolist())
+        self.assertEqual(7, node.pop_move(1))
+        self.assertEqual(9, node.pop_move(0))
+        self.assertFalse(node.can_add_child())
+
+    def test_win_counts(self):
+        node = TreeNode()
+        node.record_win(Player.black)
+        node.record_win(Player.white)
+        node.record_win(Player.white)
+        self.assertEqual(
+            {Player.black: 1, Player.white: 2}, node.win_counts)
+        self.assertAlmostEqual(2 / 3.0, node.winning_frac(Player.white))
+
+    def test_move_table(self):
+        moves = get_move_table(3, 4)
+        self.assertEqual(14, len(moves))
+        self.assertEqual(goboard_fast.Move.play(Point(2, 1)), moves[4])
+        self.assertTrue(moves[12].is_pass)
+        self.assertTrue(moves[13].is_resign)
+        self.assertIs(moves, get_move_table(3, 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,275 @@
+import time
+
+from dlgo.agent import Agent
+from dlgo.transposition import situation_key
+
+__all__ = [
+    'AlphaBetaSearch',
+    'IterativeDeepeningAgent',
+    'SearchResult',
+]
+
+MAX_SCORE = 999999
+MIN_SCORE = -999999
+
+# Bound flags of transposition table entries.
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class SearchResult:
+    def __init__(self, move, score, depth, nodes, elapsed, depth_nodes):
+        self.move = move
+        self.score = score
+        # Deepest iteration that finished.
+        self.depth = depth
+        self.nodes = nodes
+        self.elapsed = elapsed
+        # Nodes searched by each finished iteration, depth 1 first.
+        self.depth_nodes = depth_nodes
+
+    def nodes_per_second(self):
+        if self.elapsed == 0:
+            return 0.0
+        return self.nodes / self.elapsed
+
+    def effective_branching_factor(self):
+        """Growth in nodes from the second deepest finished iteration to
+        the deepest, or None after a single iteration."""
+        if len(self.depth_nodes) < 2:
+            return None
+        return self.depth_nodes[-1] / float(max(1, self.depth_nodes[-2]))
+
+    def __repr__(self):
+        return 'SearchResult(move=%s, score=%r, depth=%d, nodes=%d)' % (
+            self.move, self.score, self.depth, self.nodes)
+
+
+class AlphaBetaSearch:
+    """Iterative deepening negamax search with alpha-beta pruning.
+
+    eval_fn scores a position for the player to move, like the eval_fn of
+    AlphaBetaAgent. Each iteration searches one ply deeper than the last,
+    until max_depth, max_seconds or max_nodes runs out; the move of the
+    deepest finished iteration is played.
+
+    Moves are tried in the order: the best move stored in the
+    transposition table, the two killer moves of the ply (moves that
+    caused a cutoff in a sibling), then by history score (how often and
+    how deep a move has caused cutoffs). The table is keyed by
+    dlgo.transposition.situation_key, so it ignores the move history
+    that superko depends on.
+    """
+    # Look at the clock every this many nodes.
+    check_interval = 256
+
+    def __init__(self, eval_fn, max_table_size=1000000):
+        self.eval_fn = eval_fn
+        self.max_table_size = max_table_size
+        # situation key -> (depth, score, flag, best move)
+        self.table = {}
+        self.history = {}
+        self.killers = []
+        self.nodes = 0
+        self._deadline = None
+        self._max_nodes = None
+
+    def clear(self):
+        self.table.clear()
+        self.history.clear()
+
+    def search(self, game_state, max_depth=None, max_seconds=None,
+               max_nodes=None):
+        if max_depth is None and max_seconds is None and max_nodes is None:
+            raise ValueError('The search needs a depth, time or node limit')
+        start = time.time()
+        self.nodes = 0
+        self.killers = []
+        # Halve the history scores, so old cutoffs count for less.
+        for move in self.history:
+            self.history[move] //= 2
+
+        best_move = None
+        best_score = None
+        depth_nodes = []
+        depth = 0
+        while max_depth is None or depth < max_depth:
+            # The first iteration always finishes, so there is a move.
+            if depth > 0:
+                if max_seconds is not None:
+                    self._deadline = start + max_seconds
+                self._max_nodes = max_nodes
+            nodes_before = self.nodes
+            try:
+                score, move = self._root(game_state, depth + 1)
+            except SearchTimeout:
+                break
+            finally:
+                self._deadline = None
+                self._max_nodes = None
+            depth += 1
+            depth_nodes.append(self.nodes - nodes_before)
+            best_move, best_score = move, score
+            if abs(score) >= MAX_SCORE:
+                # The game is decided; deeper searches can't change that.
+                break
+            if max_seconds is not None and time.time() - start >= max_seconds:
+                break
+            if max_nodes is not None and self.nodes >= max_nodes:
+                break
+        return SearchResult(best_move, best_score, depth, self.nodes,
+                            time.time() - start, depth_nodes)
+
+    def _root(self, game_state, depth):
+        alpha = MIN_SCORE - 1
+        best_score = None
+        best_move = None
+        for move in self.ordered_moves(game_state, 0):
+            score = -self._negamax(
+                game_state.apply_move(move), depth - 1,
+                MIN_SCORE - 1, -alpha, 1)
+            if best_score is None or score > best_score:
+                best_score = score
+                best_move = move
+            alpha = max(alpha, score)
+        self.store(game_state, depth, best_score, EXACT, best_move)
+        return best_score, best_move
+
+    def _negamax(self, game_state, depth, alpha, beta, ply):
+        self.nodes += 1
+        if self.nodes % self.check_interval == 0:
+            self._check_limits()
+        if game_state.is_over():
+            if game_state.winner() == game_state.next_player:
+                return MAX_SCORE
+            return MIN_SCORE
+        if depth == 0:
+            return self.eval_fn(game_state)
+
+        key = situation_key(game_state)
+        entry = self.table.get(key)
+        tt_move = None
+        if entry is not None:
+            entry_depth, score, flag, tt_move = entry
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    return score
+                if flag == LOWER_BOUND:
+                    alpha = max(alpha, score)
+                elif flag == UPPER_BOUND:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+
+        original_alpha = alpha
+        best_score = None
+        best_move = None
+        for move in self.ordered_moves(game_state, ply, tt_move):
+            score = -self._negamax(
+                game_state.apply_move(move), depth - 1, -beta, -alpha,
+                ply + 1)
+            if best_score is None or score > best_score:
+                best_score = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                self.record_cutoff(move, depth, ply)
+                break
+
+        if best_score <= original_alpha:
+            flag = UPPER_BOUND
+        elif best_score >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.store(game_state, depth, best_score, flag, best_move, key)
+        return best_score
+
+    def _check_limits(self):
+        if self._deadline is not None and time.time() >= self._deadline:
+            raise SearchTimeout()
+        if self._max_nodes is not None and self.nodes >= self._max_nodes:
+            raise SearchTimeout()
+
+    def store(self, game_state, depth, score, flag, move, key=None):
+        if key is None:
+            key = situation_key(game_state)
+        table = self.table
+        old = table.get(key)
+        if old is not None:
+            if old[0] > depth:
+                # Keep the deeper result.
+                return
+        elif len(table) >= self.max_table_size:
+            # Make room by dropping the oldest entry.
+            del table[next(iter(table))]
+        table[key] = (depth, score, flag, move)
+
+    def record_cutoff(self, move, depth, ply):
+        if move.is_play:
+            killers = self.killers[ply]
+            if move not in killers:
+                killers.insert(0, move)
+                del killers[2:]
+        self.history[move] = self.history.get(move, 0) + depth * depth
+
+    def ordered_moves(self, game_state, ply, tt_move=None):
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        history = self.history
+        moves = [
+            move for move in game_state.legal_moves() if not move.is_resign]
+        moves.sort(key=lambda move: history.get(move, 0), reverse=True)
+        first = []
+        if tt_move is None and ply == 0:
+            entry = self.table.get(situation_key(game_state))
+            if entry is not None:
+                tt_move = entry[3]
+        if tt_move is not None:
+            first.append(tt_move)
+        for killer in self.killers[ply]:
+            if tt_move is None or killer != tt_move:
+                first.append(killer)
+        if not first:
+            return moves
+        legal = set(moves)
+        first = [move for move in first if move in legal]
+        return first + [move for move in moves if move not in first]
+
+
+class IterativeDeepeningAgent(Agent):
+    """Plays the move of an AlphaBetaSearch, by default thinking for
+    max_seconds per move. The transposition table and history scores
+    carry over from one move to the next."""
+    def __init__(self, eval_fn, max_seconds=1.0, max_depth=None,
+                 max_nodes=None, max_table_size=1000000):
+        Agent.__init__(self)
+        self.search = AlphaBetaSearch(eval_fn, max_table_size)
+        self.max_seconds = max_seconds
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.last_result = None
+
+    def set_search_budget(self, budget):
+        """Take the limits of a SearchBudget. Alpha-beta has no rounds,
+        so max_rounds counts as a node limit unless max_nodes is set. A
+        budget without any of these keeps the current limits."""
+        max_nodes = budget.max_nodes
+        if max_nodes is None:
+            max_nodes = budget.max_rounds
+        if budget.max_seconds is None and max_nodes is None:
+            return
+        self.max_seconds = budget.max_seconds
+        self.max_nodes = max_nodes
+
+    def select_move(self, game_state):
+        self.last_result = self.search.search(
+            game_state, max_depth=self.max_depth,
+            max_seconds=self.max_seconds, max_nodes=self.max_nodes)
+        return self.last_result.move
@@ -0,0 +1,83 @@
+import unittest
+
+from dlgo import goboard_fast
+from dlgo.budget import SearchBudget
+from dlgo.gotypes import Player, Point
+from dlgo.minimax import depthprune
+from dlgo.minimax.iterative import AlphaBetaSearch, IterativeDeepeningAgent
+
+
+def stone_diff(game_state):
+    colors = game_state.board.color_array()
+    diff = int((colors == Player.black.value).sum()) - \
+        int((colors == Player.white.value).sum())
+    if game_state.next_player == Player.black:
+        return diff
+    return -1 * diff
+
+
+def opening(board_size, moves):
+    game = goboard_fast.GameState.new_game(board_size)
+    for point in moves:
+        game = game.apply_move(goboard_fast.Move.play(Point(*point)))
+    return game
+
+
+class AlphaBetaSearchTest(unittest.TestCase):
+    def test_matches_full_minimax(self):
+        game = opening(4, [(2, 2), (2, 3), (3, 3), (3, 2)])
+        for depth in (1, 2, 3):
+            expected = max(
+                -depthprune.best_result(
+                    game.apply_move(move), depth - 1, stone_diff)
+                for move in game.legal_moves())
+            search = AlphaBetaSearch(stone_diff)
+            result = search.search(game, max_depth=depth)
+            self.assertEqual(depth, result.depth)
+            self.assertEqual(expected, result.score)
+            self.assertEqual(
+                expected,
+                -depthprune.best_result(
+                    game.apply_move(result.move), depth - 1, stone_diff))
+
+    def test_captures(self):
+        # The white stone on (1, 1) is in atari.
+        game = opening(5, [(1, 2), (1, 1), (4, 4)])
+        game = game.apply_move(goboard_fast.Move.pass_turn())
+        result = AlphaBetaSearch(stone_diff).search(game, max_depth=2)
+        self.assertEqual(goboard_fast.Move.play(Point(2, 1)), result.move)
+
+    def test_reports(self):
+        game = opening(5, [(3, 3)])
+        result = AlphaBetaSearch(stone_diff).search(game, max_depth=3)
+        self.assertEqual(3, len(result.depth_nodes))
+        self.assertEqual(result.nodes, sum(result.depth_nodes))
+        self.assertGreater(result.nodes_per_second(), 0)
+        self.assertGreater(result.effective_branching_factor(), 1)
+
+    def test_node_limit(self):
+        agent = IterativeDeepeningAgent(
+            stone_diff, max_seconds=None, max_nodes=500)
+        move = agent.select_move(opening(5, [(3, 3)]))
+        self.assertTrue(move.is_play or move.is_pass)
+        self.assertGreaterEqual(agent.last_result.depth, 1)
+        self.assertLess(agent.last_result.nodes, 1000)
+
+    def test_search_budget(self):
+        agent = IterativeDeepeningAgent(stone_diff)
+        agent.set_search_budget(SearchBudget(max_rounds=300))
+        self.assertIsNone(agent.max_seconds)
+        self.assertEqual(300, agent.max_nodes)
+        move = agent.select_move(opening(5, [(3, 3)]))
+        self.assertTrue(move.is_play or move.is_pass)
+        self.assertLess(agent.last_result.nodes, 600)
+        # A budget without limits keeps the ones the agent has.
+        agent.set_search_budget(SearchBudget())
+        self.assertEqual(300, agent.max_nodes)
+        agent.set_search_budget(SearchBudget(max_seconds=0.5))
+        self.assertEqual(0.5, agent.max_seconds)
+        self.assertIsNone(agent.max_nodes)
+
+
+if __name__ == '__main__':
+    unittest.main()
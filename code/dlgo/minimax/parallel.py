@@ -0,0 +1,188 @@
+import multiprocessing
+import time
+
+from dlgo.agent.helpers import detached_state
+from dlgo.minimax.iterative import AlphaBetaSearch, IterativeDeepeningAgent, \
+    SearchTimeout, EXACT, MIN_SCORE
+
+__all__ = [
+    'ParallelAlphaBetaSearch',
+    'ParallelIterativeDeepeningAgent',
+]
+
+# Per worker process: its own search, with its own transposition table,
+# the best root score found so far by any process, and the nodes left to
+# the iteration, shared by all processes.
+_worker_search = None
+_shared_alpha = None
+_shared_nodes = None
+
+
+class _WorkerSearch(AlphaBetaSearch):
+    """The search of a pool worker. With a node limit, it takes its
+    nodes from _shared_nodes, so the workers together stay within the
+    limit. It takes up to node_chunk at a time, and less as the shared
+    nodes run out, so no worker sits on nodes another one needs."""
+    check_interval = 1
+    node_chunk = 256
+
+    def _check_limits(self):
+        if self._deadline is not None and time.time() >= self._deadline:
+            raise SearchTimeout()
+        if self._max_nodes is not None and self.nodes > self._max_nodes:
+            self._max_nodes += _take_nodes(self.node_chunk)
+            if self.nodes > self._max_nodes:
+                # Out of nodes; this one is not searched.
+                self.nodes -= 1
+                raise SearchTimeout()
+
+
+def _take_nodes(num_nodes):
+    with _shared_nodes.get_lock():
+        left = _shared_nodes.value
+        num_nodes = max(0, min(num_nodes, left, (left + 7) // 8))
+        _shared_nodes.value -= num_nodes
+    return num_nodes
+
+
+def _init_worker(eval_fn, max_table_size, shared_alpha, shared_nodes):
+    global _worker_search, _shared_alpha, _shared_nodes
+    _worker_search = _WorkerSearch(eval_fn, max_table_size)
+    _shared_alpha = shared_alpha
+    _shared_nodes = shared_nodes
+
+
+def _search_root_move(args):
+    """Pool task: score one root move. Moves that can't beat the best
+    score found so far only get an upper bound.
+
+    Returns (move, score, exact, nodes); score is None on a timeout.
+    """
+    game_state, move, depth, deadline, limit_nodes = args
+    search = _worker_search
+    search.nodes = 0
+    search.killers = []
+    search._deadline = deadline
+    search._max_nodes = 0 if limit_nodes else None
+    alpha = _shared_alpha.value
+    try:
+        score = -search._negamax(
+            game_state.apply_move(move), depth - 1, MIN_SCORE - 1, -alpha, 1)
+    except SearchTimeout:
+        return move, None, False, search.nodes
+    finally:
+        if limit_nodes:
+            # Give back the nodes taken but not searched.
+            with _shared_nodes.get_lock():
+                _shared_nodes.value += search._max_nodes - search.nodes
+        search._deadline = None
+        search._max_nodes = None
+    exact = score > alpha
+    if exact:
+        with _shared_alpha.get_lock():
+            if score > _shared_alpha.value:
+                _shared_alpha.value = score
+    return move, score, exact, search.nodes
+
+
+class ParallelAlphaBetaSearch(AlphaBetaSearch):
+    """AlphaBetaSearch that splits the root moves of every iteration
+    across a pool of num_workers processes.
+
+    The first move in the ordering (the best move of the previous
+    iteration) is searched on its own to set a bound; then the rest run
+    in parallel. Workers publish the best root score through shared
+    memory, and each root move is searched with the best bound known
+    when it starts. A node limit holds for all of them together: the
+    workers take the nodes they search from a shared count. eval_fn
+    must be picklable, i.e. a module-level function. Call close() to
+    shut the pool down.
+    """
+    def __init__(self, eval_fn, num_workers=None, max_table_size=1000000):
+        AlphaBetaSearch.__init__(self, eval_fn, max_table_size)
+        self.num_workers = num_workers or multiprocessing.cpu_count()
+        self.root_scores = {}
+        self._pool = None
+        self._shared_alpha = None
+        self._shared_nodes = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._shared_alpha = multiprocessing.Value('d', MIN_SCORE - 1)
+            self._shared_nodes = multiprocessing.Value('q', 0)
+            self._pool = multiprocessing.Pool(
+                self.num_workers, _init_worker,
+                (self.eval_fn, self.max_table_size, self._shared_alpha,
+                 self._shared_nodes))
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def search(self, game_state, max_depth=None, max_seconds=None,
+               max_nodes=None):
+        self.root_scores = {}
+        return AlphaBetaSearch.search(
+            self, game_state, max_depth, max_seconds, max_nodes)
+
+    def _root(self, game_state, depth):
+        pool = self._get_pool()
+        state = detached_state(game_state)
+        moves = self.ordered_moves(game_state, 0)
+        if self.root_scores:
+            # The previous iteration's scores, best first; the table move
+            # keeps its place at the front.
+            scores = self.root_scores
+            first, rest = moves[:1], moves[1:]
+            rest.sort(key=lambda move: scores.get(move, MIN_SCORE),
+                      reverse=True)
+            moves = first + rest
+        limit_nodes = self._max_nodes is not None
+        if limit_nodes:
+            # The nodes left to the search, for all root moves together.
+            self._shared_nodes.value = max(0, self._max_nodes - self.nodes)
+        tasks = [
+            (state, move, depth, self._deadline, limit_nodes)
+            for move in moves]
+
+        self._shared_alpha.value = MIN_SCORE - 1
+        results = [pool.apply(_search_root_move, (tasks[0],))]
+        results.extend(pool.imap_unordered(_search_root_move, tasks[1:]))
+
+        order = {move: i for i, move in enumerate(moves)}
+        best_move = None
+        best_score = None
+        timed_out = False
+        for move, score, exact, nodes in results:
+            self.nodes += nodes
+            if score is None:
+                timed_out = True
+            elif exact:
+                # The first move is always exact; bounds never win.
+                self.root_scores[move] = score
+                if best_score is None or score > best_score or (
+                        score == best_score and
+                        order[move] < order[best_move]):
+                    best_score = score
+                    best_move = move
+        if timed_out:
+            raise SearchTimeout()
+        self.store(game_state, depth, best_score, EXACT, best_move)
+        return best_score, best_move
+
+
+class ParallelIterativeDeepeningAgent(IterativeDeepeningAgent):
+    """IterativeDeepeningAgent searching with a ParallelAlphaBetaSearch."""
+    def __init__(self, eval_fn, num_workers=None, max_seconds=1.0,
+                 max_depth=None, max_nodes=None, max_table_size=1000000):
+        IterativeDeepeningAgent.__init__(
+            self, eval_fn, max_seconds, max_depth, max_nodes,
+            max_table_size)
+        self.search = ParallelAlphaBetaSearch(
+            eval_fn, num_workers, max_table_size)
+
+    def close(self):
+        self.search.close()
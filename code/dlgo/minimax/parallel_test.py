@@ -0,0 +1,50 @@
+import unittest
+
+from dlgo.minimax.iterative import AlphaBetaSearch
+from dlgo.minimax.iterative_test import opening, stone_diff
+from dlgo.minimax.parallel import ParallelAlphaBetaSearch, \
+    ParallelIterativeDeepeningAgent
+
+
+class ParallelAlphaBetaSearchTest(unittest.TestCase):
+    def test_matches_serial_search(self):
+        game = opening(5, [(3, 3), (3, 4), (4, 4)])
+        search = ParallelAlphaBetaSearch(stone_diff, num_workers=2)
+        try:
+            for depth in (1, 2, 3):
+                expected = AlphaBetaSearch(stone_diff).search(
+                    game, max_depth=depth)
+                result = search.search(game, max_depth=depth)
+                self.assertEqual(depth, result.depth)
+                self.assertEqual(expected.score, result.score)
+                self.assertGreater(result.nodes, 0)
+        finally:
+            search.close()
+
+    def test_node_limit(self):
+        game = opening(5, [(3, 3), (3, 4), (4, 4)])
+        search = ParallelAlphaBetaSearch(stone_diff, num_workers=2)
+        try:
+            for max_nodes in (300, 1000, 3000):
+                result = search.search(game, max_nodes=max_nodes)
+                # The first iteration always finishes; the rest share
+                # the budget.
+                self.assertGreater(result.depth, 1)
+                self.assertLessEqual(result.nodes, max_nodes)
+        finally:
+            search.close()
+
+    def test_time_limit(self):
+        agent = ParallelIterativeDeepeningAgent(
+            stone_diff, num_workers=2, max_seconds=0.5)
+        try:
+            move = agent.select_move(opening(5, [(3, 3)]))
+        finally:
+            agent.close()
+        self.assertTrue(move.is_play)
+        self.assertGreaterEqual(agent.last_result.depth, 1)
+        self.assertLess(agent.last_result.elapsed, 5.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
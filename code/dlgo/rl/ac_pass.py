@@ -32,8 +32,8 @@ class ACAgent(Agent):
     def select_move(self, game_state):
         num_moves = self.encoder.board_width * self.encoder.board_height
 
-        board_tensor = self.encoder.encode(game_state)
-        x = np.array([board_tensor])
+        x = self.encoder.encode_batch([game_state])
+        board_tensor = x[0]
 
         actions, values = self.model.predict(x)
         move_probs = actions[0]
@@ -37,21 +37,20 @@ class QAgent(Agent):
         self.policy = policy
 
     def select_move(self, game_state):
-        board_tensor = self.encoder.encode(game_state)
+        encoded = self.encoder.encode_batch([game_state])
+        board_tensor = encoded[0]
 
         # Loop over all legal moves.
         moves = []
-        board_tensors = []
         for move in game_state.legal_moves():
             if not move.is_play:
                 continue
             moves.append(self.encoder.encode_point(move.point))
-            board_tensors.append(board_tensor)
         if not moves:
             return goboard.Move.pass_turn()
 
         num_moves = len(moves)
-        board_tensors = np.array(board_tensors)
+        board_tensors = np.repeat(encoded, num_moves, axis=0)
         move_vectors = np.zeros((num_moves, self.encoder.num_points()))
         for i, move in enumerate(moves):
             move_vectors[i][move] = 1
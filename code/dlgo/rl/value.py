@@ -7,6 +7,7 @@ from dlgo import goboard
 from dlgo import kerasutil
 from dlgo.agent import Agent
 from dlgo.agent.helpers import is_point_an_eye
+from dlgo.evalcache import cached_predict, cached_predict_batch
 
 __all__ = [
     'ValueAgent',
@@ -24,11 +25,23 @@ class ValueAgent(Agent):
         self.policy = policy
 
         self.last_move_value = 0
+        self.eval_cache = None
 
     def predict(self, game_state):
-        encoded_state = self.encoder.encode(game_state)
-        input_tensor = np.array([encoded_state])
-        return self.model.predict(input_tensor)[0]
+        return cached_predict(
+            self.eval_cache, game_state, self.encoder.encode_batch,
+            self.model.predict, 'value')
+
+    def predict_batch(self, game_states):
+        """Like predict, for many game states with a single call to the
+        model. Returns an array of len(game_states) values."""
+        values = np.zeros(len(game_states))
+        outputs = cached_predict_batch(
+            self.eval_cache, game_states, self.encoder.encode_batch,
+            self.model.predict, 'value')
+        for i, value in enumerate(outputs):
+            values[i] = value[0]
+        return values
 
     def set_temperature(self, temperature):
         self.temperature = temperature
@@ -36,6 +49,9 @@ class ValueAgent(Agent):
     def set_collector(self, collector):
         self.collector = collector
 
+    def set_eval_cache(self, eval_cache):
+        self.eval_cache = eval_cache
+
     def set_policy(self, policy):
         if policy not in ('eps-greedy', 'weighted'):
             raise ValueError(policy)
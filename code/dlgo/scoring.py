@@ -2,6 +2,8 @@
 from __future__ import absolute_import
 from collections import namedtuple
 
+import numpy as np
+
 from dlgo.gotypes import Player, Point
 # end::scoring_imports[]
 
@@ -28,6 +30,18 @@ class Territory:
                 self.num_dame += 1
                 self.dame_points.append(point)
 
+    @classmethod
+    def from_counts(cls, num_black_stones, num_white_stones,
+                    num_black_territory, num_white_territory, dame_points):
+        territory = cls({})
+        territory.num_black_stones = num_black_stones
+        territory.num_white_stones = num_white_stones
+        territory.num_black_territory = num_black_territory
+        territory.num_white_territory = num_white_territory
+        territory.num_dame = len(dame_points)
+        territory.dame_points = dame_points
+        return territory
+
 # <1> A `territory_map` splits the board into stones, territory and neutral points (dame).
 # <2> Depending on the status of a point, we increment the respective counter.
 # end::scoring_territory[]
@@ -130,9 +144,102 @@ def _collect_region(start_pos, board, visited=None):
 
 # tag::scoring_compute_game_result[]
 def compute_game_result(game_state):
-    territory = evaluate_territory(game_state.board)
+    territory = evaluate_territory_array(board_to_array(game_state.board))
     return GameResult(
         territory.num_black_territory + territory.num_black_stones,
         territory.num_white_territory + territory.num_white_stones,
         komi=7.5)
 # end::scoring_compute_game_result[]
+
+
+def board_to_array(board):
+    """Return a (num_rows, num_cols) uint8 array holding 0 for empty
+    points and Player.value for stones.
+    """
+    if hasattr(board, 'color_array'):
+        return board.color_array()
+    colors = np.zeros((board.num_rows, board.num_cols), dtype=np.uint8)
+    for r in range(board.num_rows):
+        for c in range(board.num_cols):
+            stone = board.get(Point(row=r + 1, col=c + 1))
+            if stone is not None:
+                colors[r, c] = stone.value
+    return colors
+
+
+def _grow(mask):
+    grown = mask.copy()
+    grown[..., 1:, :] |= mask[..., :-1, :]
+    grown[..., :-1, :] |= mask[..., 1:, :]
+    grown[..., :, 1:] |= mask[..., :, :-1]
+    grown[..., :, :-1] |= mask[..., :, 1:]
+    return grown
+
+
+def _reach(stones, empty):
+    """Empty points connected to a stone through empty points."""
+    reach = _grow(stones) & empty
+    while True:
+        grown = _grow(reach) & empty
+        if np.array_equal(grown, reach):
+            return reach
+        reach = grown
+
+
+def _territory_masks(colors):
+    """Split (..., num_rows, num_cols) color arrays into black stones,
+    white stones, black territory, white territory and dame, using the
+    same rules as evaluate_territory: an empty region is territory if it
+    borders stones of exactly one color.
+    """
+    colors = np.asarray(colors)
+    black = colors == Player.black.value
+    white = colors == Player.white.value
+    empty = ~(black | white)
+    # Flood both colors in one pass.
+    reaches_black, reaches_white = _reach(np.stack([black, white]), empty)
+    black_territory = reaches_black & ~reaches_white
+    white_territory = reaches_white & ~reaches_black
+    dame = empty & ~(reaches_black ^ reaches_white)
+    return black, white, black_territory, white_territory, dame
+
+
+def evaluate_territory_array(colors):
+    """Same as evaluate_territory, for a board given as a color array
+    (see board_to_array).
+    """
+    black, white, black_territory, white_territory, dame = \
+        _territory_masks(colors)
+    rows, cols = np.nonzero(dame)
+    dame_points = [
+        Point(row=r + 1, col=c + 1)
+        for r, c in zip(rows.tolist(), cols.tolist())]
+    return Territory.from_counts(
+        int(black.sum()), int(white.sum()),
+        int(black_territory.sum()), int(white_territory.sum()),
+        dame_points)
+
+
+def area_scores(colors):
+    """Area-score a batch of boards at once.
+
+    colors has shape (batch, num_rows, num_cols), see board_to_array.
+    Returns two int arrays of shape (batch,): black's and white's stones
+    plus territory.
+    """
+    black, white, black_territory, white_territory, _ = \
+        _territory_masks(colors)
+    black_score = (black | black_territory).sum(axis=(-2, -1))
+    white_score = (white | white_territory).sum(axis=(-2, -1))
+    return black_score, white_score
+
+
+def compute_game_results(game_states, komi=7.5):
+    """Score many finished games at once; returns a list of GameResult."""
+    if not game_states:
+        return []
+    colors = np.stack([board_to_array(state.board) for state in game_states])
+    black_scores, white_scores = area_scores(colors)
+    return [
+        GameResult(b, w, komi=komi)
+        for b, w in zip(black_scores.tolist(), white_scores.tolist())]
@@ -1,10 +1,32 @@
+import random
 import unittest
 
+import numpy as np
+
+from dlgo import goboard_array
+from dlgo import goboard_fast
 from dlgo import scoring
 from dlgo.goboard import Board
 from dlgo.gotypes import Player, Point
 
 
+def random_finished_game(game_module, board_size, seed):
+    rng = random.Random(seed)
+    game = game_module.GameState.new_game(board_size)
+    while not game.is_over():
+        candidates = [
+            m for m in game.legal_moves()
+            if m.is_play and not (
+                game.board.get(m.point) is None and
+                all(game.board.get(n) == game.next_player
+                    for n in game.board.neighbors(m.point)))]
+        if candidates:
+            game = game.apply_move(rng.choice(candidates))
+        else:
+            game = game.apply_move(goboard_fast.Move.pass_turn())
+    return game
+
+
 class ScoringTest(unittest.TestCase):
     def test_scoring(self):
         # .w.ww
@@ -37,3 +59,47 @@ class ScoringTest(unittest.TestCase):
         self.assertEqual(9, territory.num_white_stones)
         self.assertEqual(3, territory.num_white_territory)
         self.assertEqual(0, territory.num_dame)
+
+        colors = scoring.board_to_array(board)
+        fast_territory = scoring.evaluate_territory_array(colors)
+        self.assertEqual(vars(territory), vars(fast_territory))
+
+    def test_dame(self):
+        # .b.
+        # bbw
+        # .w.
+        board = goboard_fast.Board(3, 3)
+        board.place_stone(Player.black, Point(1, 2))
+        board.place_stone(Player.black, Point(2, 1))
+        board.place_stone(Player.black, Point(2, 2))
+        board.place_stone(Player.white, Point(2, 3))
+        board.place_stone(Player.white, Point(3, 2))
+        territory = scoring.evaluate_territory_array(
+            scoring.board_to_array(board))
+        self.assertEqual(1, territory.num_black_territory)
+        self.assertEqual(1, territory.num_white_territory)
+        self.assertEqual(2, territory.num_dame)
+        self.assertEqual(
+            {Point(1, 3), Point(3, 1)}, set(territory.dame_points))
+
+    def test_matches_evaluate_territory(self):
+        for game_module in (goboard_fast, goboard_array):
+            games = [
+                random_finished_game(game_module, 9, seed)
+                for seed in range(4)]
+            for game in games:
+                expected = scoring.evaluate_territory(game.board)
+                actual = scoring.evaluate_territory_array(
+                    scoring.board_to_array(game.board))
+                self.assertEqual(vars(expected), vars(actual))
+            results = scoring.compute_game_results(games)
+            self.assertEqual(
+                [scoring.compute_game_result(game) for game in games],
+                results)
+
+    def test_area_scores_empty_board(self):
+        colors = np.zeros((2, 5, 5), dtype=np.uint8)
+        colors[1, 2, 2] = Player.white.value
+        black, white = scoring.area_scores(colors)
+        self.assertEqual([0, 0], black.tolist())
+        self.assertEqual([0, 25], white.tolist())
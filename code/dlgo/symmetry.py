@@ -0,0 +1,214 @@
+"""The eight symmetries of the Go board, for network inference.
+
+Symmetry s is s % 4 quarter turns, applied after a transposition when
+s >= 4. All eight map a square board onto itself; on a board with
+num_rows != num_cols only 0, 2, 5 and 7 keep the shape.
+"""
+import numpy as np
+
+from dlgo.evalcache import EvalCache, ko_point
+from dlgo.scoring import board_to_array
+from dlgo.zobrist_table import get_zobrist_table
+
+__all__ = [
+    'SymmetricEvalCache',
+    'SymmetricModel',
+    'canonical_key',
+    'inverse',
+    'symmetries',
+    'transform',
+    'transform_policy',
+]
+
+
+def symmetries(num_rows, num_cols):
+    if num_rows == num_cols:
+        return list(range(8))
+    return [0, 2, 5, 7]
+
+
+def transform(array, symmetry):
+    """Apply symmetry to the last two axes of array, which hold the rows
+    and columns of the board."""
+    if symmetry >= 4:
+        array = np.swapaxes(array, -1, -2)
+    return np.rot90(array, symmetry % 4, axes=(-2, -1))
+
+
+def inverse(symmetry):
+    # Reflections undo themselves.
+    if symmetry >= 4:
+        return symmetry
+    return (4 - symmetry) % 4
+
+
+def transform_policy(policy, symmetry, num_rows, num_cols):
+    """Apply symmetry to flat move probabilities, shape (num_moves,) or
+    (batch, num_moves). The first num_rows * num_cols entries are board
+    points in row major order; any that follow, like the pass of the
+    zero encoder, stay where they are."""
+    policy = np.asarray(policy)
+    num_points = num_rows * num_cols
+    points = policy[..., :num_points].reshape(
+        policy.shape[:-1] + (num_rows, num_cols))
+    points = transform(points, symmetry).reshape(
+        policy.shape[:-1] + (num_points,))
+    return np.concatenate([points, policy[..., num_points:]], axis=-1)
+
+
+def canonical_key(game_state):
+    """The position key shared by all symmetric copies of game_state.
+
+    Returns (key, symmetry), where key is (zobrist hash, next player, ko
+    index) of the copy with the smallest hash and symmetry maps
+    game_state onto that copy.
+    """
+    board = game_state.board
+    num_rows, num_cols = board.num_rows, board.num_cols
+    candidates = symmetries(num_rows, num_cols)
+    colors = board_to_array(board)
+    hashes = get_zobrist_table(num_rows, num_cols).hash_position(
+        np.stack([transform(colors, s) for s in candidates]))
+    ko = ko_point(game_state)
+    if ko is not None:
+        ko_plane = np.zeros((num_rows, num_cols), dtype=np.uint8)
+        ko_plane[ko.row - 1, ko.col - 1] = 1
+    best = None
+    for s, position_hash in zip(candidates, hashes.tolist()):
+        ko_index = -1
+        if ko is not None:
+            ko_index = int(np.argmax(transform(ko_plane, s)))
+        if best is None or (position_hash, ko_index) < best[:2]:
+            best = (position_hash, ko_index, s)
+    position_hash, ko_index, s = best
+    return (position_hash, game_state.next_player, ko_index), s
+
+
+class SymmetricEvalCache(EvalCache):
+    """EvalCache that stores every position in the orientation of its
+    canonical_key, so symmetric copies of a position share one entry.
+
+    Priors are stored in the canonical orientation and turned back on
+    lookup. This is exact for symmetric networks, such as those wrapped
+    in a SymmetricModel that averages over all symmetries; for others a
+    hit returns the evaluation of a symmetric copy.
+    """
+    def key(self, game_state):
+        board = game_state.board
+        key, symmetry = canonical_key(game_state)
+        return _CanonicalKey(key, symmetry, board.num_rows, board.num_cols)
+
+    def __contains__(self, key):
+        return EvalCache.__contains__(self, key.position)
+
+    def get(self, key):
+        cached = EvalCache.get(self, key.position)
+        if cached is None:
+            return None
+        priors, value = cached
+        if priors is not None:
+            priors = transform_policy(
+                priors, inverse(key.symmetry), key.num_rows, key.num_cols)
+        return priors, value
+
+    def put(self, key, priors=None, value=None):
+        if priors is not None:
+            priors = transform_policy(
+                priors, key.symmetry, key.num_rows, key.num_cols)
+        EvalCache.put(self, key.position, priors=priors, value=value)
+
+
+class _CanonicalKey:
+    __slots__ = ('position', 'symmetry', 'num_rows', 'num_cols')
+
+    def __init__(self, position, symmetry, num_rows, num_cols):
+        self.position = position
+        self.symmetry = symmetry
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+
+
+class SymmetricModel:
+    """Wraps a Keras model to evaluate positions under board symmetries.
+
+    The inputs are encoded boards, channels first. With mode='average',
+    every position is evaluated in num_symmetries orientations (all of
+    them by default, a random subset otherwise) and the outputs, turned
+    back to board coordinates, are averaged. With mode='random', every
+    position is evaluated once in a randomly picked orientation. Either
+    way there is a single predict call on the wrapped model.
+
+    Outputs with at least one entry per board point are taken to be
+    policies over the points in row major order, and are transformed
+    back; other outputs, like values, are left as they are. Pass
+    policy_outputs, the indices of the policy outputs, to override this.
+
+    Anything else, like fit or compile, goes to the wrapped model, so a
+    wrapped model can replace the model of a ZeroAgent, PolicyAgent,
+    ValueAgent or DeepLearningAgent.
+    """
+    def __init__(self, model, mode='average', num_symmetries=None,
+                 policy_outputs=None, seed=None):
+        if mode not in ('average', 'random'):
+            raise ValueError('Unknown mode %r' % (mode,))
+        self.model = model
+        self.mode = mode
+        self.num_symmetries = num_symmetries
+        self.policy_outputs = policy_outputs
+        self._rng = np.random.RandomState(seed)
+
+    def __getattr__(self, name):
+        return getattr(self.__dict__['model'], name)
+
+    def predict(self, x, **kwargs):
+        x = np.asarray(x)
+        num_rows, num_cols = x.shape[-2:]
+        candidates = symmetries(num_rows, num_cols)
+
+        if self.mode == 'random':
+            chosen = self._rng.choice(candidates, len(x)).tolist()
+            model_input = np.stack([
+                transform(position, s) for position, s in zip(x, chosen)])
+
+            def restore(output, is_policy):
+                if not is_policy:
+                    return np.asarray(output)
+                return np.stack([
+                    transform_policy(row, inverse(s), num_rows, num_cols)
+                    for row, s in zip(output, chosen)])
+        else:
+            if self.num_symmetries is None or \
+                    self.num_symmetries >= len(candidates):
+                chosen = candidates
+            else:
+                chosen = self._rng.choice(
+                    candidates, self.num_symmetries, replace=False).tolist()
+            model_input = np.concatenate([transform(x, s) for s in chosen])
+
+            def restore(output, is_policy):
+                # One block of len(x) rows per symmetry.
+                output = np.asarray(output).reshape(
+                    (len(chosen), len(x)) + np.shape(output)[1:])
+                if is_policy:
+                    output = np.stack([
+                        transform_policy(
+                            block, inverse(s), num_rows, num_cols)
+                        for block, s in zip(output, chosen)])
+                return output.mean(axis=0)
+
+        outputs = self.model.predict(model_input, **kwargs)
+        single = not isinstance(outputs, (list, tuple))
+        if single:
+            outputs = [outputs]
+        results = [
+            restore(output, self._is_policy(i, output, num_rows, num_cols))
+            for i, output in enumerate(outputs)]
+        if single:
+            return results[0]
+        return results
+
+    def _is_policy(self, index, output, num_rows, num_cols):
+        if self.policy_outputs is not None:
+            return index in self.policy_outputs
+        return np.ndim(output) == 2 and \
+            np.shape(output)[1] >= num_rows * num_cols
@@ -0,0 +1,164 @@
+import unittest
+
+import numpy as np
+
+from dlgo import goboard_fast
+from dlgo.gotypes import Point
+from dlgo.symmetry import SymmetricEvalCache, SymmetricModel, \
+    canonical_key, inverse, symmetries, transform, transform_policy
+from dlgo.zero.agent import ZeroAgent
+from dlgo.zero.encoder import ZeroEncoder
+
+
+def transform_point(point, symmetry, board_size):
+    plane = np.zeros((board_size, board_size), dtype=np.uint8)
+    plane[point.row - 1, point.col - 1] = 1
+    row, col = np.argwhere(transform(plane, symmetry))[0]
+    return Point(int(row) + 1, int(col) + 1)
+
+
+def play_all(points, symmetry=0, board_size=5):
+    """Black and white alternate; None is a pass."""
+    game = goboard_fast.GameState.new_game(board_size)
+    for point in points:
+        if point is None:
+            move = goboard_fast.Move.pass_turn()
+        else:
+            move = goboard_fast.Move.play(
+                transform_point(Point(*point), symmetry, board_size))
+        game = game.apply_move(move)
+    return game
+
+
+class PlaneModel:
+    """Policy: the first input plane; value: the top left point. The
+    policy commutes with the symmetries, the value does not."""
+    def __init__(self, with_pass=False):
+        self.with_pass = with_pass
+        self.calls = 0
+        self.inputs = []
+
+    def predict(self, x):
+        self.calls += 1
+        self.inputs.append(x)
+        policy = x[:, 0].reshape((len(x), -1))
+        if self.with_pass:
+            policy = np.concatenate([policy, np.full((len(x), 1), 7.0)], 1)
+        value = x[:, 0, :1, 0]
+        return [policy, value]
+
+
+class TransformTest(unittest.TestCase):
+    def test_inverse(self):
+        board = np.arange(12).reshape((3, 4))
+        images = set()
+        for s in symmetries(3, 4):
+            image = transform(board, s)
+            self.assertEqual((3, 4), image.shape)
+            images.add(image.tobytes())
+            self.assertTrue(
+                np.array_equal(board, transform(image, inverse(s))))
+        self.assertEqual(4, len(images))
+        square = np.arange(16).reshape((4, 4))
+        self.assertEqual(8, len(set(
+            transform(square, s).tobytes() for s in symmetries(4, 4))))
+
+    def test_transform_policy_keeps_pass(self):
+        policy = np.arange(10)
+        rotated = transform_policy(policy, 1, 3, 3)
+        self.assertEqual(9, rotated[-1])
+        self.assertEqual(
+            transform(np.arange(9).reshape((3, 3)), 1).ravel().tolist(),
+            rotated[:9].tolist())
+
+
+class CanonicalKeyTest(unittest.TestCase):
+    def test_symmetric_positions_share_a_key(self):
+        moves = [(1, 2), (3, 3), (2, 4)]
+        game = play_all(moves)
+        key, symmetry = canonical_key(game)
+        canonical = transform(game.board.color_array(), symmetry)
+        for s in range(8):
+            game = play_all(moves, s)
+            other, symmetry = canonical_key(game)
+            self.assertEqual(key, other)
+            # symmetry maps every copy onto the same board.
+            self.assertEqual(
+                canonical.tolist(),
+                transform(game.board.color_array(), symmetry).tolist())
+        self.assertNotEqual(key, canonical_key(play_all(moves + [None]))[0])
+
+    def test_ko_point(self):
+        moves = [(1, 2), (2, 2), (3, 2), (1, 3), (2, 1), (3, 3), None,
+                 (2, 4), (2, 3)]
+        key, _ = canonical_key(play_all(moves))
+        self.assertNotEqual(-1, key[2])
+        for s in range(8):
+            self.assertEqual(key, canonical_key(play_all(moves, s))[0])
+        passed = play_all(moves + [None, None])
+        self.assertEqual(-1, canonical_key(passed)[0][2])
+
+
+class SymmetricEvalCacheTest(unittest.TestCase):
+    def test_hit_on_symmetric_position(self):
+        cache = SymmetricEvalCache()
+        moves = [(1, 2), (3, 3), (2, 4)]
+        game = play_all(moves)
+        priors = np.arange(26, dtype=np.float32)
+        cache.put(cache.key(game), priors=priors, value=np.array([0.5]))
+        for s in range(8):
+            cached = cache.get(cache.key(play_all(moves, s)))
+            self.assertIsNotNone(cached)
+            expected = transform_policy(priors, s, 5, 5)
+            self.assertEqual(expected.tolist(), cached[0].tolist())
+            self.assertEqual([0.5], cached[1].tolist())
+        self.assertEqual(1, len(cache))
+
+
+class SymmetricModelTest(unittest.TestCase):
+    def setUp(self):
+        self.x = np.random.RandomState(0).random_sample((3, 2, 4, 4))
+
+    def test_average(self):
+        model = PlaneModel(with_pass=True)
+        policy, value = SymmetricModel(model).predict(self.x)
+        self.assertEqual(1, model.calls)
+        self.assertEqual((24, 2, 4, 4), model.inputs[0].shape)
+        self.assertTrue(np.allclose(
+            self.x[:, 0].reshape((3, -1)), policy[:, :16]))
+        self.assertEqual([7.0] * 3, policy[:, 16].tolist())
+        corners = (self.x[:, 0, 0, 0] + self.x[:, 0, 0, -1] +
+                   self.x[:, 0, -1, 0] + self.x[:, 0, -1, -1]) / 4
+        self.assertTrue(np.allclose(corners, value[:, 0]))
+
+    def test_subset_and_random(self):
+        model = PlaneModel()
+        policy, _ = SymmetricModel(
+            model, num_symmetries=3, seed=0).predict(self.x)
+        self.assertEqual((9, 2, 4, 4), model.inputs[0].shape)
+        self.assertTrue(np.allclose(self.x[:, 0].reshape((3, -1)), policy))
+        policy, value = SymmetricModel(
+            model, mode='random', seed=0).predict(self.x)
+        self.assertEqual((3, 2, 4, 4), model.inputs[1].shape)
+        self.assertTrue(np.allclose(self.x[:, 0].reshape((3, -1)), policy))
+        self.assertEqual((3, 1), value.shape)
+
+    def test_zero_agent(self):
+        encoder = ZeroEncoder(5)
+
+        class FakeModel:
+            def predict(self, x):
+                priors = np.random.random_sample((len(x), 26))
+                return priors, np.zeros((len(x), 1))
+        bot = ZeroAgent(
+            SymmetricModel(FakeModel()), encoder, rounds_per_move=20,
+            batch_size=4, eval_cache=SymmetricEvalCache())
+        game = goboard_fast.GameState.new_game(5)
+        self.assertTrue(game.is_valid_move(bot.select_move(game)))
+        # The empty board is symmetric: every first move after it is one
+        # of six positions.
+        self.assertGreater(bot.eval_cache.hits, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
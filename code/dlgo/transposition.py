@@ -0,0 +1,62 @@
+__all__ = [
+    'TranspositionTable',
+    'situation_key',
+]
+
+
+def situation_key(game_state):
+    """Key under which tree searches share a node for game_state: the
+    board's Zobrist hash, the player to move and the number of passes
+    that just happened (0, 1 or 2), which decides whether the game is
+    over. Resigned games get None and are never shared.
+    """
+    passes = 0
+    state = game_state
+    while passes < 2 and state.last_move is not None:
+        if state.last_move.is_resign:
+            return None
+        if not state.last_move.is_pass:
+            break
+        passes += 1
+        state = state.previous_state
+    return (game_state.board.zobrist_hash(), game_state.next_player, passes)
+
+
+class TranspositionTable:
+    """Search tree nodes by situation_key, so that positions reached
+    through different move orders share one node.
+
+    A shared node keeps the game state of the first path that reached
+    it, so move histories (and with them superko restrictions) are not
+    told apart.
+    """
+    def __init__(self):
+        self._nodes = {}
+        self.lookups = 0
+        self.saved_expansions = 0
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def clear(self):
+        self._nodes.clear()
+
+    def get(self, key):
+        """The node stored for key, or None. Every hit is an expansion
+        the search did not have to make."""
+        if key is None:
+            return None
+        self.lookups += 1
+        node = self._nodes.get(key)
+        if node is not None:
+            self.saved_expansions += 1
+        return node
+
+    def put(self, key, node):
+        if key is not None:
+            self._nodes[key] = node
+
+    def hit_rate(self):
+        if self.lookups == 0:
+            return 0.0
+        return self.saved_expansions / float(self.lookups)
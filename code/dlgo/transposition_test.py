@@ -0,0 +1,48 @@
+import unittest
+
+from dlgo import goboard_fast
+from dlgo.gotypes import Point
+from dlgo.transposition import TranspositionTable, situation_key
+
+
+def play(game, *moves):
+    for move in moves:
+        if move is None:
+            game = game.apply_move(goboard_fast.Move.pass_turn())
+        else:
+            game = game.apply_move(goboard_fast.Move.play(Point(*move)))
+    return game
+
+
+class SituationKeyTest(unittest.TestCase):
+    def test_move_orders_share_a_key(self):
+        start = goboard_fast.GameState.new_game(5)
+        a = play(start, (1, 1), (3, 3), (2, 2))
+        b = play(start, (2, 2), (3, 3), (1, 1))
+        self.assertEqual(situation_key(a), situation_key(b))
+        self.assertNotEqual(situation_key(a), situation_key(play(a, None)))
+
+    def test_passes(self):
+        start = goboard_fast.GameState.new_game(5)
+        one = play(start, (1, 1), (3, 3), None)
+        two = play(start, (1, 1), None, (3, 3), None, None)
+        self.assertTrue(two.is_over())
+        self.assertNotEqual(situation_key(one), situation_key(two))
+        resigned = start.apply_move(goboard_fast.Move.resign())
+        self.assertIsNone(situation_key(resigned))
+
+
+class TranspositionTableTest(unittest.TestCase):
+    def test_counts_saved_expansions(self):
+        table = TranspositionTable()
+        self.assertIsNone(table.get(('a', 1)))
+        table.put(('a', 1), 'node')
+        self.assertEqual('node', table.get(('a', 1)))
+        self.assertIsNone(table.get(None))
+        self.assertEqual(2, table.lookups)
+        self.assertEqual(1, table.saved_expansions)
+        self.assertEqual(0.5, table.hit_rate())
+
+
+if __name__ == '__main__':
+    unittest.main()
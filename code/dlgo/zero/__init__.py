@@ -1,3 +1,4 @@
 from .experience import *
 from .encoder import *
 from .agent import *
+from .tree import *
@@ -1,13 +1,24 @@
+import time
+
 import numpy as np
 from keras.optimizers import SGD
 
 from ..agent import Agent
+from ..agent.helpers import moves_since
+from ..budget import SearchBudget
+from ..goboard_fast import Move
+from ..mcts.tree import TreePosition
+from ..transposition import TranspositionTable, situation_key
+from .tree import ZeroTree
 
 __all__ = [
     'ZeroAgent',
 ]
 
 
+# The object-per-node tree from the book, searched by SimpleZeroAgent.
+# ZeroAgent searches a ZeroTree (see tree.py), which keeps the same
+# statistics in arrays.
 # tag::branch_struct[]
 class Branch:
     def __init__(self, prior):
@@ -70,9 +81,10 @@ class ZeroTreeNode:
 # end::node_class_helpers[]
 
 
-# tag::zero_defn[]
-class ZeroAgent(Agent):
-# end::zero_defn[]
+class SimpleZeroAgent(Agent):
+    """The search of the book, on ZeroTreeNodes: one node, game state
+    and network evaluation per position. ZeroAgent below runs the same
+    search on a ZeroTree."""
     def __init__(self, model, encoder, rounds_per_move=1600, c=2.0):
         self.model = model
         self.encoder = encoder
@@ -162,6 +174,372 @@ class ZeroAgent(Agent):
         return new_node
 # end::zero_create_node[]
 
+
+# tag::zero_defn[]
+class ZeroAgent(Agent):
+# end::zero_defn[]
+    def __init__(self, model, encoder, rounds_per_move=1600, c=2.0,
+                 budget=None, reuse_tree=True, batch_size=1,
+                 eval_cache=None, transpositions=False):
+        self.model = model
+        self.encoder = encoder
+        # Optional dlgo.evalcache.EvalCache for this model's evaluations.
+        self.eval_cache = eval_cache
+        # Number of leaves evaluated together in one predict call. With
+        # more than one, leaves are collected under virtual loss.
+        self.batch_size = batch_size
+        self.num_positions = 0
+        self.predict_time = 0.0
+
+        self.collector = None
+
+        self.num_rounds = rounds_per_move
+        self.c = c
+        # Overrides rounds_per_move when given.
+        self.budget = budget if budget is not None \
+            else SearchBudget(max_rounds=rounds_per_move)
+        # Keep the subtree of the move played, with its visit counts and
+        # network evaluations, for the next search.
+        self.reuse_tree = reuse_tree
+        self._root = None
+
+        # Moves are the encoder's move indices inside the tree.
+        self.tree = ZeroTree(encoder.num_moves())
+        # With transpositions, positions reached through different move
+        # orders share one node and one network evaluation.
+        self.transposition_table = TranspositionTable() \
+            if transpositions else None
+        self._moves = [
+            encoder.decode_move_index(idx)
+            for idx in range(encoder.num_moves())]
+        self._move_indices = {
+            move: idx for idx, move in enumerate(self._moves)}
+        play_moves = [
+            (idx, move.point) for idx, move in enumerate(self._moves)
+            if move.is_play]
+        self._play_indices = np.array([idx for idx, _ in play_moves])
+        self._play_points = [
+            (point.row - 1, point.col - 1) for _, point in play_moves]
+        self._other_moves = [
+            idx for idx, move in enumerate(self._moves) if not move.is_play]
+
+    def set_search_budget(self, budget):
+        self.budget = budget
+
+    def legal_moves(self, game_state):
+        """Legality of every encoder move index in game_state."""
+        legal = np.zeros(len(self._moves), dtype=bool)
+        if self._play_points:
+            rows, cols = zip(*self._play_points)
+            legal[self._play_indices] = \
+                game_state.legal_move_mask()[rows, cols]
+        for idx in self._other_moves:
+            legal[idx] = game_state.is_valid_move(self._moves[idx])
+        return legal
+
+    def get_root(self, game_state):
+        tree = self.tree
+        root = None
+        if self.reuse_tree and self._root is not None:
+            moves = moves_since(self.node_state(self._root), game_state)
+            if moves is not None:
+                root = self._root
+                for move in moves:
+                    idx = self._move_indices.get(move)
+                    if idx is None or tree.child(root, idx) < 0:
+                        root = None
+                        break
+                    root = tree.child(root, idx)
+        self._root = None
+        if root is None:
+            tree.clear()
+            if self.transposition_table is not None:
+                self.transposition_table.clear()
+            return self.create_node(game_state)
+        # Compacting the pool releases the rest of the old tree.
+        root = tree.compact(root, game_state)
+        if self.transposition_table is not None:
+            self.index_transpositions(root)
+        return root
+
+    def index_transpositions(self, root):
+        """Fill the transposition table with the nodes below root."""
+        tree = self.tree
+        table = self.transposition_table
+        table.clear()
+        position = TreePosition(tree.states[root])
+        table.put(position.situation_key(), root)
+        seen = {root}
+
+        def edges(node):
+            moves = np.flatnonzero(tree.children[node] >= 0)
+            return zip(moves.tolist(), tree.children[node, moves].tolist())
+        # Depth first, playing each edge on the way down and taking it
+        # back once the subtree below it is done.
+        stack = [edges(root)]
+        while stack:
+            edge = next(stack[-1], None)
+            if edge is None:
+                stack.pop()
+                if stack:
+                    position.undo()
+                continue
+            move, child = edge
+            if child in seen:
+                continue
+            seen.add(child)
+            position.play(self._moves[move])
+            table.put(position.situation_key(), child)
+            stack.append(edges(child))
+
+    def node_states(self, nodes):
+        """The game states of nodes, replayed from the root they hang
+        from. States on the way that several nodes share are built
+        once."""
+        tree = self.tree
+        known = {}
+        states = []
+        for node in nodes:
+            line = []
+            while node not in known and tree.states[node] is None:
+                line.append(node)
+                node = int(tree.parents[node])
+                if node < 0:
+                    raise ValueError(
+                        'Node %d has neither a game state nor a parent'
+                        % line[-1])
+            state = known[node] if node in known else tree.states[node]
+            for child in reversed(line):
+                state = state.apply_move(
+                    self._moves[int(tree.parent_moves[child])])
+                known[child] = state
+            states.append(state)
+        return states
+
+    def node_state(self, node):
+        return self.node_states([node])[0]
+
+    def select_move(self, game_state):
+        budget = self.budget.start()
+        root = self.get_root(game_state)
+        if not self.tree.legal[root].any():
+            # Nothing to search, as in a finished game.
+            return Move.pass_turn()
+        if self.batch_size > 1:
+            self.run_batched_rounds(root, budget)
+        else:
+            self.run_rounds(root, budget)
+
+        if self.collector is not None:
+            root_state_tensor = self.encoder.encode(game_state)
+            visit_counts = self.tree.visits[root].copy()
+            self.collector.record_decision(
+                root_state_tensor, visit_counts)
+
+        tree = self.tree
+        visit_counts = np.where(tree.legal[root], tree.visits[root], -1)
+        move_idx = int(np.argmax(visit_counts))
+        if self.reuse_tree and tree.child(root, move_idx) >= 0:
+            self._root = tree.child(root, move_idx)
+        return self._moves[move_idx]
+
+    def ponder(self, game_state, budget):
+        """Search game_state until budget runs out, typically while the
+        opponent thinks about it. With reuse_tree, the next select_move
+        continues from the node of the opponent's reply."""
+        if not self.reuse_tree or game_state.is_over():
+            return
+        root = self.get_root(game_state)
+        tracker = budget.start()
+        if self.batch_size > 1:
+            self.run_batched_rounds(root, tracker)
+        else:
+            self.run_rounds(root, tracker)
+        self._root = root
+
+    def set_collector(self, collector):
+        self.collector = collector
+
+    def set_eval_cache(self, eval_cache):
+        self.eval_cache = eval_cache
+
+    def positions_per_second(self):
+        """Positions evaluated by the network per second of predict
+        time."""
+        if self.predict_time == 0:
+            return 0.0
+        return self.num_positions / self.predict_time
+
+    def predict(self, model_input):
+        start = time.time()
+        priors, values = self.model.predict(model_input)
+        self.predict_time += time.time() - start
+        self.num_positions += len(model_input)
+        return priors, values
+
+    def _root_visit_counts(self, root):
+        return lambda: self.tree.visits[root].tolist()
+
+    def run_rounds(self, root, budget):
+        tree = self.tree
+        visit_counts = self._root_visit_counts(root)
+        while not budget.exhausted(visit_counts):
+            budget.record()
+            path, node, next_move = self.select_leaf(root)
+
+            if next_move < 0:
+                # Score an evaluated node again.
+                tree.back_up(path, -1 * tree.values[node])
+                continue
+            new_state = self.node_state(node).apply_move(
+                self._moves[next_move])
+            child_node = self.create_node(
+                new_state, move=next_move, parent=node)
+
+            value = -1 * tree.values[child_node]
+            tree.back_up(path, value)
+
+    def select_leaf(self, root, virtual_loss=False):
+        """Walk down the tree by PUCT from root.
+
+        Returns (path, node, move), where path lists the (node, move)
+        branches taken. If move is a move index, the last branch of the
+        path, (node, move), has no child yet. If move is -1, node already
+        has an evaluation to score again: its game is over, or a
+        transposition led back into the path.
+        """
+        tree = self.tree
+        path = []
+        on_path = {root}
+        node = root
+        while True:
+            move = self.select_branch(node)
+            if move < 0:
+                return path, node, -1
+            path.append((node, move))
+            if virtual_loss:
+                tree.add_virtual_loss(node, move)
+            child = tree.child(node, move)
+            if child < 0:
+                return path, node, move
+            if child in on_path:
+                return path, child, -1
+            on_path.add(child)
+            node = child
+
+    def run_batched_rounds(self, root, budget):
+        tree = self.tree
+        visit_counts = self._root_visit_counts(root)
+        while not budget.exhausted(visit_counts):
+            batch_size = self.batch_size
+            remaining = budget.remaining_rounds()
+            if remaining is not None:
+                batch_size = max(1, min(batch_size, remaining))
+            leaves, revisits = self.collect_leaves(root, batch_size)
+            for path, node in revisits:
+                tree.back_up(path, -1 * tree.values[node], virtual_loss=True)
+            parents = self.node_states([node for _, node, _ in leaves])
+            children = self.create_nodes(
+                [state.apply_move(self._moves[move])
+                 for state, (_, _, move) in zip(parents, leaves)],
+                [(node, move) for _, node, move in leaves])
+            for (path, _, _), child in zip(leaves, children):
+                tree.back_up(path, -1 * tree.values[child],
+                             virtual_loss=True)
+            budget.record(rounds=len(leaves) + len(revisits),
+                          nodes=len(leaves))
+
+    def collect_leaves(self, root, batch_size):
+        """Walk down the tree up to batch_size times, holding a virtual
+        loss on every branch taken.
+
+        Returns the leaves, as (path, node, move) with a distinct
+        unexpanded branch (node, move) each, and the revisits of
+        evaluated nodes, as (path, node); see select_leaf.
+        """
+        leaves = []
+        revisits = []
+        pending = set()
+        while len(leaves) + len(revisits) < batch_size:
+            path, node, move = self.select_leaf(root, virtual_loss=True)
+            if move < 0:
+                revisits.append((path, node))
+                continue
+            if (node, move) in pending:
+                # The batch has converged on a leaf it already holds;
+                # evaluate what we have rather than spin.
+                self.tree.revert_path(path)
+                break
+            pending.add((node, move))
+            leaves.append((path, node, move))
+        return leaves, revisits
+
+    def evaluate(self, game_states):
+        """Priors and values of game_states, from the cache where
+        possible and from a single predict call for the rest."""
+        if self.eval_cache is None:
+            model_input = self.encoder.encode_batch(game_states)
+            return self.predict(model_input)
+        outputs = self.eval_cache.predict_batch(
+            game_states, self.encoder.encode_batch, self.predict, None)
+        priors = np.array([p for p, _ in outputs])
+        values = np.array([v for _, v in outputs])
+        return priors, values
+
+    def find_transposition(self, game_state, parent, move):
+        """Link parent's branch to the node already searched for
+        game_state, if there is one. Returns the node and the key to
+        store a new node under."""
+        key = situation_key(game_state)
+        node = self.transposition_table.get(key)
+        if node is not None and parent >= 0:
+            self.tree.children[parent, move] = node
+        return node, key
+
+    def create_nodes(self, game_states, leaves=None):
+        """Batched create_node: one predict call for all game_states.
+        leaves optionally holds the (parent, move) of each state."""
+        if leaves is None:
+            leaves = [(-1, -1)] * len(game_states)
+        nodes = [None] * len(game_states)
+        keys = [None] * len(game_states)
+        if self.transposition_table is not None:
+            for i, (game_state, (parent, move)) in enumerate(
+                    zip(game_states, leaves)):
+                nodes[i], keys[i] = self.find_transposition(
+                    game_state, parent, move)
+        missing = [i for i, node in enumerate(nodes) if node is None]
+        if missing:
+            priors, values = self.evaluate(
+                [game_states[i] for i in missing])
+            for k, i in enumerate(missing):
+                parent, move = leaves[i]
+                nodes[i] = self.tree.add_node(
+                    game_states[i], values[k][0], priors[k],
+                    self.legal_moves(game_states[i]), parent, move)
+                if self.transposition_table is not None:
+                    self.transposition_table.put(keys[i], nodes[i])
+        return nodes
+
+    def select_branch(self, node):
+        return self.tree.select(node, self.c)
+
+    def create_node(self, game_state, move=-1, parent=-1):
+        if self.transposition_table is not None:
+            node, key = self.find_transposition(game_state, parent, move)
+            if node is not None:
+                return node
+        priors, values = self.evaluate([game_state])
+        priors = priors[0]
+        value = values[0][0]
+        new_node = self.tree.add_node(
+            game_state, value,
+            priors, self.legal_moves(game_state),
+            parent, move)
+        if self.transposition_table is not None:
+            self.transposition_table.put(key, new_node)
+        return new_node
+
 # tag::zero_train[]
     def train(self, experience, learning_rate, batch_size):     # <1>
         num_examples = experience.states.shape[0]
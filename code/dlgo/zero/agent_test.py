@@ -0,0 +1,209 @@
+import unittest
+
+import numpy as np
+
+from dlgo.budget import SearchBudget
+from dlgo.evalcache import EvalCache
+from dlgo.goboard_fast import GameState, Move
+from dlgo.gotypes import Point
+from dlgo.zero.agent import SimpleZeroAgent, ZeroAgent
+from dlgo.zero.encoder import ZeroEncoder
+
+
+class FakeModel:
+    """Random priors and values, counting predict calls."""
+    def __init__(self, num_moves, seed=0):
+        self.num_moves = num_moves
+        self.rng = np.random.RandomState(seed)
+        self.calls = 0
+        self.positions = 0
+
+    def predict(self, model_input):
+        self.calls += 1
+        self.positions += len(model_input)
+        priors = self.rng.random_sample((len(model_input), self.num_moves))
+        priors /= priors.sum(axis=1, keepdims=True)
+        values = self.rng.uniform(-1, 1, (len(model_input), 1))
+        return priors, values
+
+
+class ZeroAgentTest(unittest.TestCase):
+    def setUp(self):
+        self.encoder = ZeroEncoder(5)
+        self.model = FakeModel(self.encoder.num_moves())
+        self.game = GameState.new_game(5)
+
+    def test_batched_search(self):
+        bot = ZeroAgent(self.model, self.encoder, rounds_per_move=64,
+                        reuse_tree=False, batch_size=8)
+        root = bot.create_node(self.game)
+        self.model.calls = 0
+        self.model.positions = 0
+        bot.run_batched_rounds(root, bot.budget.start())
+
+        self.assertLess(self.model.calls, 64)
+        self.assertEqual(64, self.model.positions)
+        # Every virtual loss was replaced by a real visit.
+        tree = bot.tree
+        self.assertEqual(65, tree.num_nodes)
+        for node in range(tree.num_nodes):
+            visits = tree.visits[node]
+            children = tree.children[node]
+            self.assertEqual(tree.total_visits[node], visits.sum() + 1)
+            self.assertEqual(
+                visits.sum(), tree.total_visits[children[children >= 0]].sum())
+            self.assertTrue(np.all(
+                np.abs(tree.total_values[node]) <= visits + 1e-6))
+
+    def test_virtual_loss_spreads_batch(self):
+        bot = ZeroAgent(self.model, self.encoder, batch_size=8)
+        root = bot.create_node(self.game)
+        leaves, revisits = bot.collect_leaves(root, 8)
+        self.assertEqual(8, len(leaves))
+        self.assertEqual([], revisits)
+        self.assertEqual(8, len(set(move for _, _, move in leaves)))
+        tree = bot.tree
+        for path, _, _ in leaves:
+            tree.revert_path(path)
+        self.assertEqual(1, tree.total_visits[root])
+        self.assertEqual(0, tree.visits[root].sum())
+        self.assertEqual(0.0, np.abs(tree.total_values[root]).sum())
+
+    def test_reuses_subtree(self):
+        bot = ZeroAgent(self.model, self.encoder, rounds_per_move=100)
+        move = bot.select_move(self.game)
+        tree = bot.tree
+        child = bot._root
+        reply = int(np.argmax(tree.visits[child]))
+        game = self.game.apply_move(move).apply_move(bot._moves[reply])
+        expected = tree.child(child, reply)
+        self.assertGreaterEqual(expected, 0)
+        expected_visits = tree.total_visits[expected]
+
+        root = bot.get_root(game)
+        self.assertEqual(0, root)
+        self.assertEqual(expected_visits, tree.total_visits[root])
+        self.assertEqual(-1, tree.parents[root])
+        # Only the reused subtree is left in the pool.
+        self.assertEqual(expected_visits, tree.num_nodes)
+
+    def test_ponder(self):
+        bot = ZeroAgent(self.model, self.encoder, rounds_per_move=20)
+        move = bot.select_move(self.game)
+        game = self.game.apply_move(move)
+        bot.ponder(game, SearchBudget(max_rounds=50))
+        # The next search starts from the pondered tree.
+        root = bot.get_root(game)
+        self.assertGreaterEqual(bot.tree.total_visits[root], 50)
+
+    def test_node_states_are_replayed(self):
+        bot = ZeroAgent(self.model, self.encoder, rounds_per_move=50,
+                        batch_size=4)
+        root = bot.get_root(self.game)
+        bot.run_batched_rounds(root, bot.budget.start())
+        tree = bot.tree
+        self.assertIs(self.game, tree.states[root])
+        self.assertEqual([None] * (tree.num_nodes - 1), tree.states[1:])
+        nodes = list(range(1, tree.num_nodes))
+        for node, state in zip(nodes, bot.node_states(nodes)):
+            # The legal moves were taken from the state the node was
+            # created with.
+            self.assertEqual(
+                tree.legal[node].tolist(), bot.legal_moves(state).tolist())
+
+    def test_positions_per_second(self):
+        bot = ZeroAgent(self.model, self.encoder, rounds_per_move=10)
+        bot.select_move(self.game)
+        self.assertEqual(11, bot.num_positions)
+        self.assertGreater(bot.positions_per_second(), 0)
+
+    def test_eval_cache(self):
+        cache = EvalCache()
+        bot = ZeroAgent(self.model, self.encoder, rounds_per_move=30,
+                        reuse_tree=False, batch_size=4, eval_cache=cache)
+        bot.select_move(self.game)
+        positions = self.model.positions
+        # Searching the same position again is served from the cache.
+        bot.select_move(self.game)
+        self.assertGreater(cache.hits, 0)
+        self.assertLess(self.model.positions - positions, positions)
+
+    def test_transpositions_share_evaluations(self):
+        bot = ZeroAgent(self.model, self.encoder, transpositions=True)
+        root = bot.create_node(self.game)
+        a, b, c = [bot._move_indices[Move.play(Point(r, r))]
+                   for r in (1, 2, 3)]
+
+        def descend(moves):
+            node = root
+            for move in moves:
+                state = bot.node_state(node).apply_move(bot._moves[move])
+                node = bot.create_node(state, move=move, parent=node)
+            return node
+        first = descend([a, b, c])
+        positions = self.model.positions
+        second = descend([c, b, a])
+        self.assertEqual(first, second)
+        # Only the two new intermediate positions were evaluated.
+        self.assertEqual(positions + 2, self.model.positions)
+        self.assertEqual(1, bot.transposition_table.saved_expansions)
+
+    def test_search_with_transpositions(self):
+        for batch_size in (1, 8):
+            bot = ZeroAgent(self.model, self.encoder, rounds_per_move=300,
+                            batch_size=batch_size, transpositions=True)
+            bot.select_move(self.game)
+            tree = bot.tree
+            self.assertEqual(301, tree.total_visits[0])
+            for node in range(tree.num_nodes):
+                self.assertEqual(tree.total_visits[node],
+                                 tree.visits[node].sum() + 1)
+
+    def test_reuses_tree_with_transpositions(self):
+        # Moving the root down drops the first parents of some
+        # transpositions; their states must still replay correctly.
+        for batch_size in (1, 8):
+            bot = ZeroAgent(self.model, self.encoder, rounds_per_move=200,
+                            batch_size=batch_size, transpositions=True)
+            game = self.game
+            for _ in range(8):
+                if game.is_over():
+                    break
+                game = game.apply_move(bot.select_move(game))
+                tree = bot.tree
+                self.assertEqual(-1, tree.parents[0])
+                self.assertTrue((tree.parents[1:tree.num_nodes] >= 0).all())
+                states = bot.node_states(range(tree.num_nodes))
+                for node in range(1, tree.num_nodes):
+                    parent = tree.parents[node]
+                    move = tree.parent_moves[node]
+                    self.assertEqual(node, tree.child(parent, move))
+                    self.assertEqual(
+                        states[node].board.zobrist_hash(),
+                        states[parent].apply_move(
+                            bot._moves[move]).board.zobrist_hash())
+
+    def test_passes_without_legal_moves(self):
+        game = self.game.apply_move(Move.pass_turn()).apply_move(
+            Move.pass_turn())
+        self.assertTrue(game.is_over())
+        for batch_size in (1, 8):
+            bot = ZeroAgent(self.model, self.encoder, rounds_per_move=8,
+                            batch_size=batch_size)
+            self.assertEqual(Move.pass_turn(), bot.select_move(game))
+
+
+class SimpleZeroAgentTest(unittest.TestCase):
+    def test_select_move(self):
+        encoder = ZeroEncoder(5)
+        model = FakeModel(encoder.num_moves())
+        game = GameState.new_game(5)
+        bot = SimpleZeroAgent(model, encoder, rounds_per_move=20)
+        move = bot.select_move(game)
+        self.assertTrue(game.is_valid_move(move))
+        # One evaluation for the root and one per round.
+        self.assertEqual(21, model.calls)
+
+
+if __name__ == '__main__':
+    unittest.main()
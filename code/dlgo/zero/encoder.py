@@ -1,5 +1,7 @@
 import numpy as np
 
+from dlgo.encoders.base import batch_buffer
+from dlgo.encoders.utils import fill_liberty_planes, stack_board_arrays
 from dlgo.goboard_fast import Move
 from dlgo.gotypes import Player, Point
 
@@ -15,27 +17,24 @@ class ZeroEncoder:
         self.num_planes = 11
 
     def encode(self, game_state):
-        board_tensor = np.zeros(self.shape())
-        next_player = game_state.next_player
-        if game_state.next_player == Player.white:
-            board_tensor[8] = 1
-        else:
-            board_tensor[9] = 1
-        for r in range(self.board_size):
-            for c in range(self.board_size):
-                p = Point(row=r + 1, col=c + 1)
-                go_string = game_state.board.get_go_string(p)
-
-                if go_string is None:
-                    if game_state.does_move_violate_ko(next_player,
-                                                       Move.play(p)):
-                        board_tensor[10][r][c] = 1
-                else:
-                    liberty_plane = min(4, go_string.num_liberties) - 1
-                    if go_string.color != next_player:
-                        liberty_plane += 4
-                    board_tensor[liberty_plane][r][c] = 1
-
+        return self.encode_batch([game_state], dtype=np.float64)[0]
+
+    def encode_batch(self, game_states, out=None, dtype=np.float32):
+        """Like dlgo.encoders.base.Encoder.encode_batch."""
+        board_tensor = batch_buffer(
+            self.shape(), len(game_states), out, dtype)
+        arrays, next_players = stack_board_arrays(
+            game_states, self.shape()[1:])
+        stones = arrays.colors != 0
+        fill_liberty_planes(
+            board_tensor, 0, arrays.colors == next_players,
+            arrays.liberties, 4)
+        fill_liberty_planes(
+            board_tensor, 4, stones & (arrays.colors != next_players),
+            arrays.liberties, 4)
+        board_tensor[:, 8] = next_players == Player.white.value
+        board_tensor[:, 9] = next_players == Player.black.value
+        board_tensor[:, 10] = arrays.ko
         return board_tensor
 
 # tag::encode_move[]
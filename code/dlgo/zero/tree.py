@@ -0,0 +1,172 @@
+import numpy as np
+
+__all__ = [
+    'ZeroTree',
+]
+
+
+class ZeroTree:
+    """ZeroAgent's search tree as a pool of nodes stored in arrays.
+
+    Nodes are integer indices. Node i owns row i of the per-move arrays,
+    which are indexed by the encoder's move index: priors, visit counts,
+    total values, the child node reached by each move (-1 if there is
+    none yet) and whether the move is legal. Rows are preallocated; the
+    pool doubles in size when it runs out.
+
+    Statistics live on the edges, so a node may be the child of several
+    parents (a transposition). parents records the first one only;
+    results are backed up along the path a search took.
+
+    Only nodes without a parent keep their game state in states; the
+    others have None there and their states are rebuilt by replaying
+    parent_moves from the root (see ZeroAgent.node_states).
+    """
+    def __init__(self, num_moves, capacity=256):
+        self.num_moves = num_moves
+        self.num_nodes = 0
+        self.capacity = 0
+        self.states = []
+        self.priors = np.zeros((0, num_moves), dtype=np.float32)
+        self.visits = np.zeros((0, num_moves), dtype=np.int32)
+        self.total_values = np.zeros((0, num_moves), dtype=np.float32)
+        self.children = np.zeros((0, num_moves), dtype=np.int32)
+        self.legal = np.zeros((0, num_moves), dtype=bool)
+        # Per node: visits including the evaluation that created it, the
+        # network's value for the player to move, and where it hangs in
+        # the tree.
+        self.total_visits = np.zeros(0, dtype=np.int32)
+        self.values = np.zeros(0, dtype=np.float32)
+        self.parents = np.zeros(0, dtype=np.int32)
+        self.parent_moves = np.zeros(0, dtype=np.int32)
+        self._grow(capacity)
+
+    def _grow(self, capacity):
+        for name in ('priors', 'visits', 'total_values', 'children', 'legal',
+                     'total_visits', 'values', 'parents', 'parent_moves'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.num_nodes] = old[:self.num_nodes]
+            setattr(self, name, new)
+        self.capacity = capacity
+
+    def clear(self):
+        self.num_nodes = 0
+        self.states = []
+
+    def nbytes(self):
+        """Bytes of array storage held by the pool."""
+        return sum(getattr(self, name).nbytes for name in (
+            'priors', 'visits', 'total_values', 'children', 'legal',
+            'total_visits', 'values', 'parents', 'parent_moves'))
+
+    def add_node(self, state, value, priors, legal, parent=-1, move=-1):
+        if self.num_nodes == self.capacity:
+            self._grow(2 * self.capacity)
+        node = self.num_nodes
+        self.num_nodes += 1
+        self.states.append(state if parent < 0 else None)
+        self.priors[node] = priors
+        self.visits[node] = 0
+        self.total_values[node] = 0.0
+        self.children[node] = -1
+        self.legal[node] = legal
+        self.total_visits[node] = 1
+        self.values[node] = value
+        self.parents[node] = parent
+        self.parent_moves[node] = move
+        if parent >= 0:
+            self.children[parent, move] = node
+        return node
+
+    def child(self, node, move):
+        return int(self.children[node, move])
+
+    def expected_value(self, node, move):
+        visits = self.visits[node, move]
+        if visits == 0:
+            return 0.0
+        return float(self.total_values[node, move]) / visits
+
+    def select(self, node, c):
+        """The legal move with the highest PUCT score, or -1 if there
+        is none."""
+        visits = self.visits[node]
+        q = self.total_values[node] / np.maximum(visits, 1)
+        u = c * self.priors[node] * np.sqrt(self.total_visits[node]) / \
+            (visits + 1)
+        scores = np.where(self.legal[node], q + u, -np.inf)
+        move = int(np.argmax(scores))
+        if not self.legal[node, move]:
+            return -1
+        return move
+
+    def record_visit(self, node, move, value):
+        self.total_visits[node] += 1
+        self.visits[node, move] += 1
+        self.total_values[node, move] += value
+
+    def add_virtual_loss(self, node, move):
+        # Count a pending visit as a loss for the player to move here, so
+        # the next walk down the tree in the same batch looks elsewhere.
+        self.record_visit(node, move, -1.0)
+
+    def revert_virtual_loss(self, node, move):
+        self.total_visits[node] -= 1
+        self.visits[node, move] -= 1
+        self.total_values[node, move] += 1.0
+
+    def back_up(self, path, value, virtual_loss=False):
+        """Record value on a path of (node, move) branches from the
+        root down. value is from the point of view of the player at the
+        last node. With virtual_loss, the path's virtual losses are
+        reverted as well."""
+        for node, move in reversed(path):
+            if virtual_loss:
+                self.revert_virtual_loss(node, move)
+            self.record_visit(node, move, value)
+            value = -1 * value
+
+    def revert_path(self, path):
+        for node, move in path:
+            self.revert_virtual_loss(node, move)
+
+    def compact(self, root, state):
+        """Drop every node outside the subtree of root, which becomes
+        node 0 with game state state. Returns the new index of root.
+
+        A transposition whose first parent is dropped hangs from the
+        edge it was first reached by below root instead.
+        """
+        order = [root]
+        # The kept edge each node is first reached by.
+        parents = [-1]
+        parent_moves = [-1]
+        seen = {root}
+        for node in order:
+            children = self.children[node]
+            moves = np.flatnonzero(children >= 0)
+            for move, child in zip(moves.tolist(),
+                                   children[moves].tolist()):
+                if child not in seen:
+                    seen.add(child)
+                    order.append(child)
+                    parents.append(node)
+                    parent_moves.append(move)
+        order = np.array(order, dtype=np.int64)
+        new_index = np.full(self.num_nodes + 1, -1, dtype=np.int32)
+        new_index[order] = np.arange(len(order), dtype=np.int32)
+
+        n = len(order)
+        for name in ('priors', 'visits', 'total_values', 'legal',
+                     'total_visits', 'values'):
+            array = getattr(self, name)
+            array[:n] = array[order]
+        # -1 maps to the extra slot at the end of new_index, which is -1.
+        self.children[:n] = new_index[self.children[order]]
+        self.parents[:n] = new_index[np.array(parents, dtype=np.int64)]
+        self.parent_moves[:n] = parent_moves
+        self.states = [None] * n
+        self.states[0] = state
+        self.num_nodes = n
+        return 0
@@ -0,0 +1,73 @@
+import unittest
+
+import numpy as np
+
+from dlgo.zero.tree import ZeroTree
+
+
+class ZeroTreeTest(unittest.TestCase):
+    def setUp(self):
+        self.tree = ZeroTree(4, capacity=2)
+        self.legal = np.array([True, True, True, False])
+
+    def test_select_matches_puct(self):
+        tree = self.tree
+        priors = np.array([0.1, 0.3, 0.2, 0.4])
+        root = tree.add_node('root', 0.0, priors, self.legal)
+        tree.record_visit(root, 0, 0.9)
+        tree.record_visit(root, 1, -0.5)
+        tree.record_visit(root, 1, -0.5)
+
+        def score(move):
+            n = tree.visits[root, move]
+            q = tree.expected_value(root, move)
+            return q + 2.0 * priors[move] * np.sqrt(4) / (n + 1)
+        expected = max([0, 1, 2], key=score)
+        self.assertEqual(expected, tree.select(root, 2.0))
+
+    def test_no_legal_moves(self):
+        root = self.tree.add_node('over', 0.0, np.ones(4),
+                                  np.zeros(4, dtype=bool))
+        self.assertEqual(-1, self.tree.select(root, 2.0))
+
+    def test_back_up_alternates_sign(self):
+        tree = self.tree
+        root = tree.add_node('root', 0.0, np.ones(4), self.legal)
+        child = tree.add_node('child', 0.5, np.ones(4), self.legal,
+                              parent=root, move=2)
+        tree.back_up([(root, 2), (child, 1)], 1.0)
+        self.assertEqual(1.0, tree.total_values[child, 1])
+        self.assertEqual(-1.0, tree.total_values[root, 2])
+        self.assertEqual(2, tree.total_visits[root])
+
+    def test_compact_keeps_subtree(self):
+        tree = self.tree
+        root = tree.add_node('root', 0.0, np.ones(4), self.legal)
+        a = tree.add_node('a', 0.1, np.ones(4), self.legal, root, 0)
+        b = tree.add_node('b', 0.2, np.ones(4), self.legal, root, 1)
+        b1 = tree.add_node('b1', 0.3, np.ones(4), self.legal, b, 2)
+        b2 = tree.add_node('b2', 0.4, np.ones(4), self.legal, b, 0)
+        self.assertEqual(8, tree.capacity)
+        tree.back_up([(root, 1), (b, 2), (b1, 1)], 1.0)
+        self.assertEqual(
+            [root, root, b, b],
+            [tree.parents[node] for node in (a, b, b1, b2)])
+
+        # Only the root keeps its state.
+        self.assertEqual(['root', None, None, None, None], tree.states)
+        new_root = tree.compact(b, 'b')
+        self.assertEqual(3, tree.num_nodes)
+        self.assertEqual(['b', None, None], tree.states)
+        self.assertEqual(-1, tree.parents[new_root])
+        new_b1 = tree.child(new_root, 2)
+        new_b2 = tree.child(new_root, 0)
+        self.assertEqual(0, tree.parent_moves[new_b2])
+        self.assertEqual(new_root, tree.parents[new_b1])
+        self.assertEqual(1, tree.visits[new_b1, 1])
+        self.assertEqual(-1, tree.child(new_root, 1))
+        self.assertAlmostEqual(0.3, tree.values[new_b1], places=6)
+        self.assertAlmostEqual(0.4, tree.values[new_b2], places=6)
+
+
+if __name__ == '__main__':
+    unittest.main()
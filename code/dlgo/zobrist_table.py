@@ -0,0 +1,109 @@
+import numpy as np
+
+from dlgo.gotypes import Player, Point
+
+__all__ = [
+    'ZobristTable',
+    'get_zobrist_table',
+]
+
+DEFAULT_SEED = 20180101
+
+
+class ZobristTable:
+    """Zobrist keys for one board size.
+
+    codes[point_index, color] holds the key of a stone of the given color
+    (Player.value, 0 for empty) on the point with index
+    (row - 1) * num_cols + (col - 1). Empty points have key 0, so the hash
+    of a position is empty_board XORed with the keys of its stones. XOR in
+    side_to_move as well to tell apart the same position with white to
+    play.
+
+    The keys only depend on the board size and the seed, so tables built
+    in different processes agree.
+    """
+    def __init__(self, num_rows, num_cols=None, seed=DEFAULT_SEED):
+        if num_cols is None:
+            num_cols = num_rows
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.num_points = num_rows * num_cols
+        self.seed = seed
+
+        rng = np.random.RandomState(seed)
+        raw = np.frombuffer(
+            rng.bytes(8 * (2 * self.num_points + 2)), dtype='<u8')
+        self.codes = np.zeros((self.num_points, 3), dtype=np.uint64)
+        self.codes[:, 1:] = raw[:-2].reshape((self.num_points, 2))
+        self.codes.setflags(write=False)
+        self.empty_board = int(raw[-2])
+        self.side_to_move = int(raw[-1])
+
+        # Plain Python ints for incremental updates, where numpy scalars
+        # would be slow.
+        self.code_lists = self.codes.T.tolist()
+        self.point_codes = {}
+        for player in (Player.black, Player.white):
+            codes = self.code_lists[player.value]
+            self.point_codes[player] = {
+                Point(row=r, col=c): codes[(r - 1) * num_cols + c - 1]
+                for r in range(1, num_rows + 1)
+                for c in range(1, num_cols + 1)
+            }
+
+    def point_index(self, point):
+        return (point.row - 1) * self.num_cols + point.col - 1
+
+    def code(self, point, player):
+        return self.point_codes[player][point]
+
+    def hash_position(self, position, next_player=None):
+        """Hash one position or a batch of positions.
+
+        position is an integer array of shape (num_rows, num_cols) or
+        (batch, num_rows, num_cols) holding 0 for empty points and
+        Player.value for stones. Returns an int for a single position and
+        a uint64 array for a batch. If next_player is given, the side to
+        move is hashed in as well.
+        """
+        position = np.asarray(position)
+        single = position.ndim == 2
+        colors = position.reshape((-1, self.num_points))
+        stone_codes = self.codes[np.arange(self.num_points), colors]
+        hashes = np.bitwise_xor.reduce(stone_codes, axis=1)
+        hashes ^= np.uint64(self.empty_board)
+        if next_player == Player.white:
+            hashes ^= np.uint64(self.side_to_move)
+        if single:
+            return int(hashes[0])
+        return hashes
+
+    def hash_board(self, board, next_player=None):
+        position = np.zeros((self.num_rows, self.num_cols), dtype=np.int8)
+        for r in range(1, self.num_rows + 1):
+            for c in range(1, self.num_cols + 1):
+                color = board.get(Point(row=r, col=c))
+                if color is not None:
+                    position[r - 1, c - 1] = color.value
+        return self.hash_position(position, next_player)
+
+    def situation_hash(self, board_hash, next_player):
+        """Combine a board hash with the side to move."""
+        if next_player == Player.white:
+            return board_hash ^ self.side_to_move
+        return board_hash
+
+
+zobrist_tables = {}
+
+
+def get_zobrist_table(num_rows, num_cols=None):
+    if num_cols is None:
+        num_cols = num_rows
+    dim = (num_rows, num_cols)
+    table = zobrist_tables.get(dim)
+    if table is None:
+        table = ZobristTable(num_rows, num_cols)
+        zobrist_tables[dim] = table
+    return table
@@ -0,0 +1,77 @@
+import random
+import unittest
+
+import numpy as np
+
+from dlgo import goboard_array, goboard_fast
+from dlgo.gotypes import Player
+from dlgo.zobrist_table import ZobristTable, get_zobrist_table
+
+
+def random_game(game_module, board_size, num_moves, seed):
+    rng = random.Random(seed)
+    game = game_module.GameState.new_game(board_size)
+    for _ in range(num_moves):
+        candidates = [m for m in game.legal_moves() if m.is_play]
+        if not candidates:
+            break
+        game = game.apply_move(rng.choice(candidates))
+    return game
+
+
+def to_array(board):
+    position = np.zeros((board.num_rows, board.num_cols), dtype=np.int8)
+    for r in range(board.num_rows):
+        for c in range(board.num_cols):
+            color = board.get(goboard_fast.Point(row=r + 1, col=c + 1))
+            if color is not None:
+                position[r, c] = color.value
+    return position
+
+
+class ZobristTableTest(unittest.TestCase):
+    def test_seeded(self):
+        a = ZobristTable(9, seed=5)
+        b = ZobristTable(9, seed=5)
+        c = ZobristTable(9, seed=6)
+        self.assertTrue(np.array_equal(a.codes, b.codes))
+        self.assertEqual(a.empty_board, b.empty_board)
+        self.assertFalse(np.array_equal(a.codes, c.codes))
+        self.assertEqual(a.codes.dtype, np.uint64)
+        self.assertEqual((81, 3), a.codes.shape)
+        self.assertTrue(np.all(a.codes[:, 0] == 0))
+
+    def test_matches_incremental_hash(self):
+        for board_size in (9, 13, 19):
+            table = get_zobrist_table(board_size)
+            for game_module in (goboard_fast, goboard_array):
+                game = random_game(game_module, board_size, 150, board_size)
+                self.assertEqual(
+                    game.board.zobrist_hash(),
+                    table.hash_position(to_array(game.board)))
+                self.assertEqual(
+                    game.board.zobrist_hash(), table.hash_board(game.board))
+
+    def test_batch(self):
+        table = get_zobrist_table(9)
+        positions = np.stack([
+            to_array(random_game(goboard_array, 9, n, n).board)
+            for n in (0, 10, 40)])
+        hashes = table.hash_position(positions)
+        self.assertEqual((3,), hashes.shape)
+        for position, h in zip(positions, hashes):
+            self.assertEqual(table.hash_position(position), int(h))
+        self.assertEqual(table.empty_board, int(hashes[0]))
+
+    def test_side_to_move(self):
+        table = get_zobrist_table(9)
+        position = to_array(random_game(goboard_fast, 9, 20, 3).board)
+        black = table.hash_position(position, Player.black)
+        white = table.hash_position(position, Player.white)
+        self.assertEqual(table.hash_position(position), black)
+        self.assertEqual(black ^ table.side_to_move, white)
+        self.assertEqual(white, table.situation_hash(black, Player.white))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 # tag::generate_zobrist[]
 import random
+import sys
 
 from dlgo.gotypes import Player, Point
 
@@ -14,10 +15,15 @@ def to_python(player_state):
 
 MAX63 = 0x7fffffffffffffff
 
+# Usage: python generate_zobrist.py [board_size] [seed]
+board_size = int(sys.argv[1]) if len(sys.argv) > 1 else 19
+if len(sys.argv) > 2:
+    random.seed(int(sys.argv[2]))
+
 table = {}
 empty_board = 0
-for row in range(1, 20):
-    for col in range(1, 20):
+for row in range(1, board_size + 1):
+    for col in range(1, board_size + 1):
         for state in (None, Player.black, Player.white):
             code = random.randint(0, MAX63)
             table[Point(row, col), state] = code